@@ -0,0 +1,181 @@
+"""
+Deterministic synthetic candidates, resumes and answers shared by the load
+harness and the micro-benchmarks. Everything is derived from a seeded
+random.Random, so the same seed always yields the same corpus.
+"""
+import random
+from datetime import datetime
+
+SKILL_WORDS = [
+    'python', 'flask', 'django', 'sql', 'postgresql', 'redis', 'docker', 'kubernetes', 'aws', 'gcp',
+    'pandas', 'numpy', 'rest', 'graphql', 'celery', 'linux', 'git', 'pytest', 'asyncio', 'fastapi'
+]
+OTHER_SKILLS = ['java', 'spring', 'kotlin', 'swift', 'excel', 'photoshop', 'sales', 'marketing']
+FILLER_WORDS = [
+    'built', 'designed', 'maintained', 'migrated', 'optimized', 'service', 'pipeline', 'platform', 'team',
+    'customers', 'latency', 'throughput', 'reliability', 'dashboard', 'reporting', 'billing', 'search',
+    'payments', 'analytics', 'integration', 'deployment', 'monitoring', 'testing', 'automation', 'api',
+    'backend', 'frontend', 'database', 'schema', 'queue', 'cache', 'cluster', 'release', 'incident',
+    'mentored', 'reviewed', 'led', 'owned', 'improved', 'reduced', 'increased', 'scaled', 'across',
+    'regions', 'startup', 'enterprise', 'product', 'feature', 'roadmap', 'stakeholders', 'quarterly'
+]
+FIRST_NAMES = ['Asha', 'Ben', 'Chen', 'Dara', 'Eli', 'Fatima', 'Goran', 'Hana', 'Ivan', 'Jo', 'Kofi', 'Lena',
+               'Mateo', 'Nia', 'Omar', 'Priya', 'Quinn', 'Rosa', 'Sami', 'Tariq', 'Uma', 'Vik', 'Wen', 'Yuki']
+LAST_NAMES = ['Adeyemi', 'Brandt', 'Costa', 'Dubois', 'Evans', 'Fischer', 'Gupta', 'Haddad', 'Ito', 'Jansen',
+              'Kowalski', 'Larsen', 'Moreau', 'Novak', 'Okafor', 'Petrov', 'Rossi', 'Silva', 'Tanaka', 'Weber']
+
+STRONG_CODE = '''def solve(values):
+    # Compute the running result with input validation
+    try:
+        result = 0
+        for value in values:
+            if value > 0:
+                result += value
+        return max(result, len(values))
+    except TypeError:
+        return None
+'''
+WEAK_CODE = 'print(5)\n'
+
+STRONG_TECH_SENTENCES = [
+    'For example, lists are mutable while tuples are immutable, however both are ordered sequences.',
+    'First, the interpreter evaluates the expression. Second, it binds the name. Third, it returns.',
+    'A generator uses yield to produce values lazily, which improves memory efficiency and performance.',
+    'In practice I would write def handler(request): and add tests for the edge cases and error handling.',
+    'The algorithm has O(n log n) complexity because sorting dominates the linear scan that follows.',
+    'Decorators wrap a function to add behaviour such as caching, logging or access control.',
+]
+STRONG_HR_SENTENCES = [
+    'During a difficult situation my role and responsibility was to lead the team through the incident.',
+    'I took action, decided on a plan and implemented a solution together with the stakeholders.',
+    'The result: we achieved the goal, learned from the experience and improved our communication.',
+    'I asked for feedback, tried to understand every perspective and handled the problem with collaboration.',
+    'The task was challenging, but the team solved it and the process improved for the next release.',
+]
+WEAK_ANSWER = 'I am not sure.'
+
+
+def candidate_name(rng):
+    return f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+
+
+def resume_lines(rng, name, email, skills, paragraphs=6):
+    """Plain-text resume; random filler keeps MinHash signatures of different candidates apart"""
+    lines = [name, email, f"Skills: {', '.join(skills)}", '', 'Experience']
+    for _ in range(paragraphs):
+        words = [rng.choice(FILLER_WORDS) for _ in range(rng.randint(12, 20))]
+        words.insert(rng.randrange(len(words)), f"project{rng.randrange(10 ** 6)}")
+        lines.append(' '.join(words).capitalize() + '.')
+    return lines
+
+
+def _pdf_escape(text):
+    return text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+
+def make_pdf(lines, lines_per_page=60):
+    """Minimal PDF with a real text layer (Helvetica), one page per `lines_per_page` lines"""
+    pages = [lines[i:i + lines_per_page] for i in range(0, len(lines), lines_per_page)] or [[]]
+    font_id = 3 + 2 * len(pages)
+    objects = ['<< /Type /Catalog /Pages 2 0 R >>',
+               f"<< /Type /Pages /Kids [{' '.join(f'{3 + 2 * i} 0 R' for i in range(len(pages)))}] "
+               f"/Count {len(pages)} >>"]
+    for i, page in enumerate(pages):
+        content = 'BT /F1 10 Tf 40 770 Td 12 TL\n' + ''.join(
+            f"({_pdf_escape(line)}) Tj T*\n" for line in page) + 'ET'
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents {4 + 2 * i} 0 R "
+                       f"/Resources << /Font << /F1 {font_id} 0 R >> >> >>")
+        objects.append(f"<< /Length {len(content.encode('latin-1'))} >>\nstream\n{content}\nendstream")
+    objects.append('<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>')
+
+    out = bytearray(b'%PDF-1.4\n')
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n{body}\nendobj\n".encode('latin-1')
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    out += b''.join(f"{offset:010d} 00000 n \n".encode() for offset in offsets)
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return bytes(out)
+
+
+def answer_text(rng, kind, size_bytes=None):
+    """A 'tech' or 'hr' answer that passes the rule-based analysis, padded to about size_bytes"""
+    pool = STRONG_TECH_SENTENCES if kind == 'tech' else STRONG_HR_SENTENCES
+    parts = rng.sample(pool, len(pool))
+    text = ' '.join(parts)
+    while size_bytes and len(text) < size_bytes:
+        text += ' ' + rng.choice(pool)
+    return text[:size_bytes] if size_bytes else text
+
+
+def code_text(rng, size_bytes=None):
+    """A Python solution that passes the rule-based analysis, padded with helpers to about size_bytes"""
+    code = STRONG_CODE
+    n = 0
+    while size_bytes and len(code) < size_bytes:
+        n += 1
+        code += (f"\n\ndef helper_{n}(items):\n    # helper {rng.randrange(10 ** 6)}\n"
+                 f"    return sorted(item for item in items if item % {rng.randint(2, 9)})\n")
+    return code
+
+
+def make_candidates(count, seed=42, shortlist_rate=0.85, pass_rate=0.8):
+    """
+    Candidate specs for the load harness. Each candidate is shortlisted with
+    probability shortlist_rate and answers every stage well with probability pass_rate.
+    """
+    rng = random.Random(seed)
+    candidates = []
+    for i in range(count):
+        name = candidate_name(rng)
+        email = f"candidate{i:06d}@load.test"
+        shortlisted = rng.random() < shortlist_rate
+        skills = ['python'] + rng.sample(SKILL_WORDS[1:], 3) if shortlisted else rng.sample(OTHER_SKILLS, 3)
+        strong = rng.random() < pass_rate
+        candidates.append({
+            'index': i,
+            'name': name,
+            'email': email,
+            'skills': ', '.join(skills),
+            'resume': make_pdf(resume_lines(rng, name, email, skills)),
+            'code': STRONG_CODE if strong else WEAK_CODE,
+            'tech_answer': answer_text(rng, 'tech') if strong else WEAK_ANSWER,
+            'hr_answer': answer_text(rng, 'hr') if strong else WEAK_ANSWER,
+            'expect_offer': shortlisted and strong
+        })
+    return candidates
+
+
+def make_states(count, seed=42, resume_paragraphs=6):
+    """Candidate state dicts shaped like candidate_states.json, for persistence benchmarks"""
+    import uuid
+    rng = random.Random(seed)
+    states = {}
+    for i in range(count):
+        name = candidate_name(rng)
+        email = f"candidate{i:06d}@bench.test"
+        skills = rng.sample(SKILL_WORDS, 4)
+        analysis = {'score': rng.randint(40, 100), 'recommendation': 'PASS',
+                    'feedback': '\n'.join(['✓ Adequate code length', '✓ Control structures used'])}
+        states[str(uuid.UUID(int=rng.getrandbits(128)))] = {
+            'name': name,
+            'email': email,
+            'skills': ', '.join(skills),
+            'resume_text': '\n'.join(resume_lines(rng, name, email, skills, resume_paragraphs)),
+            'question': 'Write a function that returns the factorial of n.',
+            'question_id': rng.randint(1, 10),
+            'expected_output': '120',
+            'coding_test_completed': True,
+            'tech_interview_completed': rng.random() < 0.7,
+            'hr_interview_completed': rng.random() < 0.5,
+            'coding_analysis': analysis,
+            'tech_question': 'Explain the difference between a list and a tuple in Python.',
+            'tech_analysis': dict(analysis),
+            'used_coding_question_bits': rng.getrandbits(10),
+            'used_tech_question_bits': rng.getrandbits(10),
+            'used_hr_question_bits': rng.getrandbits(10),
+            'created_at': datetime.fromtimestamp(1.7e9 + i * 60).isoformat()
+        }
+    return states
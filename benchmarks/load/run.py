@@ -0,0 +1,404 @@
+"""
+End-to-end load test: starts crewai_app:app under gunicorn in a scratch
+directory with local Judge0, OpenAI and SMTP stand-ins, drives seeded
+synthetic candidates through every stage and reports throughput, latency
+percentiles per route, error rates and state-file growth.
+
+    python -m benchmarks.load.run --candidates 2000 --concurrency 32 --report load.json
+    python -m benchmarks.load.run --baseline last-release.json
+    python -m benchmarks.load.run --compare-modes --concurrency 200 --backend-concurrency 200
+"""
+import argparse
+import glob
+import json
+import os
+import re
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from benchmarks.corpus import make_candidates
+from benchmarks.load.stubs import Judge0Stub, OpenAIStub, SMTPStub
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+OFFER_LINK_RE = re.compile(r'/offer-letter/[^"\'\s<>]+')
+LINK_ERROR_MARKERS = ('Invalid or expired', 'link has expired')
+PASSED_MARKER = 'You Passed!'
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = max(1, int(round(pct / 100.0 * len(sorted_values) + 0.5)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+class Recorder:
+    def __init__(self):
+        self.samples = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.journey_errors = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def record(self, route, seconds, ok):
+        with self._lock:
+            self.samples[route].append(seconds)
+            if not ok:
+                self.errors[route] += 1
+
+    def journey_error(self, reason):
+        with self._lock:
+            self.journey_errors[reason] += 1
+
+
+class StateFileSampler(threading.Thread):
+    """Samples the candidate state size (snapshot plus event log segments) once per `interval` seconds"""
+
+    def __init__(self, path, interval=1.0):
+        super().__init__(name='state-file-sampler', daemon=True)
+        self.path = path
+        self.interval = interval
+        self.points = []
+        self._done = threading.Event()
+
+    def size(self):
+        total = 0
+        for path in [self.path] + glob.glob(f"{glob.escape(self.path)}.log*"):
+            try:
+                total += os.path.getsize(path)
+            except OSError:
+                pass
+        return total
+
+    def run(self):
+        start = time.monotonic()
+        while not self._done.is_set():
+            self.points.append((round(time.monotonic() - start, 1), self.size()))
+            self._done.wait(self.interval)
+
+    def stop(self):
+        self._done.set()
+        self.join()
+        self.points.append((self.points[-1][0] + self.interval if self.points else 0, self.size()))
+
+
+def _call(session, recorder, route, method, url, timeout, **kwargs):
+    start = time.perf_counter()
+    try:
+        response = session.request(method, url, timeout=timeout, allow_redirects=False, **kwargs)
+    except requests.RequestException:
+        recorder.record(route, time.perf_counter() - start, False)
+        return None
+    ok = response.status_code < 400 and not any(m in response.text for m in LINK_ERROR_MARKERS)
+    recorder.record(route, time.perf_counter() - start, ok)
+    return response if ok else None
+
+
+def run_journey(candidate, base_url, smtp, recorder, args):
+    """One candidate: apply, then follow emailed links through every stage they pass"""
+    with requests.Session() as session:
+        return _journey(session, candidate, base_url, smtp, recorder, args)
+
+
+def _journey(session, candidate, base_url, smtp, recorder, args):
+    response = _call(session, recorder, 'POST /form', 'POST', f"{base_url}/form", args.timeout,
+                     data={'name': candidate['name'], 'email': candidate['email'], 'skills': candidate['skills']},
+                     files={'resume': ('resume.pdf', candidate['resume'], 'application/pdf')})
+    if response is None:
+        return 'form_failed'
+
+    stages = [
+        ('coding-test', 'POST /coding-test', {'code': candidate['code'], 'language': 'python'}),
+        ('tech-interview', 'POST /tech-interview', {'answer': candidate['tech_answer']}),
+        ('hr-interview', 'POST /hr-interview', {'answer': candidate['hr_answer']}),
+    ]
+    for path, route, form in stages:
+        link = smtp.wait_for_link(candidate['email'], f"/{path}/", timeout=args.email_timeout,
+                                  stop_subject='Application Update')
+        if link is None:
+            if 'Application Update' in smtp.subjects(candidate['email']):
+                return 'rejected_at_screening'
+            recorder.journey_error(f"no_{path}_email")
+            return 'missing_email'
+        if _call(session, recorder, f"GET /{path}", 'GET', link, args.timeout) is None:
+            return f"{path}_get_failed"
+        response = _call(session, recorder, route, 'POST', link, args.timeout, data=form)
+        if response is None:
+            return f"{path}_post_failed"
+        if PASSED_MARKER not in response.text:
+            return f"rejected_at_{path}"
+
+    match = OFFER_LINK_RE.search(response.text)
+    if not match:
+        recorder.journey_error('no_offer_link')
+        return 'missing_offer_link'
+    if _call(session, recorder, 'GET /offer-letter', 'GET', f"{base_url}{match.group(0)}", args.timeout) is None:
+        return 'offer_failed'
+    return 'offer'
+
+
+def start_gunicorn(args, workdir, env, serving_mode='sync'):
+    command = [sys.executable, '-m', 'gunicorn', 'crewai_app:app',
+               '-c', os.path.join(REPO_ROOT, 'gunicorn.conf.py'),
+               '--chdir', workdir, '--pythonpath', REPO_ROOT,
+               '--bind', f"127.0.0.1:{args.port}",
+               '--workers', str(args.workers),
+               '--timeout', str(int(args.timeout) + 30)]
+    if serving_mode == 'async':
+        # gunicorn.conf.py selects the gevent worker from SERVING_MODE
+        command += ['--worker-connections', str(args.worker_connections)]
+    else:
+        command += ['--threads', str(args.threads), '--worker-class', args.worker_class]
+    log = open(os.path.join(workdir, 'gunicorn.log'), 'w')
+    process = subprocess.Popen(command, env=env, stdout=log, stderr=subprocess.STDOUT)
+    base_url = f"http://127.0.0.1:{args.port}"
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"gunicorn exited with {process.returncode}; see {log.name}")
+        try:
+            if requests.get(f"{base_url}/form", timeout=2).status_code == 200:
+                return process, base_url
+        except requests.RequestException:
+            pass
+        time.sleep(0.25)
+    process.terminate()
+    raise RuntimeError(f"gunicorn did not become ready; see {log.name}")
+
+
+def prepare_workdir(workdir):
+    os.makedirs(os.path.join(workdir, 'questions'), exist_ok=True)
+    shutil.copy(os.path.join(REPO_ROOT, 'questions', 'question_bank.json'),
+                os.path.join(workdir, 'questions', 'question_bank.json'))
+
+
+def app_environment(args, workdir, judge0, openai_stub, smtp):
+    env = dict(os.environ)
+    env.update({
+        'SECRET_KEY': 'load-test-secret',
+        'JUDGE0_URL': judge0.url,
+        'RAPIDAPI_KEY': 'stub',
+        'OPENAI_API_KEY': 'sk-stub',
+        'OPENAI_BASE_URL': openai_stub.url,
+        'OPENAI_API_BASE': openai_stub.url,
+        'MAIL_SERVER': '127.0.0.1',
+        'MAIL_PORT': str(smtp.port),
+        'MAIL_USE_TLS': 'false',
+        'MAIL_USERNAME': '',
+        'MAIL_DEFAULT_SENDER': 'hiring@load.test',
+        'QUESTION_GENERATOR_ENABLED': 'false',
+        'PROMETHEUS_MULTIPROC_DIR': os.path.join(workdir, 'prometheus'),
+        'LOG_LEVEL': args.log_level,
+        'PYTHONHASHSEED': str(args.seed)
+    })
+    if args.backend_concurrency:
+        for backend in ('JUDGE0', 'LLM', 'SMTP'):
+            env[f'{backend}_MAX_CONCURRENCY'] = str(args.backend_concurrency)
+            env[f'{backend}_RATE_PER_SEC'] = str(args.backend_concurrency * 10)
+    return env
+
+
+def build_report(args, recorder, outcomes, elapsed, sampler):
+    routes = {}
+    total_requests = 0
+    total_errors = 0
+    for route, values in sorted(recorder.samples.items()):
+        values = sorted(values)
+        errors = recorder.errors.get(route, 0)
+        total_requests += len(values)
+        total_errors += errors
+        routes[route] = {
+            'requests': len(values),
+            'errors': errors,
+            'error_rate': round(errors / len(values), 4),
+            'p50_ms': round(percentile(values, 50) * 1000, 1),
+            'p95_ms': round(percentile(values, 95) * 1000, 1),
+            'p99_ms': round(percentile(values, 99) * 1000, 1),
+            'max_ms': round(values[-1] * 1000, 1)
+        }
+    final_bytes = sampler.points[-1][1] if sampler.points else 0
+    shortlisted = sum(1 for o in outcomes if o not in ('rejected_at_screening', 'form_failed'))
+    return {
+        'config': {k: v for k, v in vars(args).items() if k not in ('report', 'baseline')},
+        'elapsed_seconds': round(elapsed, 2),
+        'candidates_per_second': round(len(outcomes) / elapsed, 2),
+        'requests_per_second': round(total_requests / elapsed, 2),
+        'requests': total_requests,
+        'error_rate': round(total_errors / total_requests, 4) if total_requests else 0.0,
+        'outcomes': dict(sorted(Counter(outcomes).items())),
+        'journey_errors': dict(recorder.journey_errors),
+        'routes': routes,
+        'state_file': {
+            'final_bytes': final_bytes,
+            'bytes_per_shortlisted_candidate': round(final_bytes / shortlisted) if shortlisted else None,
+            'growth': sampler.points
+        }
+    }
+
+
+def print_report(report):
+    print(f"\n{report['config']['candidates']} candidates in {report['elapsed_seconds']}s: "
+          f"{report['candidates_per_second']} candidates/s, {report['requests_per_second']} req/s, "
+          f"error rate {report['error_rate']:.2%}")
+    print(f"Outcomes: {report['outcomes']}")
+    if report['journey_errors']:
+        print(f"Journey errors: {report['journey_errors']}")
+    print(f"\n{'route':<24}{'requests':>9}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for route, stats in report['routes'].items():
+        print(f"{route:<24}{stats['requests']:>9}{stats['errors']:>8}{stats['p50_ms']:>10}"
+              f"{stats['p95_ms']:>10}{stats['p99_ms']:>10}{stats['max_ms']:>10}")
+    state = report['state_file']
+    print(f"\nState file: {state['final_bytes']} bytes "
+          f"({state['bytes_per_shortlisted_candidate']} bytes per shortlisted candidate)")
+
+
+def compare_to_baseline(report, baseline, tolerance):
+    """Regressions beyond `tolerance` (fraction) in p95 latency, throughput or error rate"""
+    regressions = []
+    for route, stats in report['routes'].items():
+        base = baseline.get('routes', {}).get(route)
+        if base and stats['p95_ms'] > base['p95_ms'] * (1 + tolerance):
+            regressions.append(f"{route} p95 {base['p95_ms']} -> {stats['p95_ms']} ms")
+    if report['candidates_per_second'] < baseline['candidates_per_second'] * (1 - tolerance):
+        regressions.append(f"throughput {baseline['candidates_per_second']} -> "
+                           f"{report['candidates_per_second']} candidates/s")
+    if report['error_rate'] > baseline['error_rate'] + 0.01:
+        regressions.append(f"error rate {baseline['error_rate']:.2%} -> {report['error_rate']:.2%}")
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--candidates', type=int, default=1000)
+    parser.add_argument('--concurrency', type=int, default=16, help='simultaneous candidate journeys')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--shortlist-rate', type=float, default=0.85)
+    parser.add_argument('--pass-rate', type=float, default=0.8)
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--workers', type=int, default=1, help='gunicorn workers (state is per process)')
+    parser.add_argument('--threads', type=int, default=8, help='gunicorn threads per worker')
+    parser.add_argument('--worker-class', default='gthread', help='gunicorn worker class in sync mode')
+    parser.add_argument('--serving-mode', choices=('sync', 'async'), default='sync',
+                        help='SERVING_MODE for the app (async = gevent workers)')
+    parser.add_argument('--compare-modes', action='store_true',
+                        help='run the same load in sync and then async mode and compare them')
+    parser.add_argument('--worker-connections', type=int, default=1000,
+                        help='concurrent requests per worker in async mode')
+    parser.add_argument('--backend-concurrency', type=int,
+                        help='raise the Judge0/LLM/SMTP admission limits to this many concurrent calls '
+                             '(the defaults cap in-flight calls well below what async mode can hold)')
+    parser.add_argument('--judge0-latency', type=float, default=0.2, help='seconds until a submission is ready')
+    parser.add_argument('--llm-latency', type=float, default=0.5, help='seconds per chat completion')
+    parser.add_argument('--smtp-latency', type=float, default=0.02, help='seconds per accepted message')
+    parser.add_argument('--timeout', type=float, default=60, help='per-request timeout (seconds)')
+    parser.add_argument('--email-timeout', type=float, default=30, help='wait for an emailed link (seconds)')
+    parser.add_argument('--log-level', default='WARNING')
+    parser.add_argument('--report', help='write the JSON report here')
+    parser.add_argument('--baseline', help='fail if p95, throughput or error rate regress against this report')
+    parser.add_argument('--tolerance', type=float, default=0.2)
+    parser.add_argument('--keep-workdir', action='store_true')
+    return parser.parse_args(argv)
+
+
+def run_load(args, candidates, serving_mode):
+    """One load run against a fresh app, stubs and scratch directory; returns the report"""
+    judge0 = Judge0Stub(args.judge0_latency).start()
+    openai_stub = OpenAIStub(args.llm_latency).start()
+    smtp = SMTPStub(args.smtp_latency).start()
+
+    workdir = tempfile.mkdtemp(prefix='hiring-load-')
+    prepare_workdir(workdir)
+    env = app_environment(args, workdir, judge0, openai_stub, smtp)
+    env['SERVING_MODE'] = serving_mode
+    process, base_url = start_gunicorn(args, workdir, env, serving_mode)
+    sampler = StateFileSampler(os.path.join(workdir, 'candidate_states.json'))
+    recorder = Recorder()
+    print(f"Driving {len(candidates)} candidates at concurrency {args.concurrency} against {base_url} "
+          f"in {serving_mode} mode (workdir {workdir})")
+    try:
+        sampler.start()
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            outcomes = list(pool.map(lambda c: run_journey(c, base_url, smtp, recorder, args), candidates))
+        elapsed = time.perf_counter() - start
+        sampler.stop()
+    finally:
+        process.send_signal(signal.SIGTERM)
+        try:
+            process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+        for stub in (judge0, openai_stub, smtp):
+            stub.shutdown()
+            stub.server_close()
+
+    report = build_report(args, recorder, outcomes, elapsed, sampler)
+    report['config']['serving_mode'] = serving_mode
+    report['stub_calls'] = {'judge0': judge0.calls, 'openai': openai_stub.calls, 'smtp_messages': smtp.messages}
+    if not args.keep_workdir:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return report
+
+
+def print_mode_comparison(reports):
+    """Side-by-side throughput and p95 latency of the sync and async runs"""
+    sync, async_ = reports['sync'], reports['async']
+    print(f"\n{'':<24}{'sync':>12}{'async':>12}{'change':>9}")
+
+    def row(label, a, b):
+        change = f"{(b - a) / a:+.0%}" if a else ''
+        print(f"{label:<24}{a:>12}{b:>12}{change:>9}")
+
+    row('candidates/s', sync['candidates_per_second'], async_['candidates_per_second'])
+    row('requests/s', sync['requests_per_second'], async_['requests_per_second'])
+    row('error rate %', round(sync['error_rate'] * 100, 2), round(async_['error_rate'] * 100, 2))
+    for route, stats in sync['routes'].items():
+        other = async_['routes'].get(route)
+        if other:
+            row(f"{route} p95 ms", stats['p95_ms'], other['p95_ms'])
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    candidates = make_candidates(args.candidates, args.seed, args.shortlist_rate, args.pass_rate)
+    modes = ('sync', 'async') if args.compare_modes else (args.serving_mode,)
+    reports = {}
+    for mode in modes:
+        reports[mode] = run_load(args, candidates, mode)
+        print_report(reports[mode])
+    if args.compare_modes:
+        print_mode_comparison(reports)
+    report = reports if args.compare_modes else reports[args.serving_mode]
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = []
+        for mode in modes:
+            # A single-run report, or {mode: report} from --compare-modes
+            base = baseline if 'routes' in baseline else baseline.get(mode)
+            if not base:
+                continue
+            regressions += [f"[{mode}] {r}" if args.compare_modes else r
+                            for r in compare_to_baseline(reports[mode], base, args.tolerance)]
+        if regressions:
+            print('\nRegressions against baseline:\n  ' + '\n  '.join(regressions))
+            return 1
+        print('\nNo regressions against baseline.')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,246 @@
+"""
+Local stand-ins for Judge0, the OpenAI API and an SMTP server, each running in
+a background thread with a fixed, configurable latency.
+"""
+import email
+import email.policy
+import itertools
+import json
+import re
+import socketserver
+import threading
+import time
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+LINK_RE = re.compile(r'https?://[^\s"\'<>]+')
+
+
+class _JSONHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def _body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        return json.loads(self.rfile.read(length) or b'{}') if length else {}
+
+    def _send(self, status, payload):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class _StubHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+    def __init__(self, handler, latency):
+        super().__init__(('127.0.0.1', 0), handler)
+        self.latency = latency
+        self.calls = 0
+        self._calls_lock = threading.Lock()
+
+    def count(self):
+        with self._calls_lock:
+            self.calls += 1
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, name=type(self).__name__, daemon=True).start()
+        return self
+
+
+class _Judge0Handler(_JSONHandler):
+    def do_POST(self):
+        if not self.path.startswith('/submissions'):
+            return self._send(404, {'error': 'not found'})
+        self.server.count()
+        submission = self._body()
+        token = f"stub-{next(self.server.tokens)}"
+        self.server.submissions[token] = (time.monotonic(), submission.get('stdin', ''))
+        self._send(201, {'token': token})
+
+    def do_GET(self):
+        match = re.match(r'/submissions/([^?]+)', self.path)
+        if not match or match.group(1) not in self.server.submissions:
+            return self._send(404, {'error': 'not found'})
+        self.server.count()
+        submitted_at, stdin = self.server.submissions[match.group(1)]
+        if time.monotonic() - submitted_at < self.server.latency:
+            return self._send(200, {'status': {'id': 2, 'description': 'Processing'}, 'stdout': None})
+        numbers = [int(n) for n in re.findall(r'-?\d+', stdin)]
+        self._send(200, {'status': {'id': 3, 'description': 'Accepted'}, 'stdout': f"{sum(numbers)}\n"})
+
+
+class Judge0Stub(_StubHTTPServer):
+    """Judge0 submissions API: results become ready `latency` seconds after submission"""
+
+    def __init__(self, latency=0.2):
+        super().__init__(_Judge0Handler, latency)
+        self.tokens = itertools.count(1)
+        self.submissions = {}
+
+
+class _OpenAIHandler(_JSONHandler):
+    def do_GET(self):
+        if self.path.rstrip('/').endswith('/models'):
+            return self._send(200, {'object': 'list', 'data': [{'id': 'gpt-4', 'object': 'model'}]})
+        self._send(404, {'error': 'not found'})
+
+    def do_POST(self):
+        if not self.path.rstrip('/').endswith('/chat/completions'):
+            return self._send(404, {'error': {'message': 'not found'}})
+        self.server.count()
+        request = self._body()
+        prompt = ' '.join(str(m.get('content', '')) for m in request.get('messages', [])).lower()
+        time.sleep(self.server.latency)
+        content = f"Thought: I now know the final answer\nFinal Answer: {_completion_for(prompt)}"
+        self._send(200, {
+            'id': f"chatcmpl-stub-{self.server.calls}",
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': request.get('model', 'gpt-4'),
+            'choices': [{'index': 0, 'finish_reason': 'stop',
+                         'message': {'role': 'assistant', 'content': content}}],
+            'usage': {'prompt_tokens': len(prompt) // 4, 'completion_tokens': 50, 'total_tokens': len(prompt) // 4 + 50}
+        })
+
+
+def _completion_for(prompt):
+    if 'offer letter' in prompt:
+        return ('<!DOCTYPE html><html><body><h1>Offer Letter</h1>'
+                '<p>We are delighted to offer you the position of Python Developer.</p></body></html>')
+    if 'json' in prompt and 'question' in prompt:
+        return json.dumps({
+            'question': 'Write a function that reads two integers from stdin and prints their sum.',
+            'expected_output': '5',
+            'test_cases': [{'stdin': '2 3\n', 'expected_output': '5'}],
+            'keywords': ['sum', 'input'],
+            'tags': ['basics']
+        })
+    return 'The solution is reasonable; consider edge cases and add tests.'
+
+
+class OpenAIStub(_StubHTTPServer):
+    """OpenAI-compatible /v1/chat/completions answering every prompt after `latency` seconds"""
+
+    def __init__(self, latency=0.5):
+        super().__init__(_OpenAIHandler, latency)
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/v1"
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    def _reply(self, line):
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self):
+        self._reply('220 stub ESMTP')
+        recipients = []
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode('utf-8', 'replace').strip()
+            verb = command[:4].upper()
+            if verb in ('EHLO', 'HELO'):
+                self._reply('250 stub')
+            elif verb == 'MAIL':
+                recipients = []
+                self._reply('250 OK')
+            elif verb == 'RCPT':
+                match = re.search(r'<([^>]*)>', command)
+                recipients.append((match.group(1) if match else command[8:]).strip().lower())
+                self._reply('250 OK')
+            elif verb == 'DATA':
+                self._reply('354 End data with <CR><LF>.<CR><LF>')
+                data = []
+                while True:
+                    chunk = self.rfile.readline()
+                    if not chunk or chunk in (b'.\r\n', b'.\n'):
+                        break
+                    data.append(chunk[1:] if chunk.startswith(b'..') else chunk)
+                time.sleep(self.server.latency)
+                self.server.deliver(recipients, b''.join(data))
+                self._reply('250 OK: queued')
+            elif verb in ('RSET', 'NOOP'):
+                self._reply('250 OK')
+            elif verb == 'QUIT':
+                self._reply('221 Bye')
+                return
+            else:
+                self._reply('502 Command not implemented')
+
+
+class SMTPStub(socketserver.ThreadingTCPServer):
+    """
+    Accepts every message and keeps an inbox per recipient; wait_for_link()
+    blocks until a message to the recipient contains a link matching a pattern.
+    """
+    daemon_threads = True
+    allow_reuse_address = True
+    # With the default backlog of 5, bursts of connections overflow the accept
+    # queue and smtplib (no timeout in Flask-Mail) waits forever for the banner
+    request_queue_size = 1024
+
+    def __init__(self, latency=0.0):
+        super().__init__(('127.0.0.1', 0), _SMTPHandler)
+        self.latency = latency
+        self.inbox = defaultdict(list)
+        self.messages = 0
+        self._cond = threading.Condition()
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, name='SMTPStub', daemon=True).start()
+        return self
+
+    def deliver(self, recipients, raw):
+        message = email.message_from_bytes(raw, policy=email.policy.default)
+        text = ''
+        for part in message.walk():
+            if part.get_content_maintype() == 'text':
+                text += part.get_content()
+        entry = {'subject': str(message['Subject'] or ''), 'links': LINK_RE.findall(text)}
+        with self._cond:
+            self.messages += 1
+            for recipient in recipients:
+                self.inbox[recipient].append(entry)
+            self._cond.notify_all()
+
+    def wait_for_link(self, recipient, pattern, timeout=30, stop_subject=None):
+        """
+        First link to `recipient` containing `pattern`. Returns None after `timeout`,
+        or as soon as a message with subject `stop_subject` has arrived.
+        """
+        deadline = time.monotonic() + timeout
+        recipient = recipient.lower()
+        with self._cond:
+            while True:
+                for entry in self.inbox.get(recipient, []):
+                    for link in entry['links']:
+                        if pattern in link:
+                            return link
+                    if stop_subject and entry['subject'] == stop_subject:
+                        return None
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                self._cond.wait(remaining)
+
+    def subjects(self, recipient):
+        with self._cond:
+            return [entry['subject'] for entry in self.inbox.get(recipient.lower(), [])]
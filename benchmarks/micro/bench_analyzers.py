@@ -0,0 +1,33 @@
+import random
+
+from benchmarks.corpus import answer_text, code_text
+
+# Bank questions, so the analyzers run with their compiled rubrics (the bank
+# has no HR rubrics; that case measures the rule-based path alone)
+CODING_QUESTION = 'Write a function to find the largest element in a list.'
+TECH_QUESTION = 'Explain the difference between a list and a tuple in Python.'
+HR_QUESTION = "Tell me about a project you're particularly proud of."
+
+
+def bench_analyze_code_quality(bench, app_module, answer_kb):
+    code = code_text(random.Random(answer_kb), answer_kb * 1024)
+    rubric = app_module.question_bank.rubric_for(text=CODING_QUESTION)
+    assert rubric
+    result = bench(app_module.analyze_code_quality, code, CODING_QUESTION, 'python', rubric)
+    assert result['recommendation'] == 'PASS'
+
+
+def bench_analyze_technical_answer(bench, app_module, answer_kb):
+    answer = answer_text(random.Random(answer_kb), 'tech', answer_kb * 1024)
+    rubric = app_module.question_bank.rubric_for(text=TECH_QUESTION)
+    assert rubric
+    result = bench(app_module.analyze_technical_answer, answer, TECH_QUESTION, rubric)
+    assert result['score'] > 0
+
+
+def bench_analyze_hr_answer(bench, app_module, answer_kb):
+    answer = answer_text(random.Random(answer_kb), 'hr', answer_kb * 1024)
+    rubric = app_module.question_bank.rubric_for(text=HR_QUESTION)
+    assert app_module.question_bank.id_for_text(HR_QUESTION) is not None
+    result = bench(app_module.analyze_hr_answer, answer, HR_QUESTION, rubric)
+    assert result['score'] > 0
@@ -0,0 +1,35 @@
+import json
+
+import pytest
+
+from benchmarks.corpus import make_states
+from utils.state_store import StateStore
+
+
+@pytest.fixture
+def states_file(app_module, tmp_path, monkeypatch, n_candidates):
+    path = tmp_path / 'candidate_states.json'
+    states = make_states(n_candidates)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(states, f, indent=2, ensure_ascii=False)
+    monkeypatch.setattr(app_module, 'CANDIDATE_STATES_FILE', str(path))
+    # No background compaction or archived segments while timing
+    monkeypatch.setattr(app_module, 'state_store', StateStore(str(path), snapshot_every=0, archive=False))
+    return states
+
+
+def bench_load_candidate_states(bench, app_module, states_file, n_candidates):
+    loaded = bench(app_module.load_candidate_states)
+    assert len(loaded) == n_candidates
+
+
+def bench_save_candidate_states(bench, app_module, states_file, n_candidates):
+    bench(app_module.save_candidate_states, states_file)
+    assert len(app_module.load_candidate_states()) == n_candidates
+
+
+def bench_save_one_candidate(bench, app_module, states_file, n_candidates):
+    """Incremental write of one changed candidate (fsync'd event log append)"""
+    candidate_id = next(iter(states_file))
+    bench(app_module.save_candidate_states, states_file, [candidate_id], 'scored')
+    assert len(app_module.load_candidate_states()) == n_candidates
@@ -0,0 +1,33 @@
+import itertools
+
+import pytest
+
+# A few questions of every type already seen
+SEEN_BITS = (1 << 1) | (1 << 12) | (1 << 23)
+
+
+@pytest.fixture
+def usage_index(app_module, n_candidates):
+    """The default job's question usage holding n_candidates emails, as after loading that many states"""
+    question_usage = app_module.job_board.partition().question_usage
+    saved = dict(question_usage)
+    question_usage.clear()
+    for i in range(n_candidates):
+        question_usage[f"candidate{i:06d}@bench.test"] = {'coding': 0b110, 'tech': 0b1 << 12}
+    yield question_usage
+    question_usage.clear()
+    question_usage.update(saved)
+
+
+@pytest.mark.parametrize('question_type', ['coding', 'tech', 'hr'])
+def bench_get_unique_question(bench, app_module, usage_index, n_candidates, question_type):
+    emails = itertools.cycle([f"candidate{i:06d}@bench.test" for i in range(min(n_candidates, 1000))])
+
+    def pick():
+        # Reset the candidate's usage so every call does the same amount of work
+        email = next(emails)
+        usage_index[email] = {question_type: SEEN_BITS}
+        return app_module.get_unique_question(question_type, email)
+
+    question, _ = bench(pick)
+    assert question is not None
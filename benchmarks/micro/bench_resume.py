@@ -0,0 +1,26 @@
+import random
+
+import pytest
+
+from benchmarks.corpus import make_pdf, resume_lines
+
+
+@pytest.mark.parametrize('pages', [1, 5, 20])
+def bench_parse_resume_pdf(bench, app_module, tmp_path, pages):
+    lines = resume_lines(random.Random(pages), 'Bench Candidate', 'bench@bench.test', ['python', 'flask'],
+                         paragraphs=pages * 60 - 5)
+    path = tmp_path / 'resume.pdf'
+    path.write_bytes(make_pdf(lines))
+    text = bench(app_module.parse_resume, str(path))
+    assert 'Bench Candidate' in text
+
+
+def bench_parse_resume_docx(bench, app_module, tmp_path):
+    docx = pytest.importorskip('docx')
+    document = docx.Document()
+    for line in resume_lines(random.Random(0), 'Bench Candidate', 'bench@bench.test', ['python'], paragraphs=60):
+        document.add_paragraph(line)
+    path = tmp_path / 'resume.docx'
+    document.save(str(path))
+    text = bench(app_module.parse_resume, str(path))
+    assert 'Bench Candidate' in text
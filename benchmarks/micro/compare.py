@@ -0,0 +1,125 @@
+"""
+Compare two micro-benchmark result files with Welch's t-test.
+
+    python -m benchmarks.micro.compare baseline.json current.json [--alpha 0.01] [--min-change 0.25]
+
+A benchmark regresses when it is slower by more than --min-change (relative
+mean) and a one-sided Welch t-test rejects "not slower" at --alpha.
+Exits 1 if any benchmark regressed.
+"""
+import argparse
+import json
+import math
+import statistics
+import sys
+
+
+def _betacf(a, b, x, max_iter=200, eps=3e-14):
+    """Continued fraction for the regularized incomplete beta function"""
+    qab, qap, qam = a + b, a + 1.0, a - 1.0
+    c, d = 1.0, 1.0 - qab * x / qap
+    d = 1.0 / (d if abs(d) > 1e-300 else 1e-300)
+    h = d
+    for m in range(1, max_iter + 1):
+        m2 = 2 * m
+        aa = m * (b - m) * x / ((qam + m2) * (a + m2))
+        d = 1.0 + aa * d
+        d = 1.0 / (d if abs(d) > 1e-300 else 1e-300)
+        c = 1.0 + aa / (c if abs(c) > 1e-300 else 1e-300)
+        h *= d * c
+        aa = -(a + m) * (qab + m) * x / ((a + m2) * (qap + m2))
+        d = 1.0 + aa * d
+        d = 1.0 / (d if abs(d) > 1e-300 else 1e-300)
+        c = 1.0 + aa / (c if abs(c) > 1e-300 else 1e-300)
+        delta = d * c
+        h *= delta
+        if abs(delta - 1.0) < eps:
+            break
+    return h
+
+
+def _betainc(a, b, x):
+    if x <= 0:
+        return 0.0
+    if x >= 1:
+        return 1.0
+    front = math.exp(math.lgamma(a + b) - math.lgamma(a) - math.lgamma(b) + a * math.log(x) + b * math.log(1 - x))
+    if x < (a + 1) / (a + b + 2):
+        return front * _betacf(a, b, x) / a
+    return 1.0 - front * _betacf(b, a, 1 - x) / b
+
+
+def t_sf(t, df):
+    """P(T > t) for Student's t with df degrees of freedom"""
+    tail = 0.5 * _betainc(df / 2.0, 0.5, df / (df + t * t))
+    return tail if t > 0 else 1.0 - tail
+
+
+def welch_ttest(baseline, current):
+    """
+    One-sided Welch t-test that `current` has a larger mean than `baseline`.
+    Returns (t, df, p).
+    """
+    n1, n2 = len(baseline), len(current)
+    m1, m2 = statistics.fmean(baseline), statistics.fmean(current)
+    v1 = statistics.variance(baseline) if n1 > 1 else 0.0
+    v2 = statistics.variance(current) if n2 > 1 else 0.0
+    se2 = v1 / n1 + v2 / n2
+    if se2 == 0:
+        return (math.inf if m2 > m1 else 0.0), float(n1 + n2 - 2), (0.0 if m2 > m1 else 1.0)
+    t = (m2 - m1) / math.sqrt(se2)
+    df = se2 ** 2 / ((v1 / n1) ** 2 / max(n1 - 1, 1) + (v2 / n2) ** 2 / max(n2 - 1, 1))
+    return t, df, t_sf(t, df)
+
+
+def compare(baseline, current, alpha=0.01, min_change=0.25):
+    """
+    Rows of (name, baseline_mean, current_mean, change, p, status) for every
+    benchmark present in both result sets; status is 'regressed', 'improved' or 'same'.
+    """
+    rows = []
+    for name, result in sorted(current['results'].items()):
+        base = baseline['results'].get(name)
+        if not base or len(base['samples']) < 2 or len(result['samples']) < 2:
+            continue
+        base_mean = statistics.fmean(base['samples'])
+        cur_mean = statistics.fmean(result['samples'])
+        change = (cur_mean - base_mean) / base_mean if base_mean else 0.0
+        _, _, p_slower = welch_ttest(base['samples'], result['samples'])
+        _, _, p_faster = welch_ttest(result['samples'], base['samples'])
+        if change > min_change and p_slower < alpha:
+            status = 'regressed'
+        elif change < -min_change and p_faster < alpha:
+            status = 'improved'
+        else:
+            status = 'same'
+        rows.append((name, base_mean, cur_mean, change, min(p_slower, p_faster), status))
+    return rows
+
+
+def format_rows(rows):
+    lines = [f"{'benchmark':<70}{'baseline':>12}{'current':>12}{'change':>9}{'p':>9}  status"]
+    for name, base_mean, cur_mean, change, p, status in rows:
+        lines.append(f"{name[-70:]:<70}{base_mean * 1e3:>10.3f}ms{cur_mean * 1e3:>10.3f}ms"
+                     f"{change:>+9.1%}{p:>9.4f}  {status}")
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('baseline')
+    parser.add_argument('current')
+    parser.add_argument('--alpha', type=float, default=0.01)
+    parser.add_argument('--min-change', type=float, default=0.25)
+    args = parser.parse_args(argv)
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+    rows = compare(baseline, current, args.alpha, args.min_change)
+    print(format_rows(rows))
+    return 1 if any(row[-1] == 'regressed' for row in rows) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,196 @@
+"""
+Minimal pytest-benchmark-style harness: the `bench` fixture times a callable
+over several rounds, results are printed at the end of the session and can be
+saved (--bench-save) and compared with a stored baseline (--bench-compare),
+failing the run on statistically significant regressions.
+"""
+import gc
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import time
+
+import pytest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from benchmarks.micro.compare import compare, format_rows  # noqa: E402
+
+_results = {}
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup('bench')
+    group.addoption('--bench-candidates', default=os.getenv('BENCH_CANDIDATES', '1000,10000'),
+                    help='comma-separated candidate counts for persistence benchmarks (e.g. 1000,10000,100000)')
+    group.addoption('--bench-answer-kb', default=os.getenv('BENCH_ANSWER_KB', '1,10,100'),
+                    help='comma-separated answer sizes in KB for analyzer benchmarks')
+    group.addoption('--bench-rounds', type=int, default=int(os.getenv('BENCH_ROUNDS', 20)),
+                    help='timed rounds per benchmark')
+    group.addoption('--bench-max-time', type=float, default=float(os.getenv('BENCH_MAX_TIME', 5)),
+                    help='time budget per benchmark in seconds; fewer rounds are run for slow cases')
+    group.addoption('--bench-save', help='write results (with raw samples) to this JSON file')
+    group.addoption('--bench-compare', help='baseline results file to compare against')
+    group.addoption('--bench-alpha', type=float, default=0.01, help='significance level for regressions')
+    group.addoption('--bench-min-change', type=float, default=0.25,
+                    help='ignore slowdowns smaller than this fraction of the baseline mean')
+
+
+def _sizes(value):
+    return [int(v) for v in str(value).split(',') if v.strip()]
+
+
+def pytest_generate_tests(metafunc):
+    if 'n_candidates' in metafunc.fixturenames:
+        metafunc.parametrize('n_candidates', _sizes(metafunc.config.getoption('bench_candidates')))
+    if 'answer_kb' in metafunc.fixturenames:
+        metafunc.parametrize('answer_kb', _sizes(metafunc.config.getoption('bench_answer_kb')))
+
+
+class Bench:
+    """
+    bench(fn, *args, **kwargs) times fn. Cheap functions are called several times
+    per round so one round takes at least `min_round` seconds, after `warmup`
+    seconds of untimed calls; samples are seconds per call, measured with the
+    garbage collector paused.
+    """
+    min_round = 0.01
+    warmup = 0.1
+
+    def __init__(self, name, rounds, max_time):
+        self.name = name
+        self.rounds = rounds
+        self.max_time = max_time
+
+    def __call__(self, fn, *args, **kwargs):
+        return self.pedantic(fn, args=args, kwargs=kwargs)
+
+    def pedantic(self, fn, args=(), kwargs=None, setup=None, rounds=None):
+        """Like pytest-benchmark: `setup` runs untimed before every call and may return (args, kwargs)"""
+        kwargs = kwargs or {}
+
+        def prepare():
+            if setup is None:
+                return args, kwargs
+            prepared = setup()
+            return prepared if prepared is not None else (args, kwargs)
+
+        call_args, call_kwargs = prepare()
+        start = time.perf_counter()
+        result = fn(*call_args, **call_kwargs)
+        first = time.perf_counter() - start
+
+        iterations = 1
+        if setup is None and first < self.min_round:
+            deadline = time.perf_counter() + min(self.warmup, self.max_time / 10)
+            calls = 0
+            while time.perf_counter() < deadline:
+                fn(*call_args, **call_kwargs)
+                calls += 1
+            per_call = (time.perf_counter() - start - first) / max(calls, 1)
+            iterations = max(1, int(self.min_round / max(per_call, 1e-7)))
+            first = per_call
+        rounds = rounds or self.rounds
+        rounds = max(3, min(rounds, int(self.max_time / max(first * iterations, 1e-9))))
+
+        samples = []
+        gc_was_enabled = gc.isenabled()
+        try:
+            for _ in range(rounds):
+                call_args, call_kwargs = prepare()
+                gc.collect()
+                gc.disable()
+                start = time.perf_counter()
+                for _ in range(iterations):
+                    fn(*call_args, **call_kwargs)
+                samples.append((time.perf_counter() - start) / iterations)
+                if gc_was_enabled:
+                    gc.enable()
+        finally:
+            if gc_was_enabled:
+                gc.enable()
+        _results[self.name] = {
+            'samples': samples,
+            'iterations': iterations,
+            'mean': statistics.fmean(samples),
+            'median': statistics.median(samples),
+            'stdev': statistics.stdev(samples) if len(samples) > 1 else 0.0,
+            'min': min(samples)
+        }
+        return result
+
+
+@pytest.fixture
+def bench(request):
+    return Bench(request.node.nodeid.split('::', 1)[-1], request.config.getoption('bench_rounds'),
+                 request.config.getoption('bench_max_time'))
+
+
+@pytest.fixture(scope='session')
+def app_module(tmp_path_factory):
+    """crewai_app imported inside a scratch directory with a copy of the question bank"""
+    workdir = tmp_path_factory.mktemp('app')
+    os.makedirs(workdir / 'questions')
+    shutil.copy(os.path.join(REPO_ROOT, 'questions', 'question_bank.json'), workdir / 'questions')
+    os.environ.setdefault('QUESTION_GENERATOR_ENABLED', 'false')
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        import crewai_app
+    finally:
+        os.chdir(cwd)
+    crewai_app.app.config['UPLOAD_FOLDER'] = str(workdir / 'uploads')
+    return crewai_app
+
+
+def pytest_sessionfinish(session, exitstatus):
+    config = session.config
+    if not _results:
+        return
+    current = {
+        'machine': {'python': platform.python_version(), 'platform': platform.platform(),
+                    'processor': platform.processor() or platform.machine(), 'cpus': os.cpu_count()},
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'results': _results
+    }
+    save_path = config.getoption('bench_save')
+    if save_path:
+        with open(save_path, 'w') as f:
+            json.dump(current, f, indent=1)
+
+    baseline_path = config.getoption('bench_compare')
+    if baseline_path:
+        with open(baseline_path) as f:
+            baseline = json.load(f)
+        config._bench_comparison = compare(baseline, current, config.getoption('bench_alpha'),
+                                           config.getoption('bench_min_change'))
+        if any(row[-1] == 'regressed' for row in config._bench_comparison):
+            session.exitstatus = 1
+
+
+def pytest_terminal_summary(terminalreporter, exitstatus, config):
+    if not _results:
+        return
+    write = terminalreporter.write_line
+    terminalreporter.section('benchmarks')
+    write(f"{'benchmark':<70}{'mean':>12}{'median':>12}{'stdev':>12}{'rounds':>8}")
+    for name, r in sorted(_results.items()):
+        write(f"{name[-70:]:<70}{r['mean'] * 1e3:>10.3f}ms{r['median'] * 1e3:>10.3f}ms"
+              f"{r['stdev'] * 1e3:>10.3f}ms{len(r['samples']):>8}")
+    if config.getoption('bench_save'):
+        write(f"Saved benchmark results to {config.getoption('bench_save')}")
+
+    rows = getattr(config, '_bench_comparison', None)
+    if rows is not None:
+        terminalreporter.section(f"comparison with {config.getoption('bench_compare')}")
+        for line in format_rows(rows).splitlines():
+            write(line)
+        regressed = sum(1 for row in rows if row[-1] == 'regressed')
+        if regressed:
+            write(f"{regressed} benchmark(s) regressed", red=True)
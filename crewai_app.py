@@ -1,51 +1,87 @@
-from flask import Flask, render_template, request, redirect, url_for, flash
+from flask import Flask, render_template, request, redirect, url_for, flash, g, Response, abort, send_from_directory
+from markupsafe import Markup, escape
 from flask_mail import Mail, Message
 import os
 import json
+import time
+import click
+import logging
 from dotenv import load_dotenv
 load_dotenv()
 
+from utils.logging_utils import request_id_var, setup_logging
+setup_logging()
+logger = logging.getLogger('crewai_app')
+
 # Import utils with fallbacks
 try:
     from utils.resume_parser import parse_resume
-    print("[INFO] resume_parser successfully imported")
+    logger.info("resume_parser successfully imported")
 except ImportError as e:
-    print(f"Warning: resume_parser not available. Using fallback. Error: {e}")
+    logger.warning("resume_parser not available. Using fallback. Error: %s", e)
     def parse_resume(file_path):
         return f"Resume content from {file_path}"
 
 try:
     from utils.email_utils import send_email
-    print("[INFO] email_utils successfully imported")
+    logger.info("email_utils successfully imported")
 except ImportError as e:
-    print(f"Warning: email_utils not available. Using fallback. Error: {e}")
+    logger.warning("email_utils not available. Using fallback. Error: %s", e)
     def send_email(subject, recipients, body, mail):
-        print(f"[EMAIL] {subject} to {recipients}: {body}")
+        logger.info("Email (fallback) %s to %s: %s", subject, recipients, body)
 
 try:
     from utils.judge0_utils import submit_code, get_result
-    print("[INFO] judge0_utils successfully imported")
+    logger.info("judge0_utils successfully imported")
 except ImportError as e:
-    print(f"Warning: judge0_utils not available. Using fallback. Error: {e}")
+    logger.warning("judge0_utils not available. Using fallback. Error: %s", e)
     def submit_code(code, language, stdin=""):
         return "demo_token"
     def get_result(token):
         return "Demo output"
 
+from utils.dedup import minhash_signature, normalize_email
+from utils.question_bank import QUESTION_TYPES, QuestionBank, score_rubric
+from utils.question_generator import QuestionGenerator
+from utils.stage_tokens import make_stage_token, verify_stage_token
+from utils.admission import AdmissionController
+from utils.metrics import (PROCTORING_EVENTS, REQUEST_LATENCY, STATE_FILE_BYTES, record_backend, record_funnel,
+                           render_metrics, track_dependency)
+from utils.profiling import ProfilingMiddleware, list_profiles
+from utils.admin_query import DEFAULT_FIELDS, CandidateFilter, CandidateIndex, decode_cursor, project
+from utils.analytics import PipelineAnalytics
+from utils.pipeline import PipelineEngine, SideEffects, Stage
+from utils.state_store import StateStore
+from utils.jobs import Job, JobBoard
+from utils.proctoring import EVENT_TYPES, ProctoringLog, parse_batch
+from utils.streaming import ChunkBroadcast, document_body, strip_code_fence
+from utils.lifecycle import ColdArchive, delete_orphan_uploads, select_for_archive
+from utils.campaigns import (DEFAULT_BODY as CAMPAIGN_BODY, DEFAULT_SUBJECT as CAMPAIGN_SUBJECT, CampaignStore,
+                             deliver, render_invitation)
+from utils import export as candidate_export
+from utils import assets as static_assets
+from utils.bulk_ingest import (discover_resumes, extract_archive, extract_email, file_fingerprint,
+                               guess_name, load_checkpoint, parse_resumes_parallel, save_checkpoint)
+
+import re
 import uuid
+import atexit
 import tempfile
+import threading
 import openai
 from datetime import datetime
-import random
 import hashlib
+import hmac
+import itertools
+from functools import wraps
 
 # CrewAI imports
 try:
     from crewai import Agent, Task, Crew, Process
     CREWAI_AVAILABLE = True
-    print("[INFO] CrewAI successfully imported")
+    logger.info("CrewAI successfully imported")
 except ImportError as e:
-    print(f"Warning: CrewAI not available. Using fallback mode. Error: {e}")
+    logger.warning("CrewAI not available. Using fallback mode. Error: %s", e)
     CREWAI_AVAILABLE = False
     # Create dummy classes for fallback
     class Agent:
@@ -64,26 +100,28 @@ except ImportError as e:
 
 try:
     from langchain_openai import ChatOpenAI
-    print("[INFO] langchain_openai successfully imported")
+    logger.info("langchain_openai successfully imported")
 except ImportError:
     try:
         from langchain.chat_models import ChatOpenAI
-        print("[INFO] langchain.chat_models successfully imported")
+        logger.info("langchain.chat_models successfully imported")
     except ImportError:
         try:
             from langchain_community.chat_models import ChatOpenAI
-            print("[INFO] langchain_community.chat_models successfully imported")
+            logger.info("langchain_community.chat_models successfully imported")
         except ImportError:
-            print("Warning: ChatOpenAI not available. Using fallback.")
+            logger.warning("ChatOpenAI not available. Using fallback.")
             class ChatOpenAI:
                 def __init__(self, **kwargs):
                     pass
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'dev')
+if app.config['SECRET_KEY'] == 'dev':
+    logger.warning("SECRET_KEY is not set; stage links are signed with the development key")
 app.config['MAIL_SERVER'] = os.getenv('MAIL_SERVER', 'smtp.gmail.com')
 app.config['MAIL_PORT'] = int(os.getenv('MAIL_PORT', 587))
-app.config['MAIL_USE_TLS'] = True
+app.config['MAIL_USE_TLS'] = os.getenv('MAIL_USE_TLS', 'true').lower() == 'true'
 app.config['MAIL_USERNAME'] = os.getenv('MAIL_USERNAME')
 app.config['MAIL_PASSWORD'] = os.getenv('MAIL_PASSWORD')
 app.config['MAIL_DEFAULT_SENDER'] = os.getenv('MAIL_DEFAULT_SENDER', app.config['MAIL_USERNAME'])
@@ -93,209 +131,326 @@ os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 mail = Mail(app)
 openai.api_key = os.getenv("OPENAI_API_KEY")
 
-JD = "We are looking for a Python developer."
-
-# File to store candidate states persistently
+# Candidate states: snapshot file plus an append-only event log (<file>.log)
 CANDIDATE_STATES_FILE = 'candidate_states.json'
+state_store = StateStore(
+    CANDIDATE_STATES_FILE,
+    snapshot_every=int(os.getenv('STATE_SNAPSHOT_EVERY', 1000)),
+    fsync=os.getenv('STATE_LOG_FSYNC', 'true').lower() == 'true',
+    archive=os.getenv('STATE_LOG_ARCHIVE', 'true').lower() == 'true'
+)
 
-# Question pools for unique question generation
-CODING_QUESTION_POOL = [
-    {"question": "Write a function to find the factorial of a number.", "expected_output": "120 (for input 5)"},
-    {"question": "Write a function to check if a string is a palindrome.", "expected_output": "True (for input 'racecar')"},
-    {"question": "Write a function to find the sum of all even numbers in a list.", "expected_output": "12 (for input [1,2,3,4,5,6])"},
-    {"question": "Write a function to reverse a string without using built-in functions.", "expected_output": "'olleh' (for input 'hello')"},
-    {"question": "Write a function to find the largest element in a list.", "expected_output": "9 (for input [3,1,4,1,5,9,2,6])"},
-    {"question": "Write a function to count vowels in a string.", "expected_output": "5 (for input 'education')"},
-    {"question": "Write a function to check if a number is prime.", "expected_output": "True (for input 17)"},
-    {"question": "Write a function to calculate the Fibonacci sequence up to n terms.", "expected_output": "[0,1,1,2,3,5,8] (for input 7)"},
-    {"question": "Write a function to remove duplicates from a list.", "expected_output": "[1,2,3,4] (for input [1,2,2,3,3,4])"},
-    {"question": "Write a function to find the second largest number in a list.", "expected_output": "8 (for input [3,1,4,1,5,9,2,6,8])"}
-]
+# Admission control for outbound dependencies: per-backend concurrency,
+# token-bucket rate (calls/sec), queue deadline and circuit breaker
+def _backend_options(prefix, max_concurrency, rate):
+    return {
+        'max_concurrency': int(os.getenv(f'{prefix}_MAX_CONCURRENCY', max_concurrency)),
+        'rate': float(os.getenv(f'{prefix}_RATE_PER_SEC', rate)),
+        'queue_timeout': float(os.getenv(f'{prefix}_QUEUE_TIMEOUT', os.getenv('ADMISSION_QUEUE_TIMEOUT', 10))),
+        'failure_threshold': int(os.getenv(f'{prefix}_BREAKER_FAILURES', 5)),
+        'reset_timeout': float(os.getenv(f'{prefix}_BREAKER_RESET', 30))
+    }
 
-TECH_QUESTION_POOL = [
-    "Explain the difference between a list and a tuple in Python.",
-    "What is the difference between '==' and 'is' operators in Python?",
-    "Explain the concept of decorators in Python with an example.",
-    "What are Python generators and how do they differ from regular functions?",
-    "Explain the difference between deep copy and shallow copy in Python.",
-    "What is the Global Interpreter Lock (GIL) in Python?",
-    "Explain the concept of lambda functions in Python.",
-    "What are Python context managers and how do you use them?",
-    "Explain the difference between staticmethod and classmethod in Python.",
-    "What is list comprehension and how does it differ from regular loops?"
-]
+admission = AdmissionController(observer=record_backend)
+admission.register('judge0', **_backend_options('JUDGE0', 4, 5))
+admission.register('llm', **_backend_options('LLM', 2, 1))
+admission.register('smtp', **_backend_options('SMTP', 2, 5))
 
-HR_QUESTION_POOL = [
-    "Tell me about a challenging situation you faced at work and how you handled it.",
-    "Describe a time when you had to work with a difficult team member. How did you handle it?",
-    "What motivates you in your professional life?",
-    "How do you handle stress and pressure in the workplace?",
-    "Describe a time when you had to learn a new technology quickly.",
-    "Tell me about a project you're particularly proud of.",
-    "How do you prioritize your work when you have multiple deadlines?",
-    "Describe a time when you made a mistake at work. How did you handle it?",
-    "What are your long-term career goals?",
-    "How do you stay updated with the latest technology trends?"
-]
+# Opt-in request profiling: X-Profile header, random sampling or slow-request capture
+PROFILING_ENABLED = os.getenv('PROFILING_ENABLED', 'false').lower() == 'true'
+PROFILE_DIR = os.getenv('PROFILE_DIR', 'profiles')
+if PROFILING_ENABLED:
+    app.wsgi_app = ProfilingMiddleware(
+        app.wsgi_app, PROFILE_DIR,
+        sample_rate=float(os.getenv('PROFILE_SAMPLE_RATE', 0)),
+        slow_ms=float(os.getenv('PROFILE_SLOW_MS', 0)) or None,
+        interval_ms=float(os.getenv('PROFILE_INTERVAL_MS', 5)),
+        formats=[f.strip() for f in os.getenv('PROFILE_FORMATS', 'collapsed,speedscope').split(',') if f.strip()],
+        token=os.getenv('PROFILE_TOKEN') or None,
+        max_files=int(os.getenv('PROFILE_MAX_FILES', 500))
+    )
+    logger.info("Request profiling enabled; profiles are written to %s", PROFILE_DIR)
+
+# Lifetime of signed stage links
+STAGE_LINK_TTL = {
+    'coding_test': int(os.getenv('STAGE_LINK_TTL_HOURS', 72)) * 3600,
+    'tech_interview': int(os.getenv('STAGE_LINK_TTL_HOURS', 72)) * 3600,
+    'hr_interview': int(os.getenv('STAGE_LINK_TTL_HOURS', 72)) * 3600,
+    'offer_letter': int(os.getenv('OFFER_LINK_TTL_DAYS', 30)) * 86400
+}
+# Accept the plain UUID links emailed before signed links were introduced, for candidates
+# recorded before then and only for the stage their last link was for (no expiry: opt in)
+ACCEPT_LEGACY_LINKS = os.getenv('ACCEPT_LEGACY_LINKS', 'false').lower() == 'true'
+# Route endpoint -> stage name used in signed links
+LINK_STAGES = {
+    'coding_test': 'coding_test',
+    'tech_interview': 'tech_interview',
+    'hr_interview': 'hr_interview',
+    'view_offer_letter': 'offer_letter'
+}
+
+# What to do with an application that matches an existing candidate by email
+# or near-duplicate resume: 'merge' (attach to existing record), 'reject'
+# (drop it) or 'flag' (create a new record marked duplicate_of)
+DUPLICATE_POLICY = os.getenv('DUPLICATE_POLICY', 'merge').lower()
+
+# Required (as X-Admin-Key or a Bearer token) by the admin API; without it the admin API is disabled
+ADMIN_API_KEY = os.getenv('ADMIN_API_KEY')
+if not ADMIN_API_KEY:
+    logger.warning("ADMIN_API_KEY is not set; /admin/* and /debug/* endpoints are disabled")
+ADMIN_PAGE_LIMIT = 500
+
+# Client-batched proctoring events: one append-only log per candidate and stage
+PROCTORING_DIR = os.getenv('PROCTORING_DIR', 'proctoring')
+PROCTORING_MAX_BATCH = int(os.getenv('PROCTORING_MAX_BATCH', 200))
+proctoring_log = ProctoringLog(PROCTORING_DIR)
+
+# Bulk invitation campaigns, delivered by `flask send-campaigns` outside the web workers
+CAMPAIGNS_DIR = os.getenv('CAMPAIGNS_DIR', 'campaigns')
+CAMPAIGN_RATE = float(os.getenv('CAMPAIGN_RATE_PER_SEC', 5))
+CAMPAIGN_BATCH_SIZE = int(os.getenv('CAMPAIGN_BATCH_SIZE', 100))
+CAMPAIGN_CONNECTIONS = int(os.getenv('CAMPAIGN_CONNECTIONS', 2))
+CAMPAIGN_MAX_ATTEMPTS = int(os.getenv('CAMPAIGN_MAX_ATTEMPTS', 3))
+campaign_store = CampaignStore(CAMPAIGNS_DIR)
+
+# Offer letters are generated once per candidate and stored; OFFER_STREAMING streams the LLM's tokens
+# to the offer page as they arrive (otherwise the offer-letter agent's full answer arrives in one chunk)
+OFFER_STREAMING = os.getenv('OFFER_STREAMING', 'true').lower() == 'true'
+_offer_generations = {}  # candidate_id -> ChunkBroadcast in progress
+_offer_generations_lock = threading.Lock()
+_STREAM_SPLIT = '\x00letter\x00'
+
+# Candidates added, changed or deleted by other processes (other workers, ingest-resumes,
+# sweep-candidates) are read back from the state log at most every STATE_FOLLOW_INTERVAL seconds
+STATE_FOLLOW_INTERVAL = float(os.getenv('STATE_FOLLOW_INTERVAL', 2))
+_state_followed_at = 0.0
+_state_follow_lock = threading.Lock()
+
+# Lifecycle sweeps (`flask sweep-candidates`): idle and finished candidates move to a compressed cold archive
+ARCHIVE_DIR = os.getenv('ARCHIVE_DIR', 'archive')
+CANDIDATE_EXPIRE_DAYS = float(os.getenv('CANDIDATE_EXPIRE_DAYS', 14))
+CANDIDATE_ARCHIVE_DAYS = float(os.getenv('CANDIDATE_ARCHIVE_DAYS', 30))
+UPLOAD_ORPHAN_GRACE_HOURS = float(os.getenv('UPLOAD_ORPHAN_GRACE_HOURS', 24))
+cold_archive = ColdArchive(ARCHIVE_DIR)
+
+# Fingerprinted JS/CSS bundles built by `python -m utils.assets`
+asset_manifest = static_assets.load_manifest(app.static_folder)
+if not asset_manifest:
+    logger.warning("No static asset manifest; serving unbuilt bundles (run python -m utils.assets)")
+HTML_COMPRESSION = os.getenv('HTML_COMPRESSION', 'true').lower() == 'true'
+HTML_COMPRESSION_MIN_BYTES = int(os.getenv('HTML_COMPRESSION_MIN_BYTES', 500))
+
+# Question bank with stable IDs, metadata and scoring rubrics
+QUESTION_BANK_FILE = os.getenv('QUESTION_BANK_FILE', os.path.join('questions', 'question_bank.json'))
+question_bank = QuestionBank.load(QUESTION_BANK_FILE)
+logger.info("Loaded %s questions from %s", len(question_bank), QUESTION_BANK_FILE)
+_question_banks = {QUESTION_BANK_FILE: question_bank}
+
+def load_question_bank(path):
+    """Question bank for a job (shared between jobs using the same file)"""
+    path = path or QUESTION_BANK_FILE
+    if path not in _question_banks:
+        _question_banks[path] = QuestionBank.load(path)
+        logger.info("Loaded %s questions from %s", len(_question_banks[path]), path)
+    return _question_banks[path]
+
+# Job requisitions: each has its own JD, screening keywords, question bank,
+# pass scores and offer letter, and candidates are partitioned by job_id.
+# Candidates from before jobs existed belong to the default job.
+JOBS_FILE = os.getenv('JOBS_FILE', os.path.join('jobs', 'jobs.json'))
+DEFAULT_JOB = Job(os.getenv('DEFAULT_JOB_ID', 'python-developer'), 'Python Developer',
+                  description='Entry level Python developer', screening_keywords=['python'],
+                  question_bank=QUESTION_BANK_FILE)
+job_board = JobBoard(JOBS_FILE, DEFAULT_JOB, load_question_bank)
+logger.info("Loaded %s jobs (%s open)", len(job_board.jobs()), len(job_board.jobs('open')))
+
+def job_partition(state):
+    """The JobPartition a candidate state belongs to"""
+    return job_board.partition(state.get('job_id'))
 
 def load_candidate_states():
-    """Load candidate states from file"""
+    """Load candidate states: the latest snapshot with the event log replayed on top"""
     try:
-        if os.path.exists(CANDIDATE_STATES_FILE):
-            with open(CANDIDATE_STATES_FILE, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                print(f"Loaded {len(data)} candidate states from file")
-                return data
+        return state_store.load()
     except Exception as e:
-        print(f"Error loading candidate states: {e}")
-        try:
-            if os.path.exists(CANDIDATE_STATES_FILE):
-                backup_file = f"{CANDIDATE_STATES_FILE}.backup"
-                os.rename(CANDIDATE_STATES_FILE, backup_file)
-                print(f"Backed up corrupted file to {backup_file}")
-        except:
-            pass
+        logger.error("Error loading candidate states: %s", e)
     return {}
 
-def save_candidate_states(states):
-    """Save candidate states to file"""
+def save_candidate_states(states, changed=None, event='updated'):
+    """
+    Persist candidate states. With `changed` (candidate IDs) only those
+    candidates are appended to the event log, as `event` ('submitted',
+    'scored', 'completed', ...); without it the whole store is written as a
+    new snapshot. Other processes' changes are merged in first, under the
+    log lock, so a candidate archived elsewhere is written as deleted rather
+    than brought back and a key another worker changed is not overwritten.
+    """
     try:
-        backup_file = f"{CANDIDATE_STATES_FILE}.backup"
-        if os.path.exists(CANDIDATE_STATES_FILE):
-            if os.path.exists(backup_file):
-                try:
-                    os.remove(backup_file)
-                    print(f"[DEBUG] Removed old backup file: {backup_file}")
-                except Exception as e:
-                    print(f"[ERROR] Could not remove backup file: {e}")
-            try:
-                os.rename(CANDIDATE_STATES_FILE, backup_file)
-                print(f"[DEBUG] Backed up candidate states file to: {backup_file}")
-            except Exception as e:
-                print(f"[ERROR] Could not backup candidate states file: {e}")
-        with open(CANDIDATE_STATES_FILE, 'w', encoding='utf-8') as f:
-            json.dump(states, f, indent=2, ensure_ascii=False)
-        print(f"[INFO] Saved {len(states)} candidate states to file: {CANDIDATE_STATES_FILE}")
+        with track_dependency('state_save'):
+            if changed is None:
+                state_store.replace_all(states)
+                written = state_store.size()
+            elif states is candidate_states:
+                with _state_follow_lock, state_store.exclusive():
+                    _apply_state_log(removed=[candidate_id for candidate_id in changed
+                                              if candidate_id not in states])
+                    written = state_store.put_many(states, changed, event)
+            else:
+                written = state_store.put_many(states, changed, event)
     except Exception as e:
-        print(f"[ERROR] Error saving candidate states: {e}")
-        try:
-            backup_file = f"{CANDIDATE_STATES_FILE}.backup"
-            if os.path.exists(backup_file):
-                os.rename(backup_file, CANDIDATE_STATES_FILE)
-                print("[INFO] Restored candidate states from backup file after save failure.")
-        except Exception as e2:
-            print(f"[ERROR] Could not restore from backup file: {e2}")
+        logger.error("Error saving candidate states: %s", e)
+        return
+    STATE_FILE_BYTES.observe(written)
+
+def record_candidate_event(candidate_id, event, **data):
+    """Audit-only entry in the candidate event log (e.g. an email that was sent)"""
+    try:
+        state_store.append(candidate_id, event, **data)
+    except Exception as e:
+        logger.error("Error recording %s event for %s: %s", event, candidate_id, e)
+
+_LEGACY_TOKEN_RE = re.compile(r'^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$')
+
+def stage_link(endpoint, candidate_id):
+    """External URL for a stage route carrying a signed, expiring token"""
+    stage = LINK_STAGES[endpoint]
+    token = make_stage_token(candidate_id, stage, app.config['SECRET_KEY'], STAGE_LINK_TTL[stage])
+    return url_for(endpoint, token=token, _external=True)
+
+def legacy_link_stage(state):
+    """Stage of the last plain UUID link emailed to a candidate: the first one not passed yet"""
+    for stage in ('coding_test', 'tech_interview', 'hr_interview'):
+        if not state.get(f'{stage}_completed'):
+            return stage
+    return 'offer_letter'
+
+def resolve_stage_token(token, link_type):
+    """
+    Verify a link token for a stage. Signed tokens are checked with HMAC before
+    any state lookup. Returns (candidate_id, error) where error is None,
+    'invalid', 'wrong_stage' or 'expired'.
+    """
+    candidate_id, error = verify_stage_token(token, link_type, app.config['SECRET_KEY'])
+    if error == 'invalid' and ACCEPT_LEGACY_LINKS and _LEGACY_TOKEN_RE.match(token or ''):
+        state = candidate_states.get(token)
+        # Candidates recorded since signed links have created_at and never got a UUID link
+        if state is not None and 'created_at' not in state and legacy_link_stage(state) == link_type:
+            candidate_id, error = token, None
+    if candidate_id is not None and candidate_id not in candidate_states:
+        # Candidates swept into the cold archive had their links expired
+        return None, 'expired' if cold_archive.entry(candidate_id) else 'invalid'
+    return candidate_id, error
 
 def check_and_mark_link_used(token, link_type):
     """
     Check if a link is valid and if the test/interview has been completed.
-    Returns (is_valid, is_completed)
+    Returns (candidate_id, is_completed, error); candidate_id is None for invalid links.
     """
-    state = candidate_states.get(token)
-    if not state:
-        return False, False
+    candidate_id, error = resolve_stage_token(token, link_type)
+    if not candidate_id:
+        return None, False, error
     
     # Check if this specific test/interview has been completed
     completed_key = f'{link_type}_completed'
-    if state.get(completed_key, False):
-        return True, True  # Link exists and has been completed
+    if candidate_states[candidate_id].get(completed_key, False):
+        return candidate_id, True, None  # Link exists and has been completed
     
-    return True, False  # Link exists but not completed yet
-
-def mark_test_completed(token, link_type):
-    """Mark a test/interview as completed"""
-    state = candidate_states.get(token)
-    if state:
-        state[f'{link_type}_completed'] = True
-        state[f'{link_type}_completed_at'] = datetime.now().isoformat()
-        candidate_states[token] = state
-        save_candidate_states(candidate_states)
-
-def get_unique_question(question_type, candidate_email=None):
+    return candidate_id, False, None  # Link exists but not completed yet
+
+def link_error_page(stage_label, error):
+    if error == 'expired':
+        return render_template('error.html', 
+                             message=f"This {stage_label} link has expired.",
+                             suggestion="Please contact support to receive a new link.")
+    return render_template('error.html', 
+                         message=f"Invalid or expired {stage_label} link.",
+                         suggestion="Please check your email for the correct link or contact support.")
+
+JUDGE0_ERROR_OUTPUTS = ("Judge0 API error", "Judge0 connection error", "Judge0 timeout or error")
+
+def run_code_admitted(code, language, stdin):
+    """Submit code to Judge0 and wait for the output under the judge0 admission limits"""
+    def run():
+        with track_dependency('judge0'):
+            output = get_result(submit_code(code, language, stdin=stdin))
+            if output in JUDGE0_ERROR_OUTPUTS:
+                raise RuntimeError(output)
+            return output
+    return admission.call('judge0', run)
+
+def send_email_admitted(subject, recipients, body, mail):
+    with track_dependency('smtp'):
+        return admission.call('smtp', send_email, subject, recipients, body, mail)
+
+def send_message_admitted(msg):
+    with track_dependency('smtp'):
+        return admission.call('smtp', mail.send, msg)
+
+def kickoff_admitted(crew):
+    with track_dependency('llm'):
+        return admission.call('llm', crew.kickoff)
+
+def get_unique_question(question_type, candidate_email=None, difficulty=None, partition=None):
     """
     Get a unique question based on type and candidate history
     question_type: 'coding', 'tech', or 'hr'
     candidate_email: to track question history per candidate
+    partition: the candidate's job (its question bank and usage); default job if omitted
+    Returns (question, used_bits) where question is the bank entry and used_bits
+    the candidate's updated usage bitset for that type.
     """
-    if question_type == 'coding':
-        pool = CODING_QUESTION_POOL
-    elif question_type == 'tech':
-        pool = TECH_QUESTION_POOL
-    elif question_type == 'hr':
-        pool = HR_QUESTION_POOL
-    else:
-        return None
+    if question_type not in QUESTION_TYPES:
+        return None, 0
+    partition = partition or job_board.partition()
+    bank = partition.question_bank
     
     # If no email provided, return random question
     if not candidate_email:
-        if question_type == 'coding':
-            selected = random.choice(pool)
-            return selected['question'], selected['expected_output']
+        return bank.select(question_type, 0, difficulty)
+    
+    # Usage is tracked per normalized email across all of the candidate's tokens for the job
+    usage = partition.question_usage.setdefault(normalize_email(candidate_email), {})
+    used_bits = usage.get(question_type, 0)
+    question, updated_bits = bank.select(question_type, used_bits, difficulty, reset=False)
+    if question is None:
+        # Candidate has seen the whole bank: serve a fresh AI-generated question if one is buffered
+        question = question_generator.dequeue(question_type, difficulty, used_bits) if bank is question_bank else None
+        if question:
+            updated_bits = used_bits | (1 << question['id'])
         else:
-            return random.choice(pool), None
-    
-    # Track used questions per candidate
-    used_questions_key = f'used_{question_type}_questions'
-    used_questions = []
-    
-    # Check all candidate states for this email's history
-    for token, state in candidate_states.items():
-        if state.get('email') == candidate_email:
-            used_questions.extend(state.get(used_questions_key, []))
-    
-    # Remove duplicates
-    used_questions = list(set(used_questions))
-    
-    # Filter available questions
-    if question_type == 'coding':
-        available_questions = [q for q in pool if q['question'] not in used_questions]
-        if not available_questions:
-            # Reset if all questions used
-            available_questions = pool
-            used_questions = []
-        
-        selected = random.choice(available_questions)
-        return selected['question'], selected['expected_output'], used_questions + [selected['question']]
-    else:
-        available_questions = [q for q in pool if q not in used_questions]
-        if not available_questions:
-            # Reset if all questions used
-            available_questions = pool
-            used_questions = []
-        
-        selected = random.choice(available_questions)
-        return selected, None, used_questions + [selected]
+            question, updated_bits = bank.select(question_type, used_bits, difficulty)
+    usage[question_type] = updated_bits
+    return question, updated_bits
+
+def record_question_usage(state):
+    """Fold a candidate state's question usage into its job's per-email usage index"""
+    partition = job_partition(state)
+    usage = partition.question_usage.setdefault(normalize_email(state.get('email')), {})
+    for question_type in QUESTION_TYPES:
+        bits_key = f'used_{question_type}_question_bits'
+        if bits_key not in state:
+            # Migrate legacy text lists to bitsets
+            state[bits_key] = partition.question_bank.bits_for_texts(state.pop(f'used_{question_type}_questions', []))
+        usage[question_type] = usage.get(question_type, 0) | state[bits_key]
 
 def generate_question_with_ai_fallback(question_type, candidate_state=None):
     """
     Generate a question using AI with fallback to question pool
     """
     candidate_email = candidate_state.get('email') if candidate_state else None
-    
-    # Try to get unique question from pool first
-    if question_type == 'coding':
-        question, expected_output, updated_used = get_unique_question('coding', candidate_email)
-        if candidate_state and candidate_email:
-            candidate_state['used_coding_questions'] = updated_used
-        return question, expected_output
-    elif question_type == 'tech':
-        question, _, updated_used = get_unique_question('tech', candidate_email)
-        if candidate_state and candidate_email:
-            candidate_state['used_tech_questions'] = updated_used
-        return question
-    elif question_type == 'hr':
-        question, _, updated_used = get_unique_question('hr', candidate_email)
-        if candidate_state and candidate_email:
-            candidate_state['used_hr_questions'] = updated_used
-        return question
-    
-    # Fallback to AI generation only if pool is exhausted or unavailable
-    if CREWAI_AVAILABLE and question_type == 'coding':
-        try:
-            # AI generation logic here (existing code)
-            pass
-        except:
-            pass
+    partition = job_partition(candidate_state) if candidate_state else None
+    
+    # Try to get unique question from the job's bank first
+    question, used_bits = get_unique_question(question_type, candidate_email, partition=partition)
+    if question:
+        if candidate_state is not None:
+            id_key = 'question_id' if question_type == 'coding' else f'{question_type}_question_id'
+            candidate_state[id_key] = question['id']
+            if candidate_email:
+                candidate_state[f'used_{question_type}_question_bits'] = used_bits
+        if question_type == 'coding':
+            return question['question'], question.get('expected_output')
+        return question['question']
     
     # Final fallback
     if question_type == 'coding':
@@ -305,9 +460,16 @@ def generate_question_with_ai_fallback(question_type, candidate_state=None):
     else:
         return "Tell me about a challenging situation you faced at work and how you handled it."
 
-def analyze_code_quality(code, question, language='python'):
+def question_stdin(state):
+    """stdin for Judge0 runs: the question's first test case, else the legacy default"""
+    question = job_partition(state).question_bank.get(state.get('question_id')) or {}
+    test_cases = question.get('test_cases') or []
+    return test_cases[0].get('stdin', '') if test_cases else "2 3\n"
+
+def analyze_code_quality(code, question, language='python', rubric=None):
     """
     Analyze code quality with detailed scoring
+    rubric: compiled question rubric; looked up in the question bank when omitted
     """
     score = 0
     feedback_parts = []
@@ -370,35 +532,11 @@ def analyze_code_quality(code, question, language='python'):
         feedback_parts.append("✓ Meaningful variable names used")
     
     # Question-specific checks (20 points)
-    question_lower = question.lower()
-    code_lower = code.lower()
-    
-    if 'factorial' in question_lower:
-        if any(keyword in code_lower for keyword in ['factorial', '!']):
-            score += 15
-        if 'math.factorial' in code_lower:
-            score += 5
-            feedback_parts.append("✓ Uses appropriate library function")
-    elif 'palindrome' in question_lower:
-        if any(keyword in code_lower for keyword in ['reverse', '[::-1]', 'reversed']):
-            score += 15
-            feedback_parts.append("✓ Palindrome logic implemented")
-    elif 'even' in question_lower:
-        if '%' in code or 'mod' in code_lower:
-            score += 15
-            feedback_parts.append("✓ Modulo operation for even numbers")
-    elif 'sum' in question_lower:
-        if 'sum(' in code_lower:
-            score += 10
-            feedback_parts.append("✓ Sum function used appropriately")
-    elif 'largest' in question_lower or 'maximum' in question_lower:
-        if 'max(' in code_lower:
-            score += 10
-            feedback_parts.append("✓ Max function used")
-    elif 'prime' in question_lower:
-        if any(keyword in code_lower for keyword in ['%', 'mod', 'sqrt']):
-            score += 15
-            feedback_parts.append("✓ Prime number logic implemented")
+    if rubric is None:
+        rubric = question_bank.rubric_for(text=question)
+    rubric_points, rubric_feedback = score_rubric(rubric, code)
+    score += rubric_points
+    feedback_parts.extend(rubric_feedback)
     
     # Ensure score doesn't exceed 100
     score = min(score, 100)
@@ -422,9 +560,10 @@ def analyze_code_quality(code, question, language='python'):
         'recommendation': recommendation
     }
 
-def analyze_technical_answer(answer, question):
+def analyze_technical_answer(answer, question, rubric=None):
     """
     Analyze technical interview answer quality
+    rubric: compiled question rubric; looked up in the question bank when omitted
     """
     score = 0
     feedback_parts = []
@@ -441,23 +580,12 @@ def analyze_technical_answer(answer, question):
         feedback_parts.append("✗ Answer too brief")
     
     # Technical terms and concepts (40 points)
-    question_lower = question.lower()
     answer_lower = answer.lower()
-    
-    if 'list' in question_lower and 'tuple' in question_lower:
-        technical_terms = ['mutable', 'immutable', 'ordered', 'changeable', 'brackets', 'parentheses']
-        found_terms = [term for term in technical_terms if term in answer_lower]
-        score += min(len(found_terms) * 5, 25)
-        if found_terms:
-            feedback_parts.append(f"✓ Technical terms used: {', '.join(found_terms)}")
-    elif 'decorator' in question_lower:
-        technical_terms = ['function', 'wrapper', '@', 'higher-order', 'modify', 'enhance']
-        found_terms = [term for term in technical_terms if term in answer_lower]
-        score += min(len(found_terms) * 5, 25)
-    elif 'generator' in question_lower:
-        technical_terms = ['yield', 'iterator', 'memory', 'lazy', 'next()']
-        found_terms = [term for term in technical_terms if term in answer_lower]
-        score += min(len(found_terms) * 5, 25)
+    if rubric is None:
+        rubric = question_bank.rubric_for(text=question)
+    rubric_points, rubric_feedback = score_rubric(rubric, answer)
+    score += rubric_points
+    feedback_parts.extend(rubric_feedback)
     
     # Examples and practical application (20 points)
     if any(keyword in answer_lower for keyword in ['example', 'for instance', 'such as', 'like']):
@@ -500,9 +628,10 @@ def analyze_technical_answer(answer, question):
         'recommendation': recommendation
     }
 
-def analyze_hr_answer(answer, question):
+def analyze_hr_answer(answer, question, rubric=None):
     """
     Analyze HR interview answer quality
+    rubric: compiled question rubric; looked up in the question bank when omitted
     """
     score = 0
     feedback_parts = []
@@ -567,6 +696,13 @@ def analyze_hr_answer(answer, question):
         score += 5
         feedback_parts.append("✓ Shows interpersonal awareness")
     
+    # Question-specific rubric
+    if rubric is None:
+        rubric = question_bank.rubric_for(text=question)
+    rubric_points, rubric_feedback = score_rubric(rubric, answer)
+    score += rubric_points
+    feedback_parts.extend(rubric_feedback)
+    
     # Ensure score doesn't exceed 100
     score = min(score, 100)
     
@@ -593,13 +729,83 @@ def analyze_hr_answer(answer, question):
 candidate_states = load_candidate_states()
 
 if not candidate_states:
-    print("No candidate states loaded from file, starting with empty state")
+    logger.info("No candidate states loaded from file, starting with empty state")
     candidate_states = {}
 
 if not os.path.exists(CANDIDATE_STATES_FILE):
-    print(f"Creating new candidate states file: {CANDIDATE_STATES_FILE}")
+    logger.info("Creating new candidate states file: %s", CANDIDATE_STATES_FILE)
     save_candidate_states(candidate_states)
 
+# Per-job, per-email question usage bitsets (also migrates legacy used_*_questions lists)
+for _state in candidate_states.values():
+    record_question_usage(_state)
+
+# Candidates ordered by creation time for cursor-paginated admin listings (all
+# jobs), and per job: creation order plus the near-duplicate application index
+# (MinHash/LSH over resumes + normalized emails)
+candidate_index = CandidateIndex()
+_job_ids = set()
+for _token, _state in candidate_states.items():
+    candidate_index.add(_token, _state.get('created_at'))
+    _partition = job_partition(_state)
+    _partition.candidates.add(_token, _state.get('created_at'))
+    _signature = _state.get('resume_minhash') or minhash_signature(_state.get('resume_text', ''))
+    _partition.duplicates.add(_token, _signature, _state.get('email'))
+    _job_ids.add(_partition.job.id)
+logger.info("Candidate indexes built for %s jobs", len(_job_ids))
+del _job_ids
+
+# Funnel counts, score histograms and stage timings, rebuilt from stored states
+analytics = PipelineAnalytics()
+
+def rebuild_analytics():
+    """
+    Recompute the global and per-job analytics from the hot candidates plus
+    the cold archive, so archived candidates keep counting. Returns the
+    number of candidates counted.
+    """
+    scopes = [analytics] + [partition.analytics for partition in job_board.partitions()]
+    for scope in scopes:
+        scope.reset()
+    # A candidate still in the hot store after being archived (interrupted sweep) counts once
+    archived = (state for entry, state in cold_archive.find() if entry['id'] not in candidate_states)
+    counted = 0
+    for state in itertools.chain(list(candidate_states.values()), archived):
+        analytics.record_state(state)
+        job_partition(state).analytics.record_state(state)
+        counted += 1
+    return counted
+
+rebuild_analytics()
+
+def find_duplicate_application(email, resume_signature=None, partition=None):
+    """Return (token, similarity, reason) of the best matching candidate for the same job, or None"""
+    partition = partition or job_board.partition()
+    for match in partition.duplicates.query(resume_signature, email):
+        if match[0] in candidate_states:
+            return match
+    return None
+
+def handle_duplicate_application(match, name, email, filename):
+    """Apply DUPLICATE_POLICY to a matched application. Returns True if the submission was absorbed."""
+    existing_token, similarity, reason = match
+    logger.info("Duplicate application from %s matches token %s (%s, similarity %.2f)", email, existing_token, reason, similarity)
+    if DUPLICATE_POLICY == 'flag':
+        return False
+    if DUPLICATE_POLICY == 'merge':
+        existing = candidate_states[existing_token]
+        existing.setdefault('duplicate_submissions', []).append({
+            'name': name,
+            'email': email,
+            'filename': filename,
+            'reason': reason,
+            'similarity': round(similarity, 3),
+            'submitted_at': datetime.now().isoformat()
+        })
+        candidate_states[existing_token] = existing
+        save_candidate_states(candidate_states, [existing_token], 'duplicate_merged')
+    return True
+
 # CrewAI Agents
 def create_resume_screening_agent():
     """Agent for screening resumes and initial candidate evaluation"""
@@ -671,6 +877,245 @@ def create_offer_letter_agent():
         llm=ChatOpenAI(model="gpt-4", temperature=0.1)
     )
 
+def create_candidate_record(partition, name, email, skills, resume_text, resume_signature,
+                            question=None, expected_output=None, **extra):
+    """Mint a token and add a shortlisted candidate for the partition's job to candidate_states (caller saves)"""
+    token = str(uuid.uuid4())
+    created_at = datetime.now().isoformat()
+    candidate_states[token] = {
+        'job_id': partition.job.id,
+        'name': name,
+        'email': email,
+        'resume_text': resume_text,
+        'skills': skills,
+        'question': question,
+        'expected_output': expected_output,
+        'coding_test_completed': False,
+        'tech_interview_completed': False,
+        'hr_interview_completed': False,
+        'used_coding_question_bits': 0,
+        'used_tech_question_bits': 0,
+        'used_hr_question_bits': 0,
+        'resume_minhash': resume_signature,
+        'created_at': created_at,
+        **extra
+    }
+    candidate_index.add(token, created_at)
+    analytics.record_shortlisted(created_at)
+    partition.candidates.add(token, created_at)
+    partition.duplicates.add(token, resume_signature, email)
+    partition.analytics.record_shortlisted(created_at)
+    return token
+
+def index_candidate(candidate_id, state):
+    """Add a stored candidate (e.g. written by another process) to the indexes and question usage"""
+    candidate_index.add(candidate_id, state.get('created_at'))
+    partition = job_partition(state)
+    partition.candidates.add(candidate_id, state.get('created_at'))
+    signature = state.get('resume_minhash') or minhash_signature(state.get('resume_text', ''))
+    partition.duplicates.add(candidate_id, signature, state.get('email'))
+    record_question_usage(state)
+
+def unindex_candidate(candidate_id, state):
+    """Drop a candidate that left the hot store from every index"""
+    candidate_index.remove(candidate_id, state.get('created_at'))
+    partition = job_partition(state)
+    partition.candidates.remove(candidate_id, state.get('created_at'))
+    partition.duplicates.remove(candidate_id, state.get('email'))
+
+def follow_state_log(force=False):
+    """
+    Apply what other processes wrote to the state log since the last check,
+    at most every STATE_FOLLOW_INTERVAL seconds unless forced. Returns the
+    number of candidates applied.
+    """
+    if not force and time.monotonic() - _state_followed_at < STATE_FOLLOW_INTERVAL:
+        return 0
+    if not _state_follow_lock.acquire(blocking=force):
+        return 0  # another thread is applying them
+    try:
+        return _apply_state_log()
+    finally:
+        _state_follow_lock.release()
+
+def _apply_state_log(removed=()):
+    """
+    follow_state_log() with _state_follow_lock held: new candidates (bulk
+    ingest) are indexed, archived ones dropped and changed ones merged into
+    the in-memory dict in place (keys changed here and not written yet are
+    kept), with the analytics aggregates updated to match. Candidates in
+    `removed` (about to be written as deleted) are not brought back.
+    """
+    global _state_followed_at
+    try:
+        _state_followed_at = time.monotonic()
+        removed = set(removed)
+        changes = state_store.follow()
+        if changes is None:
+            # Compacted segments are not kept (STATE_LOG_ARCHIVE=false): compare with a fresh load
+            stored = state_store.load()
+            changes = {candidate_id: state for candidate_id, state in stored.items()
+                       if candidate_states.get(candidate_id) != state}
+            changes.update((candidate_id, None) for candidate_id in list(candidate_states) if candidate_id not in stored)
+        for candidate_id, state in changes.items():
+            current = candidate_states.get(candidate_id)
+            if candidate_id in removed and state is not None:
+                continue
+            if state is None:
+                state_store.merge(candidate_id, current, None)
+                if current is not None:
+                    unindex_candidate(candidate_id, candidate_states.pop(candidate_id))
+            elif current is None:
+                candidate_states[candidate_id] = state_store.merge(candidate_id, None, state)
+                index_candidate(candidate_id, state)
+                analytics.record_state(state)
+                job_partition(state).analytics.record_state(state)
+            else:
+                previous = dict(current)
+                state_store.merge(candidate_id, current, state)
+                # Scores and completions recorded by the other process reach this one's aggregates too
+                analytics.record_state(current, previous)
+                job_partition(current).analytics.record_state(current, previous)
+                record_question_usage(current)
+        if changes:
+            logger.info("Applied %s candidate changes from other processes", len(changes))
+        return len(changes)
+    except Exception as e:
+        logger.error("Error following the candidate state log: %s", e)
+        return 0
+
+def sweep_candidates(dry_run=False, now=None):
+    """
+    Move expired (idle in progress) and long-finished candidates to the cold
+    archive, drop them from the hot store and every index, compact the store
+    and delete uploads no remaining candidate references. Returns counts.
+
+    Running web workers drop the archived candidates when they next follow
+    the state log (before a request, and before every state write, so a
+    worker never writes an archived candidate back).
+    """
+    start = time.perf_counter()
+    selected = select_for_archive(candidate_states, now or datetime.now(), CANDIDATE_EXPIRE_DAYS,
+                                  CANDIDATE_ARCHIVE_DAYS)
+    reasons = {}
+    for _candidate_id, reason in selected:
+        reasons[reason] = reasons.get(reason, 0) + 1
+    if selected and not dry_run:
+        cold_archive.write([(candidate_id, candidate_states[candidate_id], reason)
+                            for candidate_id, reason in selected], now)
+        for candidate_id, _reason in selected:
+            unindex_candidate(candidate_id, candidate_states.pop(candidate_id))
+        # Deletion events, then fold them into a smaller snapshot right away
+        save_candidate_states(candidate_states, [candidate_id for candidate_id, _reason in selected], 'archived')
+        state_store.compact()
+    archived = {candidate_id for candidate_id, _reason in selected}
+    live = [state for candidate_id, state in list(candidate_states.items()) if candidate_id not in archived]
+    upload_dir = app.config['UPLOAD_FOLDER']
+    referenced = {os.path.abspath(state['resume_path']) for state in live if state.get('resume_path')}
+    referenced.update(os.path.abspath(os.path.join(upload_dir, f"{d['email']}_{d['filename']}"))
+                      for state in live for d in state.get('duplicate_submissions') or ()
+                      if d.get('email') and d.get('filename'))
+    # Records written before resume_path was stored only match their upload by its "<email>_" name;
+    # while any remain, uploads named some other way cannot be ruled out as theirs either
+    legacy = [state for state in live if not state.get('resume_path')]
+    keep_prefixes = {f"{state['email']}_" for state in legacy if state.get('email')}
+    uploads, upload_bytes = delete_orphan_uploads(upload_dir, referenced, UPLOAD_ORPHAN_GRACE_HOURS, dry_run,
+                                                  keep_prefixes, keep_unattributed=bool(legacy))
+    result = {'archived': len(selected), 'reasons': reasons,
+              'remaining': len(candidate_states) - (len(selected) if dry_run else 0),
+              'orphaned_uploads': uploads, 'orphaned_upload_bytes': upload_bytes, 'dry_run': dry_run,
+              'seconds': round(time.perf_counter() - start, 3)}
+    logger.info("Lifecycle sweep: %s", result)
+    return result
+
+def generate_question_with_agent(question_type, difficulty):
+    """Ask the coding/technical agent for a new question as JSON (used by the background generator)"""
+    if question_type == 'coding':
+        agent = create_coding_assessment_agent()
+        details = """"expected_output": a short description of the expected result for a sample input,
+                "test_cases": a list of {"stdin": ..., "expected_output": ...} objects,"""
+    else:
+        agent = create_technical_interview_agent()
+        details = ""
+    task = Task(
+        description=f"""
+        Write one new {difficulty} {'coding' if question_type == 'coding' else 'technical interview'} question
+        for an entry level Python developer. It must differ from common textbook questions.
+        
+        Return only a JSON object with these keys:
+        "question": the question text,
+        {details}
+        "tags": up to 3 topic tags,
+        "keywords": up to 6 lowercase keywords a good answer is expected to contain
+        """,
+        agent=agent,
+        expected_output="JSON object describing the question"
+    )
+    crew = Crew(agents=[agent], tasks=[task], verbose=False, process=Process.sequential)
+    return str(kickoff_admitted(crew))
+
+# AI-generated questions are kept apart from the curated bank file
+GENERATED_QUESTIONS_FILE = os.getenv('GENERATED_QUESTIONS_FILE', os.path.join('questions', 'generated_questions.json'))
+question_generator = QuestionGenerator(
+    question_bank,
+    GENERATED_QUESTIONS_FILE,
+    generate_question_with_agent,
+    question_types=[t.strip() for t in os.getenv('GENERATED_QUESTION_TYPES', 'coding,tech').split(',') if t.strip()],
+    buffer_size=int(os.getenv('QUESTION_BUFFER_SIZE', 3)),
+    interval=int(os.getenv('QUESTION_GENERATOR_INTERVAL', 60))
+)
+QUESTION_GENERATOR_ENABLED = CREWAI_AVAILABLE and os.getenv('QUESTION_GENERATOR_ENABLED', 'true').lower() == 'true'
+
+@app.before_request
+def start_background_workers():
+    # Started on first request so CLI commands and imports don't spawn LLM work
+    if QUESTION_GENERATOR_ENABLED:
+        question_generator.start()
+
+@app.before_request
+def follow_other_processes():
+    follow_state_log()
+
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+    g.request_id = request.headers.get('X-Request-ID') or uuid.uuid4().hex
+    request_id_var.set(g.request_id)
+
+@app.after_request
+def record_request_latency(response):
+    start = g.pop('request_start', None)
+    if start is not None:
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        REQUEST_LATENCY.labels(route=route, method=request.method,
+                               status=response.status_code).observe(time.perf_counter() - start)
+    if 'request_id' in g:
+        response.headers['X-Request-ID'] = g.request_id
+    return response
+
+@app.after_request
+def compress_html(response):
+    if HTML_COMPRESSION:
+        return static_assets.compress_response(response, request.accept_encodings, HTML_COMPRESSION_MIN_BYTES)
+    return response
+
+@app.teardown_request
+def clear_request_id(exc=None):
+    request_id_var.set(None)
+
+@app.template_global()
+def asset_url(name):
+    """URL of a static bundle (content-hashed once built)"""
+    return url_for('static_asset', filename=asset_manifest.get(name, name))
+
+@app.route('/assets/<path:filename>')
+def static_asset(filename):
+    """Built bundles with far-future cache headers, pre-compressed per Accept-Encoding"""
+    response = static_assets.send_asset(app.static_folder, filename, request.accept_encodings)
+    if response is None:
+        abort(404)
+    return response
+
 # Flask Routes
 @app.route('/form', methods=['GET', 'POST'])
 def candidate_form():
@@ -679,23 +1124,43 @@ def candidate_form():
         email = request.form['email']
         skills = request.form['skills']
         resume = request.files['resume']
+        job = job_board.get(request.form.get('job_id') or DEFAULT_JOB.id)
         
         if not (name and email and skills and resume and resume.filename):
             flash('All fields are required!', 'danger')
             return redirect(request.url)
+        if job is None or not job.is_open:
+            flash('This position is not open for applications.', 'danger')
+            return redirect(request.url)
+        partition = job_board.partition(job.id)
         
+        # Same applicant for the same job by email: short-circuit before saving and parsing the resume
+        match = find_duplicate_application(email, partition=partition)
+        if match and handle_duplicate_application(match, name, email, resume.filename):
+            flash('We already have your application on file. Please use the link from your earlier email.', 'info')
+            return redirect(url_for('candidate_form'))
+        
+        record_funnel('applied')
         filename = f"{email}_{resume.filename}"
         resume_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
         resume.save(resume_path)
-        resume_text = parse_resume(resume_path)
+        with track_dependency('parse_resume'):
+            resume_text = parse_resume(resume_path)
+        resume_signature = minhash_signature(resume_text)
         
-        # Set JD to entry level Python developer
-        JD = "Entry level Python developer"
+        # Near-duplicate resume under a different email
+        match = find_duplicate_application(email, resume_signature, partition)
+        duplicate_of = None
+        if match:
+            if handle_duplicate_application(match, name, email, resume.filename):
+                flash('We already have your application on file. Please use the link from your earlier email.', 'info')
+                return redirect(url_for('candidate_form'))
+            duplicate_of = match[0]
         
-        # If 'python' is in skills, auto-select
-        if 'python' in skills.lower():
+        # Skills matching the job's screening keywords are auto-selected
+        if job.shortlists(skills):
             # Generate unique coding question
-            candidate_state_temp = {'email': email}
+            candidate_state_temp = {'email': email, 'job_id': job.id}
             question, expected_output = generate_question_with_ai_fallback('coding', candidate_state_temp)
             decision = "YES"
         else:
@@ -705,40 +1170,33 @@ def candidate_form():
         
         if decision == "YES":
             # Generate a new token for this candidate
-            token = str(uuid.uuid4())
-            print(f"[INFO] Candidate {name} ({email}) auto-selected. Token: {token}")
-            candidate_states[token] = {
-                'name': name,
-                'email': email,
-                'resume_text': resume_text,
-                'skills': skills,
-                'question': question,
-                'expected_output': expected_output,
-                'coding_test_completed': False,
-                'tech_interview_completed': False,
-                'hr_interview_completed': False,
-                'used_coding_questions': [question] if question else [],
-                'used_tech_questions': [],
-                'used_hr_questions': []
-            }
-            save_candidate_states(candidate_states)
+            extra = {k: v for k, v in candidate_state_temp.items() if k not in ('email', 'job_id')}
+            extra['resume_path'] = resume_path
+            if duplicate_of:
+                extra['duplicate_of'] = duplicate_of
+            token = create_candidate_record(partition, name, email, skills, resume_text, resume_signature,
+                                            question, expected_output, **extra)
+            logger.info("Candidate %s (%s) auto-selected for %s. Token: %s", name, email, job.id, token)
+            record_funnel('shortlisted')
+            save_candidate_states(candidate_states, [token], 'submitted')
             
-            coding_link = url_for('coding_test', token=token, _external=True)
-            print(f"[INFO] Coding test link generated: {coding_link}")
+            coding_link = stage_link('coding_test', token)
+            logger.info("Coding test link generated: %s", coding_link)
             try:
-                send_email(
+                send_email_admitted(
                     subject='Coding Assessment Link',
                     recipients=[email],
-                    body=f"Hi {name},\n\nYou have been shortlisted! Please take your coding test here: {coding_link}\n\nBest,\nHiring Team",
+                    body=f"Hi {name},\n\nYou have been shortlisted for the {job.title} position! Please take your coding test here: {coding_link}\n\nBest,\nHiring Team",
                     mail=mail
                 )
+                record_candidate_event(token, 'emailed', subject='Coding Assessment Link')
                 flash('You have been shortlisted! Check your email for the coding test link.', 'success')
             except Exception as e:
-                print(f"[ERROR] Error sending email: {e}")
+                logger.error("Error sending email: %s", e)
                 flash('You have been shortlisted! Please check your email for the coding test link.', 'success')
         else:
             try:
-                send_email(
+                send_email_admitted(
                     subject='Application Update',
                     recipients=[email],
                     body=f"Hi {name},\n\nThank you for applying. Unfortunately, you do not match our requirements at this time.\n\nBest,\nHiring Team",
@@ -746,506 +1204,421 @@ def candidate_form():
                 )
                 flash('Thank you for applying. You will receive an update by email.', 'info')
             except Exception as e:
-                print(f"[ERROR] Error sending email: {e}")
+                logger.error("Error sending email: %s", e)
                 flash('Thank you for applying. You will receive an update by email.', 'info')
         
         return redirect(url_for('candidate_form'))
     
-    return render_template('form.html')
+    jobs = job_board.jobs('open')
+    return render_template('form.html', jobs=jobs, selected_job=request.args.get('job') or DEFAULT_JOB.id)
 
-@app.route('/coding-test/<token>', methods=['GET', 'POST'])
-def coding_test(token):
-    print(f"Accessing coding test with token: {token}")
-    
-    # Check if link is valid and if test is completed
-    is_valid, is_completed = check_and_mark_link_used(token, 'coding_test')
-    
-    if not is_valid:
-        return render_template('error.html', 
-                             message="Invalid or expired coding test link.",
-                             suggestion="Please check your email for the correct link or contact support.")
-    
-    if is_completed:
-        # If test is completed, show the result
-        state = candidate_states.get(token)
-        if state and 'coding_analysis' in state:
-            analysis_result = state['coding_analysis']
-            if analysis_result['recommendation'] == 'PASS':
-                return render_template('coding_result.html', 
-                                    passed=True, 
-                                    score=analysis_result['score'],
-                                    feedback=analysis_result['feedback'],
-                                    next_stage="Technical Interview")
-            else:
-                return render_template('coding_result.html', 
-                                    passed=False, 
-                                    score=analysis_result['score'],
-                                    feedback=analysis_result['feedback'])
-    
-    state = candidate_states.get(token)
-    print(f"Found state for token {token}: {state.get('name', 'Unknown')}")
-    
-    # Ensure question exists
-    question = state.get('question')
-    if not question:
-        # Generate a unique question for this candidate
-        question, expected_output = generate_question_with_ai_fallback('coding', state)
-        state['question'] = question
-        state['expected_output'] = expected_output
-        candidate_states[token] = state
-        save_candidate_states(candidate_states)
-    
-    if request.method == 'POST':
-        code = request.form['code']
-        language = request.form['language']
+def fallback_offer_letter(name, job):
+    """The job's offer template, or the built-in offer letter when CrewAI is unavailable or fails"""
+    try:
+        offer_html = job.render_offer(name)
+        if offer_html:
+            return offer_html
+    except (OSError, ValueError) as e:
+        logger.error("Error reading offer template for %s: %s", job.id, e)
+    return render_template('offer_letter.html', letter=fallback_offer_body(name, job))
+
+def fallback_offer_body(name, job):
+    return Markup(f"""
+        <p>Dear {escape(name)},</p>
+        <p>We are delighted to offer you the position of <strong>{escape(job.title)}</strong> at our company.</p>
+        <p>Your exceptional performance throughout the interview process has demonstrated your technical skills, problem-solving abilities, and cultural fit with our organization.</p>
+        <p>We look forward to having you join our team and contribute to our continued success.</p>
+        <p>Please review the terms and conditions of this offer and let us know if you have any questions.</p>
+        <p>We are excited to welcome you aboard!</p>
+        <div class="signature">
+            <p>Best regards,<br>
+            Hiring Team</p>
+        </div>
+    """)
+
+def offer_letter_prompt(name, email, job):
+    return f"""
+        Generate a professional offer letter for the successful candidate:
         
-        # Submit code and get output
-        try:
-            submission_token = submit_code(code, language, stdin="2 3\n")
-            output = get_result(submission_token)
-        except Exception as e:
-            print(f"[ERROR] Error submitting code: {e}")
-            output = "Error executing code"
+        Name: {name}
+        Email: {email}
+        Position: {job.title}
+        Role: {job.description}
+        
+        The offer letter should:
+        1. Be professional and welcoming
+        2. Include all necessary details
+        3. Be formatted as HTML
+        4. Have a warm, positive tone
+        5. Include next steps for the candidate
         
-        # Use improved code analysis with AI fallback
+        Return only the letter body as HTML elements (paragraphs, lists, headings), without
+        <html>, <head> or <body> tags and without a code block; it is placed inside an existing page.
+        """
+
+def _offer_letter_chunks(name, email, job):
+    """The offer letter body as the LLM writes it: token chunks, or a single chunk from the offer-letter agent"""
+    prompt = offer_letter_prompt(name, email, job)
+    if OFFER_STREAMING:
+        for chunk in ChatOpenAI(model="gpt-4", temperature=0.1).stream(prompt):
+            if chunk.content:
+                yield chunk.content
+        return
+    agent = create_offer_letter_agent()
+    offer_task = Task(description=prompt, agent=agent, expected_output="HTML offer letter body")
+    offer_crew = Crew(agents=[agent], tasks=[offer_task], verbose=True, process=Process.sequential)
+    yield str(offer_crew.kickoff())
+
+def offer_letter_generation(candidate_id):
+    """
+    The generation of a candidate's offer letter, shared by every reader (the
+    offer page and the offer email): the one in progress, or a new one.
+    Returns None if the letter is already stored. Generation runs on its own
+    thread under the llm admission limits, whether or not anyone is still
+    reading, and stores the finished document in the candidate state (the
+    fallback letter if it fails).
+
+    Generations are shared within a process only: with several gunicorn
+    workers, the page and the email (or two tabs) served by different workers
+    can each generate a letter, and the last one stored wins.
+    """
+    with _offer_generations_lock:
+        if candidate_states[candidate_id].get('offer_letter_html'):
+            return None
+        generation = _offer_generations.get(candidate_id)
+        if generation is None:
+            generation = _offer_generations[candidate_id] = ChunkBroadcast()
+            threading.Thread(target=_generate_offer_letter, args=(candidate_id, generation),
+                             name='offer-letter', daemon=True).start()
+    return generation
+
+def _generate_offer_letter(candidate_id, generation):
+    state = candidate_states[candidate_id]
+    name = state.get('name', 'Candidate')
+    job = job_partition(state).job
+
+    def produce():
+        with track_dependency('llm'):
+            for chunk in strip_code_fence(_offer_letter_chunks(name, state.get('email', ''), job)):
+                generation.append(chunk)
+
+    try:
+        with app.app_context():
+            admission.call('llm', produce)
+            state['offer_letter_html'] = render_template('offer_letter.html', letter=Markup(generation.text()))
+        state['offer_letter_generated_at'] = datetime.now().isoformat()
+        save_candidate_states(candidate_states, [candidate_id], 'offer_generated')
+        generation.close()
+    except Exception as e:
+        logger.error("Error generating offer letter for %s: %s", candidate_id, e)
         try:
-            # First, use our improved analysis system
-            analysis_result = analyze_code_quality(code, question, language)
-            score = analysis_result['score']
-            recommendation = analysis_result['recommendation']
-            feedback = analysis_result['feedback']
-            
-            # If score is borderline, try to get AI enhancement (optional)
-            if CREWAI_AVAILABLE and 60 <= score <= 85:
-                try:
-                    evaluation_task = Task(
-                        description=f"""
-                        Review this coding solution analysis and provide additional insights:
-                        
-                        Question: {question}
-                        Code: {code}
-                        Current Score: {score}
-                        Current Feedback: {feedback}
-                        
-                        Provide additional feedback on:
-                        1. Code efficiency and optimization
-                        2. Edge case handling
-                        3. Best practices adherence
-                        4. Suggestions for improvement
-                        
-                        Return a brief enhancement to the existing feedback.
-                        """,
-                        agent=create_coding_assessment_agent(),
-                        expected_output="Additional feedback and insights"
-                    )
+            # Store the fallback so later views and the email show the letter the reader got
+            with app.app_context():
+                state['offer_letter_html'] = fallback_offer_letter(name, job)
+            state['offer_letter_generated_at'] = datetime.now().isoformat()
+            save_candidate_states(candidate_states, [candidate_id], 'offer_generated')
+        finally:
+            generation.close(e)
+    finally:
+        with _offer_generations_lock:
+            _offer_generations.pop(candidate_id, None)
+
+def stream_offer_letter(generation, name, job):
+    """
+    Chunked offer page: the page skeleton right away, then the letter as it
+    is generated; the fallback letter (the one stored for the candidate)
+    replaces a generation that fails.
+    """
+    head, tail = render_template('offer_letter.html', streaming=True, position=job.title,
+                                 letter=Markup(_STREAM_SPLIT)).split(_STREAM_SPLIT)
+    fallback = document_body(fallback_offer_letter(name, job))
+
+    def chunks():
+        yield head + '<div id="generated-letter">'
+        first = True
+        for chunk in generation.reader():
+            if first:
+                yield '<style>.loading { display: none; }</style>'
+                first = False
+            yield chunk
+        yield '</div>'
+        if generation.error is not None:
+            yield f'<style>body > .header, .loading, #generated-letter {{ display: none; }}</style>{fallback}'
+        yield tail
+
+    response = Response(chunks(), mimetype='text/html')
+    response.headers['Cache-Control'] = 'no-store'
+    response.headers['X-Accel-Buffering'] = 'no'  # let proxies pass chunks through
+    return response
+
+# Assessment pipeline: question source, scoring and notifications per stage
+
+def _assign_coding_question(state):
+    question, expected_output = generate_question_with_ai_fallback('coding', state)
+    state['expected_output'] = expected_output
+    return question
+
+def _score_coding(state, question, form):
+    code = form['code']
+    language = form['language']
+
+    # Submit code and get output
+    try:
+        run_code_admitted(code, language, question_stdin(state))
+    except Exception as e:
+        logger.error("Error submitting code: %s", e)
+
+    try:
+        rubric = job_partition(state).question_bank.rubric_for(state.get('question_id'), question)
+        analysis_result = analyze_code_quality(code, question, language, rubric)
+        score = analysis_result['score']
+        recommendation = analysis_result['recommendation']
+        feedback = analysis_result['feedback']
+
+        # If score is borderline, try to get AI enhancement (optional)
+        if CREWAI_AVAILABLE and 60 <= score <= 85:
+            try:
+                evaluation_task = Task(
+                    description=f"""
+                    Review this coding solution analysis and provide additional insights:
                     
-                    evaluation_crew = Crew(
-                        agents=[create_coding_assessment_agent()],
-                        tasks=[evaluation_task],
-                        verbose=True,
-                        process=Process.sequential
-                    )
+                    Question: {question}
+                    Code: {code}
+                    Current Score: {score}
+                    Current Feedback: {feedback}
                     
-                    ai_enhancement = evaluation_crew.kickoff()
-                    feedback += f"\n\nAI Enhancement: {ai_enhancement}"
-                    print(f"[INFO] AI enhancement added to analysis")
-                except Exception as e:
-                    print(f"[INFO] AI enhancement failed, using base analysis: {e}")
-            
-        except Exception as e:
-            print(f"[ERROR] Error in code analysis: {e}")
-            # Ultimate fallback
-            score = 50
-            recommendation = "FAIL"
-            feedback = f"Error during code analysis: {str(e)}. Please review code manually."
-        
-        analysis_result = {
-            'score': score,
-            'feedback': feedback,
-            'recommendation': recommendation
-        }
-        
-        email = state.get('email', 'candidate@example.com')
-        name = state.get('name', 'Candidate')
-        
-        # Store analysis results in state
-        state['coding_analysis'] = analysis_result
-        candidate_states[token] = state
-        save_candidate_states(candidate_states)
-        
-        print(f"[INFO] Coding test submitted for token {token}. Score: {analysis_result['score']}, Recommendation: {analysis_result['recommendation']}")
-        
-        if analysis_result['recommendation'] == 'PASS':
-            mark_test_completed(token, 'coding_test')
-            tech_link = url_for('tech_interview', token=token, _external=True)
-            try:
-                send_email(
-                    subject='Technical Interview Link',
-                    recipients=[email],
-                    body=f"Hi {name},\n\nCongratulations! You passed the coding test with a score of {analysis_result['score']}/100. Attend your technical interview here: {tech_link}\n\nBest,\nHiring Team",
-                    mail=mail
+                    Provide additional feedback on:
+                    1. Code efficiency and optimization
+                    2. Edge case handling
+                    3. Best practices adherence
+                    4. Suggestions for improvement
+                    
+                    Return a brief enhancement to the existing feedback.
+                    """,
+                    agent=create_coding_assessment_agent(),
+                    expected_output="Additional feedback and insights"
                 )
-            except Exception as e:
-                print(f"[ERROR] Error sending email: {e}")
-            
-            return render_template('coding_result.html', 
-                                passed=True, 
-                                score=analysis_result['score'],
-                                feedback=analysis_result['feedback'],
-                                next_stage="Technical Interview")
-        else:
-            try:
-                send_email(
-                    subject='Application Update',
-                    recipients=[email],
-                    body=f"Hi {name},\n\nThank you for participating. Unfortunately, you did not pass the coding test. Your score was {analysis_result['score']}/100.\n\nBest,\nHiring Team",
-                    mail=mail
+                evaluation_crew = Crew(
+                    agents=[create_coding_assessment_agent()],
+                    tasks=[evaluation_task],
+                    verbose=True,
+                    process=Process.sequential
                 )
+                ai_enhancement = kickoff_admitted(evaluation_crew)
+                feedback += f"\n\nAI Enhancement: {ai_enhancement}"
+                logger.info("AI enhancement added to analysis")
             except Exception as e:
-                print(f"[ERROR] Error sending email: {e}")
-            
-            return render_template('coding_result.html', 
-                                passed=False, 
-                                score=analysis_result['score'],
-                                feedback=analysis_result['feedback'])
-    
-    return render_template('coding_test.html', question=question)
+                logger.info("AI enhancement failed, using base analysis: %s", e)
+    except Exception as e:
+        logger.error("Error in code analysis: %s", e)
+        score = 50
+        recommendation = "FAIL"
+        feedback = f"Error during code analysis: {str(e)}. Please review code manually."
 
-@app.route('/tech-interview/<token>', methods=['GET', 'POST'])
-def tech_interview(token):
-    print(f"Accessing tech interview with token: {token}")
-    
-    # Check if link is valid and if interview is completed
-    is_valid, is_completed = check_and_mark_link_used(token, 'tech_interview')
-    
-    if not is_valid:
-        return render_template('error.html', 
-                             message="Invalid or expired technical interview link.",
-                             suggestion="Please check your email for the correct link or contact support.")
-    
-    if is_completed:
-        # If interview is completed, show the result
-        state = candidate_states.get(token)
-        if state and 'tech_analysis' in state:
-            analysis_result = state['tech_analysis']
-            if analysis_result['recommendation'] == 'PASS':
-                return render_template('tech_result.html', 
-                                    passed=True, 
-                                    score=analysis_result['score'],
-                                    feedback=analysis_result['feedback'],
-                                    next_stage="HR Interview")
-            else:
-                return render_template('tech_result.html', 
-                                    passed=False, 
-                                    score=analysis_result['score'],
-                                    feedback=analysis_result['feedback'])
-    
-    state = candidate_states.get(token)
-    print(f"Found state for token {token}: {state.get('name', 'Unknown')}")
-    
-    # Ensure question exists
-    question = state.get('tech_question')
-    if not question:
-        # Generate a unique technical question for this candidate
-        question = generate_question_with_ai_fallback('tech', state)
-        state['tech_question'] = question
-        candidate_states[token] = state
-        save_candidate_states(candidate_states)
-    else:
-        question = state['tech_question']
-    
-    if request.method == 'POST':
-        answer = request.form['answer']
-        
-        # Use improved technical analysis
+    return {'score': score, 'feedback': feedback, 'recommendation': recommendation}
+
+def _answer_scorer(analyzer, question_id_key, label):
+    """Scorer for free-text answers using a rubric-aware analyzer"""
+    def score(state, question, form):
         try:
-            analysis_result = analyze_technical_answer(answer, question)
-            score = analysis_result['score']
-            recommendation = analysis_result['recommendation']
-            feedback = analysis_result['feedback']
-            
-            print(f"[INFO] Technical analysis completed. Score: {score}")
-            
+            rubric = job_partition(state).question_bank.rubric_for(state.get(question_id_key), question)
+            result = analyzer(form['answer'], question, rubric)
+            logger.info("%s analysis completed. Score: %s", label, result['score'])
+            return {'score': result['score'], 'feedback': result['feedback'],
+                    'recommendation': result['recommendation']}
         except Exception as e:
-            print(f"[ERROR] Error in technical analysis: {e}")
-            # Ultimate fallback
-            score = 50
-            recommendation = "FAIL"
-            feedback = f"Error during technical analysis: {str(e)}. Please review answer manually."
-        
-        analysis_result = {
-            'score': score,
-            'feedback': feedback,
-            'recommendation': recommendation
-        }
-        
-        email = state.get('email', 'candidate@example.com')
-        name = state.get('name', 'Candidate')
-        
-        # Store analysis results in state
-        state['tech_analysis'] = analysis_result
-        candidate_states[token] = state
-        save_candidate_states(candidate_states)
-        
-        print(f"[INFO] Tech interview submitted for token {token}. Score: {analysis_result['score']}, Recommendation: {analysis_result['recommendation']}")
-        
-        if analysis_result['recommendation'] == 'PASS':
-            mark_test_completed(token, 'tech_interview')
-            hr_link = url_for('hr_interview', token=token, _external=True)
-            try:
-                send_email(
-                    subject='HR Interview Link',
-                    recipients=[email],
-                    body=f"Hi {name},\n\nCongratulations! You passed the technical interview with a score of {analysis_result['score']}/100. Attend your HR interview here: {hr_link}\n\nBest,\nHiring Team",
-                    mail=mail
-                )
-            except Exception as e:
-                print(f"[ERROR] Error sending email: {e}")
-            
-            return render_template('tech_result.html', 
-                                passed=True, 
-                                score=analysis_result['score'],
-                                feedback=analysis_result['feedback'],
-                                next_stage="HR Interview")
-        else:
-            try:
-                send_email(
-                    subject='Application Update',
-                    recipients=[email],
-                    body=f"Hi {name},\n\nThank you for participating. Unfortunately, you did not pass the technical interview. Your score was {analysis_result['score']}/100.\n\nBest,\nHiring Team",
-                    mail=mail
-                )
-            except Exception as e:
-                print(f"[ERROR] Error sending email: {e}")
-            
-            return render_template('tech_result.html', 
-                                passed=False, 
-                                score=analysis_result['score'],
-                                feedback=analysis_result['feedback'])
-    
-    return render_template('tech_interview.html', question=question)
+            logger.error("Error in %s analysis: %s", label, e)
+            return {'score': 50, 'recommendation': "FAIL",
+                    'feedback': f"Error during {label} analysis: {str(e)}. Please review answer manually."}
+    return score
+
+def _job_pass_score(stage_name, scorer):
+    """Apply the job's pass score for the stage, when it sets one, to the scorer's recommendation"""
+    def score(state, question, form):
+        analysis = scorer(state, question, form)
+        threshold = job_partition(state).job.pass_score(stage_name)
+        if threshold is not None:
+            analysis['recommendation'] = 'PASS' if analysis['score'] >= threshold else 'FAIL'
+        return analysis
+    return score
+
+def email_next_stage_link(event):
+    """Congratulate the candidate and send the link to the next stage"""
+    state, stage = event.state, event.stage
+    next_stage = pipeline[stage.next_stage]
+    send_email_admitted(
+        subject=f'{next_stage.title} Link',
+        recipients=[state.get('email', 'candidate@example.com')],
+        body=f"Hi {state.get('name', 'Candidate')},\n\nCongratulations! You passed the {stage.label} with a score of {event.analysis['score']}/100. Attend your {next_stage.label} here: {event.context['next_link']}\n\nBest,\nHiring Team",
+        mail=mail
+    )
+    record_candidate_event(event.candidate_id, 'emailed', subject=f'{next_stage.title} Link')
+
+def email_rejection(event):
+    state = event.state
+    send_email_admitted(
+        subject='Application Update',
+        recipients=[state.get('email', 'candidate@example.com')],
+        body=f"Hi {state.get('name', 'Candidate')},\n\nThank you for participating. Unfortunately, you did not pass the {event.stage.label}. Your score was {event.analysis['score']}/100.\n\nBest,\nHiring Team",
+        mail=mail
+    )
+    record_candidate_event(event.candidate_id, 'emailed', subject='Application Update')
+
+def email_offer_letter(event):
+    """Generate the offer letter (fallback template if CrewAI fails) and email it"""
+    name = event.state.get('name', 'Candidate')
+    email = event.state.get('email', 'candidate@example.com')
+    job = job_partition(event.state).job
+    if CREWAI_AVAILABLE and not job.offer_template:
+        # Shares the generation with an offer page opened meanwhile
+        generation = offer_letter_generation(event.candidate_id)
+        if generation is not None:
+            generation.wait()
+    offer_html = event.state.get('offer_letter_html')
+    msg = Message(
+        subject='🎉 Congratulations! Your Offer Letter',
+        recipients=[email],
+        body=f"Hi {name},\n\nCongratulations! You have cleared all rounds with a score of {event.analysis['score']}/100. Please find your offer letter in the email body.\n\nBest,\nHiring Team",
+        html=offer_html or fallback_offer_letter(name, job)
+    )
+    send_message_admitted(msg)
+    record_candidate_event(event.candidate_id, 'emailed', subject=msg.subject)
+    logger.info("Candidate %s passed HR interview. Offer letter link: %s", name, event.context.get('next_link'))
+
+PIPELINE_STAGES = [
+    Stage('coding_test', 'Coding Test', 'coding test',
+          analysis_key='coding_analysis', question_key='question',
+          assign_question=_assign_coding_question, score=_job_pass_score('coding_test', _score_coding),
+          template='coding_test.html', result_template='coding_result.html', answer_fields=('code', 'language'),
+          next_stage='tech_interview', on_pass=[email_next_stage_link], on_fail=[email_rejection]),
+    Stage('tech_interview', 'Technical Interview', 'technical interview',
+          analysis_key='tech_analysis', question_key='tech_question',
+          assign_question=lambda state: generate_question_with_ai_fallback('tech', state),
+          score=_job_pass_score('tech_interview',
+                                _answer_scorer(analyze_technical_answer, 'tech_question_id', 'technical')),
+          template='tech_interview.html', result_template='tech_result.html',
+          next_stage='hr_interview', on_pass=[email_next_stage_link], on_fail=[email_rejection]),
+    Stage('hr_interview', 'HR Interview', 'HR interview',
+          analysis_key='hr_analysis', question_key='hr_question',
+          assign_question=lambda state: generate_question_with_ai_fallback('hr', state),
+          score=_job_pass_score('hr_interview', _answer_scorer(analyze_hr_answer, 'hr_question_id', 'HR')),
+          template='hr_interview.html', result_template='hr_result.html',
+          on_pass=[email_offer_letter], on_fail=[email_rejection],
+          result_context=lambda candidate_id: {'offer_link': stage_link('view_offer_letter', candidate_id)}),
+]
+
+# Emails and offer generation run after the response unless SIDE_EFFECT_WORKERS=0
+side_effects = SideEffects(workers=int(os.getenv('SIDE_EFFECT_WORKERS', 4)), context=app.app_context)
+pipeline = PipelineEngine(PIPELINE_STAGES, candidate_states,
+                          persist=lambda candidate_id, event: save_candidate_states(candidate_states, [candidate_id], event),
+                          side_effects=side_effects)
+
+# Notifications still pending in the candidate state (failed sends, or queued when a process exited)
+# are resubmitted NOTIFICATION_RETRY_AFTER seconds after their last attempt
+NOTIFICATION_RETRY_INTERVAL = float(os.getenv('NOTIFICATION_RETRY_INTERVAL', 60))
+NOTIFICATION_RETRY_AFTER = float(os.getenv('NOTIFICATION_RETRY_AFTER', 300))
+NOTIFICATION_MAX_ATTEMPTS = int(os.getenv('NOTIFICATION_MAX_ATTEMPTS', 5))
+SIDE_EFFECT_DRAIN_TIMEOUT = float(os.getenv('SIDE_EFFECT_DRAIN_TIMEOUT', 20))
+_notifications_retried_at = time.monotonic()
+
+def retry_pending_notifications(force=False):
+    global _notifications_retried_at
+    if not force and time.monotonic() - _notifications_retried_at < NOTIFICATION_RETRY_INTERVAL:
+        return 0
+    _notifications_retried_at = time.monotonic()
+    return pipeline.retry_pending(NOTIFICATION_RETRY_AFTER, NOTIFICATION_MAX_ATTEMPTS)
+
+@app.before_request
+def retry_notifications():
+    retry_pending_notifications()
+
+def drain_side_effects():
+    """Let queued emails finish before the process exits; unfinished ones stay pending and are retried"""
+    left = side_effects.drain(SIDE_EFFECT_DRAIN_TIMEOUT)
+    if left:
+        logger.warning("Exiting with %s side effects still running; their notifications will be retried", left)
+
+atexit.register(drain_side_effects)
+
+@pipeline.subscribe
+def record_stage_event(event):
+    """Keep funnel metrics and analytics aggregates in step with stage transitions"""
+    job_analytics = job_partition(event.state).analytics
+    if event.kind == 'analyzed':
+        analytics.record_analysis(event.stage.name, event.analysis, event.previous)
+        job_analytics.record_analysis(event.stage.name, event.analysis, event.previous)
+    elif event.kind == 'passed':
+        record_funnel(f'{event.stage.name}_passed')
+        analytics.record_completion(event.state, event.stage.name)
+        job_analytics.record_completion(event.state, event.stage.name)
+
+def render_stage_result(stage, candidate_id, analysis):
+    passed = stage.passed(analysis)
+    context = {}
+    if passed:
+        if stage.next_stage:
+            context['next_stage'] = pipeline[stage.next_stage].title
+        if stage.result_context:
+            context.update(stage.result_context(candidate_id))
+    return render_template(stage.result_template, passed=passed, score=analysis['score'],
+                           feedback=analysis['feedback'], **context)
+
+_SUBMISSION_ID_RE = re.compile(r'^[0-9a-f]{32}$')
+
+def stage_view(stage_name, token):
+    """Shared GET/POST handler for every pipeline stage"""
+    stage = pipeline[stage_name]
+    logger.debug("Accessing %s with token: %s", stage.label, token)
+
+    candidate_id, _is_completed, error = check_and_mark_link_used(token, stage.name)
+    if not candidate_id:
+        return link_error_page(stage.label, error)
+
+    # A stage is scored once, pass or fail: revisits and resubmissions get the stored result
+    state = candidate_states[candidate_id]
+    if stage.analysis_key in state:
+        return render_stage_result(stage, candidate_id, state[stage.analysis_key])
+    previous = pipeline.previous(stage.name)
+    if previous and not state.get(f'{previous.name}_completed'):
+        return render_template('error.html',
+                             message=f"The {stage.label} is not available yet.",
+                             suggestion=f"You need to pass the {previous.label} first.")
+
+    if request.method == 'POST':
+        form = {field: request.form[field] for field in stage.answer_fields}
+        submission_id = request.form.get('submission_id', '')
+        if not _SUBMISSION_ID_RE.match(submission_id):
+            submission_id = None
+        # Links need the request context, so they are built here for the notifications
+        next_endpoint = stage.next_stage or 'view_offer_letter'
+        event = pipeline.submit(stage.name, candidate_id, form, submission_id=submission_id,
+                                context={'next_link': stage_link(next_endpoint, candidate_id)})
+        return render_stage_result(stage, candidate_id, event.analysis)
+
+    # Each render carries a fresh idempotency key, echoed back by the form
+    return render_template(stage.template, question=pipeline.question(stage.name, candidate_id),
+                           submission_id=uuid.uuid4().hex,
+                           proctoring_url=url_for('proctoring_events', stage_name=stage.name, token=token))
+
+@app.route('/coding-test/<token>', methods=['GET', 'POST'])
+def coding_test(token):
+    return stage_view('coding_test', token)
+
+@app.route('/tech-interview/<token>', methods=['GET', 'POST'])
+def tech_interview(token):
+    return stage_view('tech_interview', token)
 
 @app.route('/hr-interview/<token>', methods=['GET', 'POST'])
 def hr_interview(token):
-    print(f"Accessing HR interview with token: {token}")
-    
-    # Check if link is valid and if interview is completed
-    is_valid, is_completed = check_and_mark_link_used(token, 'hr_interview')
-    
-    if not is_valid:
-        return render_template('error.html', 
-                             message="Invalid or expired HR interview link.",
-                             suggestion="Please check your email for the correct link or contact support.")
-    
-    if is_completed:
-        # If interview is completed, show the result
-        state = candidate_states.get(token)
-        if state and 'hr_analysis' in state:
-            analysis_result = state['hr_analysis']
-            if analysis_result['recommendation'] == 'PASS':
-                offer_link = url_for('view_offer_letter', token=token, _external=True)
-                return render_template('hr_result.html', 
-                                    passed=True, 
-                                    score=analysis_result['score'],
-                                    feedback=analysis_result['feedback'],
-                                    offer_link=offer_link)
-            else:
-                return render_template('hr_result.html', 
-                                    passed=False, 
-                                    score=analysis_result['score'],
-                                    feedback=analysis_result['feedback'])
-    
-    state = candidate_states.get(token)
-    print(f"Found state for token {token}: {state.get('name', 'Unknown')}")
-    
-    # Ensure question exists
-    question = state.get('hr_question')
-    if not question:
-        # Generate a unique HR question for this candidate
-        question = generate_question_with_ai_fallback('hr', state)
-        state['hr_question'] = question
-        candidate_states[token] = state
-        save_candidate_states(candidate_states)
-    else:
-        question = state['hr_question']
-    
-    if request.method == 'POST':
-        answer = request.form['answer']
-        
-        # Use improved HR analysis
-        try:
-            analysis_result = analyze_hr_answer(answer, question)
-            score = analysis_result['score']
-            recommendation = analysis_result['recommendation']
-            feedback = analysis_result['feedback']
-            
-            print(f"[INFO] HR analysis completed. Score: {score}")
-            
-        except Exception as e:
-            print(f"[ERROR] Error in HR analysis: {e}")
-            # Ultimate fallback
-            score = 50
-            recommendation = "FAIL"
-            feedback = f"Error during HR analysis: {str(e)}. Please review answer manually."
-        
-        analysis_result = {
-            'score': score,
-            'feedback': feedback,
-            'recommendation': recommendation
-        }
-        
-        email = state.get('email', 'candidate@example.com')
-        name = state.get('name', 'Candidate')
-        
-        # Store analysis results in state
-        state['hr_analysis'] = analysis_result
-        candidate_states[token] = state
-        save_candidate_states(candidate_states)
-        
-        print(f"[INFO] HR interview submitted for token {token}. Score: {analysis_result['score']}, Recommendation: {analysis_result['recommendation']}")
-        
-        if analysis_result['recommendation'] == 'PASS':
-            mark_test_completed(token, 'hr_interview')
-            # Use CrewAI to generate offer letter
-            if CREWAI_AVAILABLE:
-                try:
-                    offer_task = Task(
-                        description=f"""
-                        Generate a professional offer letter for the successful candidate:
-                        
-                        Name: {name}
-                        Email: {email}
-                        Position: Python Developer
-                        
-                        The offer letter should:
-                        1. Be professional and welcoming
-                        2. Include all necessary details
-                        3. Be formatted as HTML
-                        4. Have a warm, positive tone
-                        5. Include next steps for the candidate
-                        
-                        Return the response as HTML formatted offer letter.
-                        """,
-                        agent=create_offer_letter_agent(),
-                        expected_output="HTML formatted offer letter"
-                    )
-                    
-                    offer_crew = Crew(
-                        agents=[create_offer_letter_agent()],
-                        tasks=[offer_task],
-                        verbose=True,
-                        process=Process.sequential
-                    )
-                    
-                    offer_result = offer_crew.kickoff()
-                    
-                    try:
-                        msg = Message(
-                            subject='🎉 Congratulations! Your Offer Letter',
-                            recipients=[email],
-                            body=f"Hi {name},\n\nCongratulations! You have cleared all rounds with a score of {analysis_result['score']}/100. Please find your offer letter in the email body.\n\nBest,\nHiring Team",
-                            html=offer_result
-                        )
-                        mail.send(msg)
-                    except Exception as e:
-                        print(f"[ERROR] Error sending offer email: {e}")
-                    
-                    # Add offer letter link to the result
-                    offer_link = url_for('view_offer_letter', token=token, _external=True)
-                    print(f"[INFO] Candidate {name} passed HR interview. Offer letter link: {offer_link}")
-                    return render_template('hr_result.html', 
-                                        passed=True, 
-                                        score=analysis_result['score'],
-                                        feedback=analysis_result['feedback'],
-                                        offer_link=offer_link)
-                except Exception as e:
-                    print(f"[ERROR] Error generating offer letter: {e}")
-                    # If offer letter generation fails, still show success
-                    offer_link = url_for('view_offer_letter', token=token, _external=True)
-                    return render_template('hr_result.html', 
-                                        passed=True, 
-                                        score=analysis_result['score'],
-                                        feedback=analysis_result['feedback'],
-                                        offer_link=offer_link,
-                                        email_error=True)
-            else:
-                # Fallback offer letter when CrewAI is not available
-                try:
-                    fallback_offer = f"""
-                    <!DOCTYPE html>
-                    <html>
-                    <head>
-                        <title>Offer Letter</title>
-                        <style>
-                            body {{ font-family: Arial, sans-serif; margin: 40px; }}
-                            .header {{ text-align: center; margin-bottom: 30px; }}
-                            .content {{ line-height: 1.6; }}
-                            .signature {{ margin-top: 40px; }}
-                        </style>
-                    </head>
-                    <body>
-                        <div class="header">
-                            <h1>🎉 Congratulations!</h1>
-                            <h2>Offer Letter</h2>
-                        </div>
-                        <div class="content">
-                            <p>Dear {name},</p>
-                            <p>We are delighted to offer you the position of <strong>Python Developer</strong> at our company.</p>
-                            <p>Your exceptional performance throughout the interview process has demonstrated your technical skills, problem-solving abilities, and cultural fit with our organization.</p>
-                            <p>We look forward to having you join our team and contribute to our continued success.</p>
-                            <p>Please review the terms and conditions of this offer and let us know if you have any questions.</p>
-                            <p>We are excited to welcome you aboard!</p>
-                            <div class="signature">
-                                <p>Best regards,<br>
-                                Hiring Team</p>
-                            </div>
-                        </div>
-                    </body>
-                    </html>
-                    """
-                    
-                    msg = Message(
-                        subject='🎉 Congratulations! Your Offer Letter',
-                        recipients=[email],
-                        body=f"Hi {name},\n\nCongratulations! You have cleared all rounds with a score of {analysis_result['score']}/100. Please find your offer letter in the email body.\n\nBest,\nHiring Team",
-                        html=fallback_offer
-                    )
-                    mail.send(msg)
-                except Exception as e:
-                    print(f"[ERROR] Error sending fallback offer email: {e}")
-                
-                offer_link = url_for('view_offer_letter', token=token, _external=True)
-                return render_template('hr_result.html', 
-                                    passed=True, 
-                                    score=analysis_result['score'],
-                                    feedback=analysis_result['feedback'],
-                                    offer_link=offer_link)
-        else:
-            try:
-                send_email(
-                    subject='Application Update',
-                    recipients=[email],
-                    body=f"Hi {name},\n\nThank you for participating. Unfortunately, you did not clear the HR interview. Your score was {analysis_result['score']}/100.\n\nBest,\nHiring Team",
-                    mail=mail
-                )
-            except Exception as e:
-                print(f"[ERROR] Error sending email: {e}")
-            
-            return render_template('hr_result.html', 
-                                passed=False, 
-                                score=analysis_result['score'],
-                                feedback=analysis_result['feedback'])
-    
-    return render_template('hr_interview.html', question=question)
+    return stage_view('hr_interview', token)
 
 @app.route('/offer-letter/<token>')
 def view_offer_letter(token):
     """View offer letter in browser"""
-    state = candidate_states.get(token)
-    if not state:
-        return render_template('error.html', 
-                             message="Invalid or expired offer letter link.",
-                             suggestion="Please check your email for the correct link or contact support.")
+    candidate_id, error = resolve_stage_token(token, 'offer_letter')
+    if not candidate_id:
+        return link_error_page('offer letter', error)
+    state = candidate_states.get(candidate_id)
     
     # Check if candidate passed HR interview
     hr_analysis = state.get('hr_analysis')
@@ -1255,133 +1628,489 @@ def view_offer_letter(token):
                              suggestion="You need to pass the HR interview first to view the offer letter.")
     
     name = state.get('name', 'Candidate')
-    email = state.get('email', 'candidate@example.com')
-    
-    # Generate offer letter using CrewAI
-    if CREWAI_AVAILABLE:
-        try:
-            offer_task = Task(
-                description=f"""
-                Generate a professional offer letter for the successful candidate:
-                
-                Name: {name}
-                Email: {email}
-                Position: Python Developer
-                
-                The offer letter should:
-                1. Be professional and welcoming
-                2. Include all necessary details
-                3. Be formatted as HTML
-                4. Have a warm, positive tone
-                5. Include next steps for the candidate
-                
-                Return the response as HTML formatted offer letter.
-                """,
-                agent=create_offer_letter_agent(),
-                expected_output="HTML formatted offer letter"
-            )
-            
-            offer_crew = Crew(
-                agents=[create_offer_letter_agent()],
-                tasks=[offer_task],
-                verbose=True,
-                process=Process.sequential
-            )
-            
-            html_content = offer_crew.kickoff()
-            return html_content
-        except Exception as e:
-            print(f"[ERROR] Error generating offer letter: {e}")
-            # Return fallback offer letter
-            fallback_html = f"""
-            <!DOCTYPE html>
-            <html>
-            <head>
-                <title>Offer Letter</title>
-                <style>
-                    body {{ font-family: Arial, sans-serif; margin: 40px; }}
-                    .header {{ text-align: center; margin-bottom: 30px; }}
-                    .content {{ line-height: 1.6; }}
-                    .signature {{ margin-top: 40px; }}
-                </style>
-            </head>
-            <body>
-                <div class="header">
-                    <h1>🎉 Congratulations!</h1>
-                    <h2>Offer Letter</h2>
-                </div>
-                <div class="content">
-                    <p>Dear {name},</p>
-                    <p>We are delighted to offer you the position of <strong>Python Developer</strong> at our company.</p>
-                    <p>Your exceptional performance throughout the interview process has demonstrated your technical skills, problem-solving abilities, and cultural fit with our organization.</p>
-                    <p>We look forward to having you join our team and contribute to our continued success.</p>
-                    <p>Please review the terms and conditions of this offer and let us know if you have any questions.</p>
-                    <p>We are excited to welcome you aboard!</p>
-                    <div class="signature">
-                        <p>Best regards,<br>
-                        Hiring Team</p>
-                    </div>
-                </div>
-            </body>
-            </html>
-            """
-            return fallback_html
-    else:
-        # Fallback offer letter when CrewAI is not available
-        fallback_html = f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <title>Offer Letter</title>
-            <style>
-                body {{ font-family: Arial, sans-serif; margin: 40px; }}
-                .header {{ text-align: center; margin-bottom: 30px; }}
-                .content {{ line-height: 1.6; }}
-                .signature {{ margin-top: 40px; }}
-            </style>
-        </head>
-        <body>
-            <div class="header">
-                <h1>🎉 Congratulations!</h1>
-                <h2>Offer Letter</h2>
-            </div>
-            <div class="content">
-                <p>Dear {name},</p>
-                <p>We are delighted to offer you the position of <strong>Python Developer</strong> at our company.</p>
-                <p>Your exceptional performance throughout the interview process has demonstrated your technical skills, problem-solving abilities, and cultural fit with our organization.</p>
-                <p>We look forward to having you join our team and contribute to our continued success.</p>
-                <p>Please review the terms and conditions of this offer and let us know if you have any questions.</p>
-                <p>We are excited to welcome you aboard!</p>
-                <div class="signature">
-                    <p>Best regards,<br>
-                    Hiring Team</p>
-                </div>
-            </div>
-        </body>
-        </html>
-        """
-        return fallback_html
+    job = job_partition(state).job
+    
+    # Generated once by CrewAI and stored; the first view streams it as it is written.
+    # A job with its own offer template always gets that letter.
+    if state.get('offer_letter_html'):
+        return state['offer_letter_html']
+    if CREWAI_AVAILABLE and not job.offer_template:
+        generation = offer_letter_generation(candidate_id)
+        if generation is None:
+            return state['offer_letter_html']
+        return stream_offer_letter(generation, name, job)
+    return fallback_offer_letter(name, job)
 
 @app.route('/test-terminated')
 def test_terminated():
     """Handle test termination due to violations"""
     return render_template('test_terminated.html')
 
+@app.route('/proctoring/<stage_name>/<token>', methods=['POST'])
+def proctoring_events(stage_name, token):
+    """
+    A batch of proctoring events from a test page (sent with navigator.sendBeacon):
+    {"events": [[timestamp_ms, type, value], ...]}. A 'terminated' event's value
+    is the code of the violation type that ended the test.
+    """
+    if stage_name not in pipeline.stages:
+        return {'error': 'unknown stage'}, 404
+    if (request.content_length or 0) > PROCTORING_MAX_BATCH * 64:
+        return {'error': 'batch too large'}, 413
+    candidate_id, error = resolve_stage_token(token, stage_name)
+    if not candidate_id:
+        return {'error': error}, 404
+    try:
+        records, rejected = parse_batch(request.get_data(), PROCTORING_MAX_BATCH)
+        proctoring_log.append(candidate_id, stage_name, records)
+    except ValueError as e:
+        return {'error': str(e)}, 400
+    for _timestamp, code, value in records:
+        PROCTORING_EVENTS.labels(stage=stage_name, type=EVENT_TYPES[code - 1]).inc()
+        if EVENT_TYPES[code - 1] == 'terminated':
+            reason = EVENT_TYPES[value - 1] if 0 < value <= len(EVENT_TYPES) else None
+            record_candidate_event(candidate_id, 'proctoring_terminated', stage=stage_name, reason=reason)
+    if rejected:
+        logger.debug("Rejected %s malformed proctoring events for %s", rejected, candidate_id)
+    return '', 204
+
+def admin_required(view):
+    """Require ADMIN_API_KEY (X-Admin-Key header or Bearer token); refuse every request when it is not configured"""
+    @wraps(view)
+    def wrapped(*args, **kwargs):
+        if not ADMIN_API_KEY:
+            return {'error': 'admin API disabled: ADMIN_API_KEY is not set'}, 403
+        supplied = request.headers.get('X-Admin-Key', '')
+        auth = request.headers.get('Authorization', '')
+        if auth.startswith('Bearer '):
+            supplied = auth[len('Bearer '):]
+        if not hmac.compare_digest(supplied.encode(), ADMIN_API_KEY.encode()):
+            return {'error': 'unauthorized'}, 401
+        return view(*args, **kwargs)
+    return wrapped
+
+def _admin_query_args():
+    """(filter, fields) from the query string; raises ValueError on bad input"""
+    match = CandidateFilter(
+        stage=request.args.get('stage'),
+        status=request.args.get('status'),
+        email=request.args.get('email'),
+        created_after=request.args.get('created_after'),
+        created_before=request.args.get('created_before')
+    )
+    fields = request.args.get('fields')
+    fields = tuple(f.strip() for f in fields.split(',') if f.strip()) if fields else DEFAULT_FIELDS
+    return match, fields
+
+def _admin_scope():
+    """
+    (candidate index, analytics) of the job= query argument's partition, or of
+    every candidate without one; raises ValueError for an unknown job
+    """
+    job_id = request.args.get('job')
+    if not job_id:
+        return candidate_index, analytics
+    if job_id not in job_board:
+        raise ValueError(f"unknown job {job_id!r}")
+    partition = job_board.partition(job_id)
+    return partition.candidates, partition.analytics
+
+@app.route('/admin/candidates')
+@admin_required
+def admin_list_candidates():
+    """
+    Candidates in creation order, filtered by job (scanning only that job's
+    candidates), stage, status, email and created_after/created_before,
+    projected to `fields`.
+    format=json (default) returns one page of `limit` records and a next_cursor;
+    format=ndjson streams every match from `cursor` on, one record per line.
+    """
+    try:
+        match, fields = _admin_query_args()
+        index, _analytics = _admin_scope()
+        cursor = request.args.get('cursor')
+        if request.args.get('format') == 'ndjson':
+            limit = request.args.get('limit', type=int)
+            records = index.scan(candidate_states, decode_cursor(cursor) if cursor else None)
+            def generate():
+                sent = 0
+                for _key, candidate_id, state in records:
+                    if limit is not None and sent >= limit:
+                        return
+                    if match(state):
+                        sent += 1
+                        yield json.dumps(project(candidate_id, state, fields), ensure_ascii=False) + '\n'
+            return Response(generate(), mimetype='application/x-ndjson')
+        limit = min(max(request.args.get('limit', 50, type=int), 1), ADMIN_PAGE_LIMIT)
+        items, next_cursor = index.page(candidate_states, match, fields, limit, cursor)
+    except ValueError as e:
+        return {'error': str(e)}, 400
+    return {'items': items, 'next_cursor': next_cursor, 'total_candidates': len(index)}
+
+@app.route('/admin/candidates/<candidate_id>')
+@admin_required
+def admin_get_candidate(candidate_id):
+    """One candidate, projected to `fields` (all stored fields if omitted)"""
+    state = candidate_states.get(candidate_id)
+    if state is None:
+        return {'error': 'not found'}, 404
+    fields = request.args.get('fields')
+    if not fields:
+        return {'id': candidate_id, **{k: v for k, v in state.items() if k != 'resume_minhash'}}
+    return project(candidate_id, state, tuple(f.strip() for f in fields.split(',') if f.strip()))
+
+@app.route('/admin/candidates/<candidate_id>/proctoring')
+@admin_required
+def admin_candidate_proctoring(candidate_id):
+    """Proctoring event counts per stage; events=1 includes the decoded events"""
+    if candidate_id not in candidate_states:
+        return {'error': 'not found'}, 404
+    include_events = request.args.get('events') in ('1', 'true')
+    stages = {}
+    for stage_name in pipeline.stages:
+        stages[stage_name] = proctoring_log.summary(candidate_id, stage_name)
+        if include_events:
+            stages[stage_name]['events'] = proctoring_log.events(candidate_id, stage_name)
+    return {'id': candidate_id, 'stages': stages}
+
+@app.route('/admin/jobs', methods=['GET', 'POST'])
+@admin_required
+def admin_jobs():
+    """
+    GET lists every job with its candidate count (status= filters).
+    POST adds or replaces a job from a JSON body (see utils/jobs.py for the fields).
+    """
+    if request.method == 'POST':
+        try:
+            job = job_board.save(Job.from_dict(request.get_json(force=True, silent=True)))
+        except (TypeError, ValueError, OSError) as e:
+            return {'error': str(e)}, 400
+        logger.info("Saved job %s (%s)", job.id, job.status)
+        return {**job.to_dict(), 'candidates': len(job_board.partition(job.id).candidates)}, 201
+    status = request.args.get('status')
+    return {'jobs': [{**job.to_dict(), 'candidates': len(job_board.partition(job.id).candidates)}
+                     for job in job_board.jobs(status)]}
+
+@app.route('/admin/campaigns', methods=['GET', 'POST'])
+@admin_required
+def admin_campaigns():
+    """
+    GET lists campaigns with per-status recipient counts.
+    POST selects candidates waiting for their coding test (JSON body: job, source,
+    created_after, created_before, subject, body), mints their coding test links and
+    queues the invitations for `flask send-campaigns`; nothing is sent from the web worker.
+    """
+    if request.method == 'GET':
+        return {'campaigns': [campaign_store.summary(campaign_id) for campaign_id in campaign_store.ids()]}
+    options = request.get_json(force=True, silent=True)
+    if not isinstance(options, dict):
+        return {'error': 'body must be a JSON object'}, 400
+    job_id = options.get('job')
+    if job_id and job_id not in job_board:
+        return {'error': f"unknown job {job_id!r}"}, 400
+    selection = {key: options[key] for key in ('job', 'source', 'created_after', 'created_before') if options.get(key)}
+    match = CandidateFilter(stage='coding_test', status='in_progress', created_after=options.get('created_after'),
+                            created_before=options.get('created_before'))
+    index = job_board.partition(job_id).candidates if job_id else candidate_index
+    recipients, seen = [], set()
+    for _key, candidate_id, state in index.scan(candidate_states):
+        email = state.get('email')
+        if not email or normalize_email(email) in seen or not match(state):
+            continue
+        if options.get('source') and state.get('source') != options['source']:
+            continue
+        seen.add(normalize_email(email))
+        recipients.append({'id': candidate_id, 'name': state.get('name') or 'Candidate', 'email': email,
+                           'position': job_partition(state).job.title, 'link': stage_link('coding_test', candidate_id)})
+    if not recipients:
+        return {'error': 'no candidates match'}, 400
+    try:
+        campaign = campaign_store.create(recipients, job_id, options.get('subject') or CAMPAIGN_SUBJECT,
+                                         options.get('body') or CAMPAIGN_BODY, selection)
+    except KeyError as e:
+        return {'error': f"unknown placeholder {e} in body (use $name, $link and $position)"}, 400
+    except ValueError as e:
+        return {'error': str(e)}, 400
+    return campaign_store.summary(campaign['id']), 201
+
+@app.route('/admin/campaigns/<campaign_id>')
+@admin_required
+def admin_campaign(campaign_id):
+    """Delivery counts of one campaign; recipients=queued|sent|failed|all lists those recipients"""
+    summary = campaign_store.summary(campaign_id, request.args.get('recipients'))
+    if summary is None:
+        return {'error': 'not found'}, 404
+    return summary
+
+@app.route('/admin/lifecycle/sweep', methods=['POST'])
+@admin_required
+def admin_sweep():
+    """Run a lifecycle sweep in this process (dry_run=1 only reports what it would do)"""
+    return sweep_candidates(dry_run=request.args.get('dry_run') in ('1', 'true'))
+
+@app.route('/admin/archive')
+@admin_required
+def admin_archive():
+    """
+    Archived candidates filtered by email, job and reason (expired, rejected,
+    hired), projected to `fields`, streamed as NDJSON; summary=1 returns
+    archive totals instead.
+    """
+    if request.args.get('summary') in ('1', 'true'):
+        return cold_archive.stats()
+    fields = request.args.get('fields')
+    fields = tuple(f.strip() for f in fields.split(',') if f.strip()) if fields else DEFAULT_FIELDS
+    matches = cold_archive.find(email=request.args.get('email'), job_id=request.args.get('job'),
+                                reason=request.args.get('reason'))
+    def generate():
+        for entry, state in matches:
+            record = {**project(entry['id'], state, fields), 'archive_reason': entry['reason'],
+                      'archived_at': entry['archived_at']}
+            yield json.dumps(record, ensure_ascii=False) + '\n'
+    return Response(generate(), mimetype='application/x-ndjson')
+
+@app.route('/admin/archive/<candidate_id>')
+@admin_required
+def admin_archived_candidate(candidate_id):
+    """One archived candidate's full state"""
+    entry = cold_archive.entry(candidate_id)
+    state = cold_archive.get(candidate_id) if entry else None
+    if state is None:
+        return {'error': 'not found'}, 404
+    return {'id': candidate_id, 'archive_reason': entry['reason'], 'archived_at': entry['archived_at'],
+            **{k: v for k, v in state.items() if k != 'resume_minhash'}}
+
+@app.route('/admin/analytics')
+@admin_required
+def admin_analytics():
+    """Precomputed funnel counts, score statistics and stage timings; since/until filter by day, job by job"""
+    try:
+        _index, scope_analytics = _admin_scope()
+    except ValueError as e:
+        return {'error': str(e)}, 400
+    return scope_analytics.summary(request.args.get('since'), request.args.get('until'))
+
+@app.route('/admin/analytics/rebuild', methods=['POST'])
+@admin_required
+def admin_rebuild_analytics():
+    """Recompute the analytics aggregates from candidate states, archived ones included"""
+    start = time.perf_counter()
+    counted = rebuild_analytics()
+    return {'candidates': counted, 'seconds': round(time.perf_counter() - start, 3)}
+
+@app.route('/admin/export')
+@admin_required
+def admin_export():
+    """
+    Stream every candidate (stage analyses, scores and timestamps flattened to
+    columns) as format=csv (default), ndjson or parquet. since=<ISO timestamp>
+    limits the export to candidates updated after it; the X-Export-Watermark
+    response header is the value to pass as `since` next time. The
+    job/stage/status/email/created_* filters of /admin/candidates apply.
+    """
+    export_format = request.args.get('format', 'csv')
+    if export_format not in candidate_export.FORMATS:
+        return {'error': f"format must be one of {', '.join(candidate_export.FORMATS)}"}, 400
+    if export_format == 'parquet' and not candidate_export.PARQUET_AVAILABLE:
+        return {'error': 'Parquet export requires pyarrow'}, 501
+    try:
+        match, _fields = _admin_query_args()
+        index, _analytics = _admin_scope()
+    except ValueError as e:
+        return {'error': str(e)}, 400
+    # Taken before catching up with other workers' writes, so none falls between two exports
+    watermark = candidate_export.export_watermark()
+    follow_state_log(force=True)
+    records = ((candidate_id, state) for _key, candidate_id, state in index.scan(candidate_states)
+               if match(state))
+    rows = candidate_export.export_rows(records, request.args.get('since'))
+    return Response(candidate_export.WRITERS[export_format](rows),
+                    content_type=candidate_export.CONTENT_TYPES[export_format],
+                    headers={'X-Export-Watermark': watermark,
+                             'Content-Disposition': f'attachment; filename="candidates.{export_format}"'})
+
 @app.route('/debug/states')
+@admin_required
 def debug_states():
-    """Debug endpoint to check candidate states"""
+    """Debug endpoint to check candidate states (first page; see /admin/candidates)"""
+    fields = ('id', 'name', 'email', 'coding_test_completed', 'tech_interview_completed', 'hr_interview_completed')
+    try:
+        items, next_cursor = candidate_index.page(candidate_states, lambda state: True, fields, 50,
+                                                  request.args.get('cursor'))
+    except ValueError as e:
+        return {'error': str(e)}, 400
     return {
         'total_states': len(candidate_states),
-        'tokens': list(candidate_states.keys()),
-        'states': {k: {
-            'name': v.get('name', 'Unknown'), 
-            'email': v.get('email', 'Unknown'),
-            'coding_test_used': v.get('coding_test_used', False),
-            'tech_interview_used': v.get('tech_interview_used', False),
-            'hr_interview_used': v.get('hr_interview_used', False)
-        } for k, v in candidate_states.items()}
+        'tokens': [item['id'] for item in items],
+        'states': {item.pop('id'): item for item in items},
+        'next_cursor': next_cursor
+    }
+
+@app.cli.command('ingest-resumes')
+@click.argument('source', type=click.Path(exists=True))
+@click.option('--workers', type=int, default=0, help='Parser processes (default: all cores).')
+@click.option('--batch-size', type=int, default=200, show_default=True,
+              help='Candidate records written per state-file save.')
+@click.option('--checkpoint', default=None,
+              help='Progress file used to resume an interrupted run (default: <source>.ingest.json).')
+@click.option('--job', 'job_id', default=None, help='Job the resumes apply to (default: the default job).')
+def ingest_resumes_command(source, workers, batch_size, checkpoint, job_id):
+    """Bulk-ingest a directory or archive of resumes.
+
+    Resumes are parsed in parallel, screened with the job's rule as in /form and
+    shortlisted candidates are added to candidate_states in batches. Coding
+    questions are assigned when the candidate first opens the test link and
+    no invitation emails are sent from here (use a campaign, see send-campaigns).
+    """
+    job_id = job_id or DEFAULT_JOB.id
+    if job_id not in job_board:
+        raise click.BadParameter(f"unknown job {job_id!r}", param_hint='--job')
+    partition = job_board.partition(job_id)
+    source = os.path.abspath(source)
+    checkpoint = checkpoint or f"{source.rstrip(os.sep)}.ingest.json"
+    if os.path.isfile(source):
+        stem = os.path.splitext(os.path.basename(source))[0]
+        root = extract_archive(source, os.path.join(app.config['UPLOAD_FOLDER'], f"bulk_{stem}"))
+    else:
+        root = source
+    
+    done = load_checkpoint(checkpoint)
+    fingerprints = {path: file_fingerprint(path) for path in discover_resumes(root)}
+    pending = [path for path, fp in fingerprints.items() if fp not in done]
+    click.echo(f"[INFO] {len(fingerprints)} resumes found, {len(fingerprints) - len(pending)} already ingested, {len(pending)} to process")
+    if not pending:
+        return
+    
+    counts = {'shortlisted': 0, 'rejected': 0, 'duplicate': 0, 'no_email': 0}
+    batch = 0
+    added = []
+    start = time.perf_counter()
+    
+    def commit_batch():
+        save_candidate_states(candidate_states, added, 'submitted')
+        added.clear()
+        save_checkpoint(checkpoint, done)
+    
+    with click.progressbar(length=len(pending), label='Ingesting resumes') as bar:
+        for path, resume_text in parse_resumes_parallel(pending, parse_resume, workers=workers or None):
+            record_funnel('applied')
+            email = extract_email(resume_text, path)
+            resume_signature = minhash_signature(resume_text)
+            if not email:
+                counts['no_email'] += 1
+            elif find_duplicate_application(email, resume_signature, partition):
+                counts['duplicate'] += 1
+            elif partition.job.shortlists(resume_text):
+                added.append(create_candidate_record(partition, guess_name(resume_text, path), email, '',
+                                                     resume_text, resume_signature, source='bulk', resume_path=path))
+                record_funnel('shortlisted')
+                counts['shortlisted'] += 1
+            else:
+                counts['rejected'] += 1
+            done.add(fingerprints[path])
+            batch += 1
+            if batch >= batch_size:
+                commit_batch()
+                batch = 0
+            bar.update(1)
+    commit_batch()
+    
+    elapsed = time.perf_counter() - start
+    rate = len(pending) / elapsed if elapsed > 0 else 0.0
+    click.echo(f"[INFO] Ingested {len(pending)} resumes in {elapsed:.1f}s ({rate:.1f} resumes/s): "
+               f"{counts['shortlisted']} shortlisted, {counts['rejected']} not matching, "
+               f"{counts['duplicate']} duplicates, {counts['no_email']} without an email address")
+
+def build_campaign_message(campaign, recipient):
+    return Message(campaign['subject'], recipients=[recipient['email']], body=render_invitation(campaign, recipient))
+
+def record_campaign_batch(campaign, results):
+    """Audit 'emailed' events for delivered invitations as deliver() stores them"""
+    sent = [result['id'] for result in results if result['status'] == 'sent']
+    try:
+        state_store.audit_many(sent, 'emailed', subject=campaign['subject'], campaign=campaign['id'])
+    except Exception as e:
+        logger.error("Error recording campaign %s emails: %s", campaign['id'], e)
+
+@app.cli.command('send-campaigns')
+@click.option('--campaign', 'campaign_ids', multiple=True, help='Campaign to deliver (repeatable; default: all).')
+@click.option('--rate', type=float, default=CAMPAIGN_RATE, show_default=True,
+              help='Messages per second across all connections.')
+@click.option('--batch-size', type=int, default=CAMPAIGN_BATCH_SIZE, show_default=True,
+              help='Messages sent over one SMTP connection.')
+@click.option('--connections', type=int, default=CAMPAIGN_CONNECTIONS, show_default=True,
+              help='SMTP connections used in parallel.')
+@click.option('--max-attempts', type=int, default=CAMPAIGN_MAX_ATTEMPTS, show_default=True,
+              help='Attempts per recipient across runs.')
+def send_campaigns_command(campaign_ids, rate, batch_size, connections, max_attempts):
+    """Deliver queued campaign invitations.
+
+    Pending recipients (never attempted, or failed with attempts left) are sent
+    in batches, one SMTP connection per batch, throttled to --rate. Safe to run
+    repeatedly (e.g. from cron): sent recipients are never sent again and a
+    campaign being delivered by another process is skipped.
+    """
+    for campaign_id in campaign_ids or campaign_store.ids():
+        if campaign_store.get(campaign_id) is None:
+            raise click.BadParameter(f"unknown campaign {campaign_id!r}", param_hint='--campaign')
+        start = time.perf_counter()
+        totals = deliver(campaign_store, campaign_id, mail.connect, build_campaign_message, rate=rate,
+                         batch_size=batch_size, connections=connections, max_attempts=max_attempts,
+                         context=app.app_context, on_batch=record_campaign_batch)
+        if totals['skipped']:
+            click.echo(f"[INFO] Campaign {campaign_id} is being delivered by another process; skipped")
+            continue
+        elapsed = time.perf_counter() - start
+        counts = campaign_store.summary(campaign_id)['counts']
+        click.echo(f"[INFO] Campaign {campaign_id}: {totals['sent']} sent, {totals['failed']} failed in {elapsed:.1f}s "
+                   f"({counts['sent']} sent, {counts['failed']} failed, {counts['queued']} queued overall)")
+
+@app.cli.command('sweep-candidates')
+@click.option('--dry-run', is_flag=True, help='Report what would be archived and deleted without changing anything.')
+def sweep_candidates_command(dry_run):
+    """Archive expired and finished candidates and delete orphaned uploads.
+
+    Meant to run on a schedule (e.g. daily from cron). Candidates still in
+    progress with no activity for CANDIDATE_EXPIRE_DAYS have their links
+    expired; rejected and hired candidates idle for CANDIDATE_ARCHIVE_DAYS
+    are moved to the archive, which /admin/archive queries.
+    """
+    result = sweep_candidates(dry_run=dry_run)
+    reasons = ', '.join(f"{count} {reason}" for reason, count in sorted(result['reasons'].items())) or 'none'
+    click.echo(f"[INFO] {'Would archive' if dry_run else 'Archived'} {result['archived']} candidates ({reasons}); "
+               f"{result['remaining']} remain. {'Would delete' if dry_run else 'Deleted'} "
+               f"{result['orphaned_uploads']} orphaned uploads ({result['orphaned_upload_bytes']} bytes) "
+               f"in {result['seconds']:.1f}s")
+
+@app.route('/metrics')
+def metrics():
+    """Prometheus metrics (aggregated across gunicorn workers)"""
+    body, content_type = render_metrics()
+    return Response(body, content_type=content_type)
+
+@app.route('/debug/admission')
+@admin_required
+def debug_admission():
+    """Queue depths and circuit state of outbound dependencies"""
+    return {
+        'backends': admission.stats(),
+        'question_buffer': question_generator.depths()
     }
 
+@app.route('/debug/profiles')
+@admin_required
+def debug_profiles():
+    """Index of captured request profiles"""
+    return {'enabled': PROFILING_ENABLED, 'profiles': list_profiles(PROFILE_DIR)}
+
+@app.route('/debug/profiles/<path:name>')
+@admin_required
+def debug_profile_file(name):
+    """Download one captured profile"""
+    if not PROFILING_ENABLED:
+        abort(404)
+    return send_from_directory(os.path.abspath(PROFILE_DIR), name, as_attachment=True)
+
 @app.route('/')
 def index():
     """Redirect to the application form"""
@@ -1391,9 +2120,9 @@ if __name__ == '__main__':
     # Get port from environment variable (Render sets PORT)
     port = int(os.environ.get('PORT', 5000))
     
-    print(f"[INFO] Starting CrewAI Hiring Pipeline on port {port}")
-    print(f"[INFO] CrewAI Available: {CREWAI_AVAILABLE}")
-    print(f"[INFO] Environment: {os.environ.get('FLASK_ENV', 'production')}")
+    logger.info("Starting CrewAI Hiring Pipeline on port %s", port)
+    logger.info("CrewAI Available: %s", CREWAI_AVAILABLE)
+    logger.info("Environment: %s", os.environ.get('FLASK_ENV', 'production'))
     
     # Run the app with proper host binding for production
     app.run(host='0.0.0.0', port=port, debug=False) 
\ No newline at end of file
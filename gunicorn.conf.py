@@ -0,0 +1,39 @@
+# Gunicorn configuration (loaded automatically by `gunicorn crewai_app:app`)
+import os
+import shutil
+import sys
+import tempfile
+
+# Per-worker Prometheus samples are written here and merged by /metrics
+os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', os.path.join(tempfile.gettempdir(), 'hiring_prometheus'))
+
+# SERVING_MODE=async runs gevent workers: the worker monkey-patches sockets,
+# ssl, time.sleep and threading before loading the app, so Judge0 (requests),
+# OpenAI/CrewAI (httpx) and SMTP (smtplib) calls yield to other requests while
+# they wait instead of holding a thread. WORKER_CONNECTIONS caps the number of
+# concurrent requests per worker. A --worker-class on the command line wins.
+SERVING_MODE = os.getenv('SERVING_MODE', 'sync').lower()
+if SERVING_MODE == 'async':
+    worker_class = 'gevent'
+    worker_connections = int(os.getenv('WORKER_CONNECTIONS', 1000))
+
+
+def on_starting(server):
+    metrics_dir = os.environ['PROMETHEUS_MULTIPROC_DIR']
+    shutil.rmtree(metrics_dir, ignore_errors=True)
+    os.makedirs(metrics_dir, exist_ok=True)
+
+
+def worker_exit(server, worker):
+    # Runs before interpreter shutdown, while the app's side-effect threads can still finish
+    app_module = sys.modules.get('crewai_app')
+    if app_module is not None:
+        app_module.drain_side_effects()
+
+
+def child_exit(server, worker):
+    try:
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
+    except ImportError:
+        pass
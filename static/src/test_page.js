@@ -0,0 +1,253 @@
+// Proctoring, timer and face detection shared by the coding test, technical
+// interview and HR interview pages. The page passes its proctoring endpoint
+// as data-proctoring-url on the <script> tag.
+const pageScript = document.currentScript;
+let startTime = Date.now();
+let tabSwitchCount = 0;
+let faceDetectionInterval;
+let isFullscreen = false;
+let testTerminated = false;
+
+// Proctoring events are queued and sent in batches, one request per batch
+const proctor = {
+    url: pageScript.dataset.proctoringUrl,
+    queue: [],
+    record(type, value) {
+        this.queue.push([Date.now(), type, value || 0]);
+        if (this.queue.length >= 50) this.flush();
+    },
+    flush() {
+        if (!this.queue.length) return;
+        const body = JSON.stringify({ events: this.queue.splice(0) });
+        if (!(navigator.sendBeacon && navigator.sendBeacon(this.url, new Blob([body], { type: 'application/json' })))) {
+            fetch(this.url, { method: 'POST', body, keepalive: true,
+                              headers: { 'Content-Type': 'application/json' } }).catch(() => {});
+        }
+    }
+};
+setInterval(() => proctor.flush(), 5000);
+window.addEventListener('pagehide', () => proctor.flush());
+
+// Initialize camera and face detection
+async function initializeCamera() {
+    try {
+        const stream = await navigator.mediaDevices.getUserMedia({
+            video: {
+                width: 200,
+                height: 150,
+                facingMode: 'user'
+            }
+        });
+        const video = document.getElementById('cameraFeed');
+        video.srcObject = stream;
+
+        // Start face detection
+        startFaceDetection();
+    } catch (error) {
+        console.error('Camera access denied:', error);
+        proctor.record('camera_denied');
+        terminateTest('Camera access required for test integrity', 'camera_denied');
+    }
+}
+
+// Face detection using canvas
+function startFaceDetection() {
+    const video = document.getElementById('cameraFeed');
+    const canvas = document.getElementById('faceCanvas');
+    const ctx = canvas.getContext('2d');
+
+    canvas.width = 200;
+    canvas.height = 150;
+
+    faceDetectionInterval = setInterval(() => {
+        if (testTerminated) return;
+
+        ctx.drawImage(video, 0, 0, 200, 150);
+        const imageData = ctx.getImageData(0, 0, 200, 150);
+
+        // Simple face detection (check for skin tone pixels)
+        let skinPixels = 0;
+        for (let i = 0; i < imageData.data.length; i += 4) {
+            const r = imageData.data[i];
+            const g = imageData.data[i + 1];
+            const b = imageData.data[i + 2];
+
+            // Basic skin tone detection
+            if (r > 100 && g > 50 && b > 50 && r > g && r > b) {
+                skinPixels++;
+            }
+        }
+
+        const faceDetected = skinPixels > 1000; // Threshold
+        canvas.classList.toggle('face-not-detected', !faceDetected);
+
+        if (!faceDetected) {
+            tabSwitchCount++;
+            proctor.record('face_missing', tabSwitchCount);
+            if (tabSwitchCount > 5) {
+                terminateTest('Face not detected for extended period', 'face_missing');
+            }
+        } else {
+            tabSwitchCount = Math.max(0, tabSwitchCount - 1);
+        }
+    }, 1000);
+}
+
+// Tab switching detection
+document.addEventListener('visibilitychange', function() {
+    if (document.hidden) {
+        tabSwitchCount++;
+        proctor.record('tab_hidden', tabSwitchCount);
+        // The page may never become visible again
+        proctor.flush();
+        showWarning('Tab switching detected! Return immediately.');
+
+        if (tabSwitchCount > 3) {
+            terminateTest('Multiple tab switches detected', 'tab_hidden');
+        }
+    }
+});
+
+// Window focus detection
+window.addEventListener('blur', function() {
+    tabSwitchCount++;
+    proctor.record('window_blur', tabSwitchCount);
+    showWarning('Window focus lost! Return to test.');
+
+    if (tabSwitchCount > 3) {
+        terminateTest('Multiple window focus losses detected', 'window_blur');
+    }
+});
+
+// Fullscreen detection
+document.addEventListener('fullscreenchange', function() {
+    isFullscreen = !!document.fullscreenElement;
+    if (!isFullscreen) {
+        proctor.record('fullscreen_exit');
+        showFullscreenWarning();
+    }
+});
+
+// Keyboard shortcuts prevention
+document.addEventListener('keydown', function(e) {
+    // Prevent common shortcuts
+    if (e.ctrlKey || e.metaKey) {
+        if (e.key === 'w' || e.key === 'n' || e.key === 't' || e.key === 'r') {
+            e.preventDefault();
+            proctor.record('shortcut_blocked');
+            showWarning('Keyboard shortcuts are disabled during the test');
+        }
+    }
+
+    // Prevent F11 and other function keys
+    if (e.key === 'F11' || e.key === 'F5') {
+        e.preventDefault();
+        proctor.record('shortcut_blocked');
+        showWarning('Function keys are disabled during the test');
+    }
+});
+
+// Right-click prevention
+document.addEventListener('contextmenu', function(e) {
+    e.preventDefault();
+    proctor.record('context_menu');
+    showWarning('Right-click is disabled during the test');
+});
+
+// Timer
+function updateTimer() {
+    if (testTerminated) return;
+
+    const elapsed = Date.now() - startTime;
+    const minutes = Math.floor(elapsed / 60000);
+    const seconds = Math.floor((elapsed % 60000) / 1000);
+
+    document.getElementById('timer').textContent =
+        `Time: ${minutes.toString().padStart(2, '0')}:${seconds.toString().padStart(2, '0')}`;
+}
+
+// Warning system
+function showWarning(message) {
+    const banner = document.getElementById('warningBanner');
+    banner.textContent = `⚠️ WARNING: ${message}`;
+    banner.style.display = 'block';
+
+    setTimeout(() => {
+        banner.style.display = 'none';
+    }, 5000);
+}
+
+function showFullscreenWarning() {
+    document.getElementById('fullscreenWarning').style.display = 'block';
+}
+
+function enterFullscreen() {
+    document.documentElement.requestFullscreen().then(() => {
+        document.getElementById('fullscreenWarning').style.display = 'none';
+    }).catch(err => {
+        console.error('Fullscreen failed:', err);
+    });
+}
+
+// Test termination
+function terminateTest(reason, cause) {
+    testTerminated = true;
+    clearInterval(faceDetectionInterval);
+    proctor.record('terminated', cause);
+    proctor.flush();
+
+    // Stop camera
+    const video = document.getElementById('cameraFeed');
+    if (video.srcObject) {
+        video.srcObject.getTracks().forEach(track => track.stop());
+    }
+
+    // Show termination message
+    alert(`Test terminated: ${reason}`);
+
+    // Redirect to error page
+    window.location.href = '/test-terminated';
+}
+
+// Initialize everything
+document.addEventListener('DOMContentLoaded', function() {
+    initializeCamera();
+    setInterval(updateTimer, 1000);
+
+    // Request fullscreen on start
+    setTimeout(() => {
+        if (!document.fullscreenElement) {
+            showFullscreenWarning();
+        }
+    }, 2000);
+});
+
+// Form submission with integrity check and loading state
+document.querySelector('form').addEventListener('submit', function(e) {
+    if (testTerminated) {
+        e.preventDefault();
+        alert('Test has been terminated due to violations');
+        return;
+    }
+
+    if (tabSwitchCount > 0) {
+        if (!confirm('You have violated test rules. Are you sure you want to submit?')) {
+            e.preventDefault();
+            return;
+        }
+    }
+
+    // Show loading state
+    const submitBtn = document.querySelector('.btn-submit');
+    const originalText = submitBtn.textContent;
+    submitBtn.disabled = true;
+    submitBtn.innerHTML = '<span class="spinner-border spinner-border-sm me-2" role="status"></span>Processing...';
+
+    // Re-enable if form submission fails
+    setTimeout(() => {
+        if (submitBtn.disabled) {
+            submitBtn.disabled = false;
+            submitBtn.textContent = originalText;
+        }
+    }, 30000); // 30 second timeout
+});
@@ -0,0 +1,147 @@
+import base64
+import bisect
+import json
+import threading
+
+from utils.dedup import normalize_email
+
+STAGES = ('coding_test', 'tech_interview', 'hr_interview')
+STAGE_ANALYSIS = {'coding_test': 'coding_analysis', 'tech_interview': 'tech_analysis', 'hr_interview': 'hr_analysis'}
+STATUSES = ('in_progress', 'rejected', 'hired')
+
+DEFAULT_FIELDS = ('id', 'job_id', 'name', 'email', 'stage', 'status', 'created_at',
+                  'coding_analysis.score', 'tech_analysis.score', 'hr_analysis.score')
+
+
+def candidate_stage(state):
+    """The stage the candidate is at: the first one not completed, or 'offer'"""
+    for stage in STAGES:
+        if not state.get(f'{stage}_completed'):
+            return stage
+    return 'offer'
+
+
+def candidate_status(state):
+    stage = candidate_stage(state)
+    if stage == 'offer':
+        return 'hired'
+    analysis = state.get(STAGE_ANALYSIS[stage])
+    if analysis and analysis.get('recommendation') == 'FAIL':
+        return 'rejected'
+    return 'in_progress'
+
+
+def project(candidate_id, state, fields):
+    """Pick `fields` (dotted paths allowed, plus derived id/stage/status) from a state"""
+    record = {}
+    for field in fields:
+        if field == 'id':
+            record['id'] = candidate_id
+        elif field == 'stage':
+            record['stage'] = candidate_stage(state)
+        elif field == 'status':
+            record['status'] = candidate_status(state)
+        else:
+            value = state
+            for part in field.split('.'):
+                value = value.get(part) if isinstance(value, dict) else None
+            record[field] = value
+    return record
+
+
+def encode_cursor(key):
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Cursor -> (created_at, candidate_id); raises ValueError if malformed"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created_at, candidate_id = json.loads(base64.urlsafe_b64decode(padded))
+        return str(created_at), str(candidate_id)
+    except Exception:
+        raise ValueError('invalid cursor')
+
+
+class CandidateFilter:
+    """Filters by stage, status, normalized email and created_at range (ISO strings or dates)"""
+
+    def __init__(self, stage=None, status=None, email=None, created_after=None, created_before=None):
+        if stage and stage not in STAGES + ('offer',):
+            raise ValueError(f"unknown stage {stage!r}")
+        if status and status not in STATUSES:
+            raise ValueError(f"unknown status {status!r}")
+        self.stage = stage
+        self.status = status
+        self.email = normalize_email(email) if email else None
+        self.created_after = created_after
+        self.created_before = created_before
+
+    def __call__(self, state):
+        if self.email and normalize_email(state.get('email')) != self.email:
+            return False
+        created_at = state.get('created_at') or ''
+        if self.created_after and created_at < self.created_after:
+            return False
+        if self.created_before and created_at >= self.created_before:
+            return False
+        if self.stage and candidate_stage(state) != self.stage:
+            return False
+        if self.status and candidate_status(state) != self.status:
+            return False
+        return True
+
+
+class CandidateIndex:
+    """
+    Candidate IDs ordered by (created_at, id), so a page can resume after a
+    cursor with a binary search instead of rescanning the store.
+    """
+
+    def __init__(self):
+        self._keys = []
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._keys)
+
+    def add(self, candidate_id, created_at):
+        with self._lock:
+            bisect.insort(self._keys, (created_at or '', candidate_id))
+
+    def remove(self, candidate_id, created_at):
+        key = (created_at or '', candidate_id)
+        with self._lock:
+            i = bisect.bisect_left(self._keys, key)
+            if i < len(self._keys) and self._keys[i] == key:
+                del self._keys[i]
+
+    def scan(self, states, after=None, chunk=500):
+        """Yield (key, candidate_id, state) in order, starting after the `after` key"""
+        position = 0
+        if after is not None:
+            with self._lock:
+                position = bisect.bisect_right(self._keys, after)
+        while True:
+            with self._lock:
+                batch = self._keys[position:position + chunk]
+            if not batch:
+                return
+            position += len(batch)
+            for key in batch:
+                state = states.get(key[1])
+                if state is not None:
+                    yield key, key[1], state
+
+    def page(self, states, match, fields, limit, cursor=None):
+        """Return (records, next_cursor) for up to `limit` matching candidates"""
+        records = []
+        after = decode_cursor(cursor) if cursor else None
+        for key, candidate_id, state in self.scan(states, after):
+            if not match(state):
+                continue
+            if len(records) == limit:
+                return records, encode_cursor(after)
+            records.append(project(candidate_id, state, fields))
+            after = key
+        return records, None
@@ -0,0 +1,190 @@
+import threading
+import time
+
+
+class AdmissionRejected(Exception):
+    """Raised when a call cannot be admitted (queue deadline, open circuit)"""
+
+
+class CircuitOpen(AdmissionRejected):
+    pass
+
+
+class TokenBucket:
+    """Classic token bucket: `rate` tokens per second, bursts up to `capacity`"""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity or max(rate, 1))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, deadline):
+        """Take one token, waiting until `deadline` (monotonic). Returns False on timeout."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait = (1 - self._tokens) / self.rate
+            if now + wait > deadline:
+                return False
+            time.sleep(wait)
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures and fails fast for
+    `reset_timeout` seconds, then lets a single trial call through (half-open).
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return 'closed'
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return 'half_open'
+        return 'open'
+
+    def allow(self):
+        with self._lock:
+            state = self.state
+            if state == 'closed':
+                return True
+            if state == 'half_open' and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def release_trial(self):
+        """Give back a half-open trial slot that was never used"""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if self.failures >= self.failure_threshold or self.opened_at is not None:
+                self.opened_at = time.monotonic()
+
+
+class Backend:
+    """Admission control for one outbound dependency"""
+
+    def __init__(self, name, max_concurrency=4, rate=None, burst=None, queue_timeout=10.0,
+                 failure_threshold=5, reset_timeout=30, observer=None):
+        self.name = name
+        self.observer = observer
+        self.max_concurrency = max_concurrency
+        self.queue_timeout = queue_timeout
+        self._semaphore = threading.BoundedSemaphore(max_concurrency)
+        self._bucket = TokenBucket(rate, burst) if rate else None
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.queued = 0
+        self.rejected = 0
+        self.completed = 0
+        self.failed = 0
+
+    def call(self, fn, *args, timeout=None, **kwargs):
+        """
+        Run fn(*args, **kwargs) once admitted. Raises CircuitOpen or
+        AdmissionRejected instead of waiting past the queue deadline; errors
+        from fn are re-raised after being counted against the breaker.
+        """
+        if not self.breaker.allow():
+            with self._lock:
+                self.rejected += 1
+            raise CircuitOpen(f"{self.name} circuit open")
+        deadline = time.monotonic() + (self.queue_timeout if timeout is None else timeout)
+        with self._lock:
+            self.queued += 1
+        self._notify()
+        try:
+            admitted = self._semaphore.acquire(timeout=max(0.0, deadline - time.monotonic()))
+            if admitted and self._bucket and not self._bucket.acquire(deadline):
+                self._semaphore.release()
+                admitted = False
+        finally:
+            with self._lock:
+                self.queued -= 1
+        if not admitted:
+            with self._lock:
+                self.rejected += 1
+            self.breaker.release_trial()
+            raise AdmissionRejected(f"{self.name} queue deadline exceeded")
+
+        with self._lock:
+            self.in_flight += 1
+        self._notify()
+        try:
+            result = fn(*args, **kwargs)
+        except Exception:
+            self.breaker.record_failure()
+            with self._lock:
+                self.failed += 1
+            raise
+        else:
+            self.breaker.record_success()
+            with self._lock:
+                self.completed += 1
+            return result
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+            self._semaphore.release()
+            self._notify()
+
+    def _notify(self):
+        if self.observer:
+            self.observer(self.name, self.stats())
+
+    def stats(self):
+        return {
+            'in_flight': self.in_flight,
+            'queued': self.queued,
+            'max_concurrency': self.max_concurrency,
+            'circuit': self.breaker.state,
+            'completed': self.completed,
+            'failed': self.failed,
+            'rejected': self.rejected
+        }
+
+
+class AdmissionController:
+    """Registry of per-backend admission controls"""
+
+    def __init__(self, observer=None):
+        self.backends = {}
+        self.observer = observer
+
+    def register(self, name, **options):
+        options.setdefault('observer', self.observer)
+        self.backends[name] = Backend(name, **options)
+        return self.backends[name]
+
+    def call(self, name, fn, *args, **kwargs):
+        return self.backends[name].call(fn, *args, **kwargs)
+
+    def stats(self):
+        return {name: backend.stats() for name, backend in self.backends.items()}
@@ -0,0 +1,149 @@
+import bisect
+import threading
+from collections import defaultdict
+from datetime import datetime
+
+from utils.admin_query import STAGE_ANALYSIS, STAGES
+
+SCORE_BIN_WIDTH = 10
+# Upper bounds (seconds) of the stage-transition duration buckets
+DURATION_BUCKETS = (60, 300, 900, 3600, 6 * 3600, 86400, 3 * 86400, 7 * 86400, float('inf'))
+TRANSITIONS = {
+    'coding_test': 'applied->coding_test',
+    'tech_interview': 'coding_test->tech_interview',
+    'hr_interview': 'tech_interview->hr_interview'
+}
+
+
+def _day(timestamp):
+    return (timestamp or '')[:10] or 'unknown'
+
+
+def _parse(timestamp):
+    try:
+        return datetime.fromisoformat(timestamp)
+    except (TypeError, ValueError):
+        return None
+
+
+class PipelineAnalytics:
+    """
+    Funnel counters, score histograms and stage-transition timings kept up to
+    date as candidates move through the pipeline. Counters and score sums are
+    bucketed per day, so a date-range query costs O(days), independent of the
+    number of candidates. rebuild() recomputes everything from candidate states;
+    record_state() applies one state's change, e.g. one written by another process.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._counts = defaultdict(lambda: defaultdict(int))        # metric -> day -> n
+            self._score_sum = defaultdict(lambda: defaultdict(float))   # stage -> day -> sum
+            self._score_count = defaultdict(lambda: defaultdict(int))   # stage -> day -> n
+            self._score_bins = defaultdict(lambda: [0] * (100 // SCORE_BIN_WIDTH + 1))
+            self._durations = defaultdict(lambda: {'count': 0, 'sum': 0.0, 'buckets': [0] * len(DURATION_BUCKETS)})
+
+    # Updates
+
+    def record_shortlisted(self, created_at):
+        with self._lock:
+            self._counts['shortlisted'][_day(created_at)] += 1
+
+    def record_analysis(self, stage, analysis, previous=None):
+        """A stage analysis was stored; `previous` is the analysis it replaces, if any"""
+        with self._lock:
+            if previous:
+                self._apply_analysis(stage, previous, -1)
+            self._apply_analysis(stage, analysis, 1)
+
+    def _apply_analysis(self, stage, analysis, sign):
+        day = _day(analysis.get('analyzed_at'))
+        score = analysis.get('score')
+        if isinstance(score, (int, float)):
+            self._score_sum[stage][day] += sign * score
+            self._score_count[stage][day] += sign
+            self._score_bins[stage][min(max(int(score), 0), 100) // SCORE_BIN_WIDTH] += sign
+        if analysis.get('recommendation') == 'FAIL':
+            self._counts[f'{stage}_failed'][day] += sign
+
+    def record_completion(self, state, stage):
+        """A stage was passed (its *_completed_at is set); records the count and the transition time"""
+        with self._lock:
+            self._apply_completion(state, stage, 1)
+
+    def _apply_completion(self, state, stage, sign):
+        completed_at = state.get(f'{stage}_completed_at')
+        index = STAGES.index(stage)
+        started_at = state.get('created_at') if index == 0 else state.get(f'{STAGES[index - 1]}_completed_at')
+        start, end = _parse(started_at), _parse(completed_at)
+        self._counts[f'{stage}_passed'][_day(completed_at)] += sign
+        if start and end and end >= start:
+            seconds = (end - start).total_seconds()
+            timing = self._durations[TRANSITIONS[stage]]
+            timing['count'] += sign
+            timing['sum'] += sign * seconds
+            timing['buckets'][bisect.bisect_left(DURATION_BUCKETS, seconds)] += sign
+
+    def _apply_state(self, state, sign):
+        """Add (sign 1) or remove (-1) everything one candidate state contributes"""
+        self._counts['shortlisted'][_day(state.get('created_at'))] += sign
+        for stage in STAGES:
+            analysis = state.get(STAGE_ANALYSIS[stage])
+            if analysis:
+                if not analysis.get('analyzed_at'):
+                    analysis = dict(analysis, analyzed_at=state.get(f'{stage}_completed_at') or state.get('created_at'))
+                self._apply_analysis(stage, analysis, sign)
+            if state.get(f'{stage}_completed'):
+                self._apply_completion(state, stage, sign)
+
+    def record_state(self, state, previous=None):
+        """Count a candidate state, replacing the contribution of `previous` (its older version) if given"""
+        with self._lock:
+            if previous is not None:
+                self._apply_state(previous, -1)
+            self._apply_state(state, 1)
+
+    def rebuild(self, states):
+        """Recompute every aggregate from stored candidate states"""
+        self.reset()
+        for state in list(states.values()):
+            self.record_state(state)
+
+    # Queries
+
+    @staticmethod
+    def _in_range(day, since, until):
+        return (not since or day >= since) and (not until or day < until)
+
+    def summary(self, since=None, until=None):
+        """
+        Aggregates for days in [since, until) (ISO dates; open-ended when omitted).
+        Score histograms and transition timings are all-time.
+        """
+        since, until = since and since[:10], until and until[:10]
+        with self._lock:
+            counts = {metric: sum(n for day, n in days.items() if self._in_range(day, since, until))
+                      for metric, days in self._counts.items()}
+            scores = {}
+            for stage in STAGES:
+                total = sum(s for day, s in self._score_sum[stage].items() if self._in_range(day, since, until))
+                n = sum(c for day, c in self._score_count[stage].items() if self._in_range(day, since, until))
+                scores[stage] = {
+                    'count': n,
+                    'mean': round(total / n, 2) if n else None,
+                    'histogram': {f"{i * SCORE_BIN_WIDTH}-{min(i * SCORE_BIN_WIDTH + SCORE_BIN_WIDTH - 1, 100)}": c
+                                  for i, c in enumerate(self._score_bins[stage])}
+                }
+            transitions = {}
+            for name, timing in self._durations.items():
+                transitions[name] = {
+                    'count': timing['count'],
+                    'mean_seconds': round(timing['sum'] / timing['count'], 1) if timing['count'] else None,
+                    'buckets': {('inf' if bound == float('inf') else f'le_{int(bound)}s'): n
+                                for bound, n in zip(DURATION_BUCKETS, timing['buckets'])}
+                }
+        return {'since': since, 'until': until, 'counts': counts, 'scores': scores, 'transitions': transitions}
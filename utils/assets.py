@@ -0,0 +1,157 @@
+"""
+Static asset bundles with content-hashed filenames and build-time compression.
+
+    python -m utils.assets              # build static/dist from static/src
+
+Each bundle in BUNDLES is the concatenation of its sources under static/src.
+The build writes it to static/dist as <name>.<hash>.<ext> with .gz and (when
+the brotli package is installed) .br copies next to it, and records
+bundle -> file in static/dist/manifest.json. Hashed files never change, so
+they are served with a one-year immutable Cache-Control. Without a manifest
+(a checkout that was never built) bundles are assembled from the sources on
+request and served uncached.
+
+compress_response() gzip/brotli-compresses HTML responses on the fly.
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import logging
+import mimetypes
+import os
+import sys
+
+from flask import Response, send_file
+from werkzeug.security import safe_join
+
+logger = logging.getLogger(__name__)
+
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+# Bundle name -> sources (relative to static/src), concatenated in order
+BUNDLES = {
+    'test_page.js': ['test_page.js'],
+    'test_page.css': ['test_page.css'],
+}
+IMMUTABLE_MAX_AGE = 365 * 86400
+COMPRESSIBLE_TYPES = ('text/html',)
+
+
+def _bundle_source(source_dir, name):
+    parts = []
+    for source in BUNDLES[name]:
+        with open(os.path.join(source_dir, source), 'rb') as f:
+            parts.append(f.read().rstrip(b'\n') + b'\n')
+    return b''.join(parts)
+
+
+def _write(path, data):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def build(static_dir='static'):
+    """Write every bundle, its compressed copies and the manifest; returns the manifest"""
+    source_dir = os.path.join(static_dir, 'src')
+    dist_dir = os.path.join(static_dir, 'dist')
+    os.makedirs(dist_dir, exist_ok=True)
+    previous = load_manifest(static_dir)
+    manifest = {}
+    for name in BUNDLES:
+        data = _bundle_source(source_dir, name)
+        stem, ext = os.path.splitext(name)
+        filename = f"{stem}.{hashlib.sha256(data).hexdigest()[:12]}{ext}"
+        path = os.path.join(dist_dir, filename)
+        _write(path, data)
+        # mtime=0 keeps the .gz byte-identical across builds
+        _write(f"{path}.gz", gzip.compress(data, compresslevel=9, mtime=0))
+        if BROTLI_AVAILABLE:
+            _write(f"{path}.br", brotli.compress(data, quality=11))
+        manifest[name] = filename
+        logger.info("Built %s -> %s (%s bytes)", name, filename, len(data))
+    _write(os.path.join(dist_dir, 'manifest.json'), json.dumps(manifest, indent=2).encode())
+
+    # Keep the previous build so pages rendered before a deploy still load their assets
+    keep = set(manifest.values()) | set(previous.values()) | {'manifest.json'}
+    for entry in os.listdir(dist_dir):
+        base = entry[:-3] if entry.endswith(('.gz', '.br')) else entry
+        if base not in keep:
+            os.remove(os.path.join(dist_dir, entry))
+    return manifest
+
+
+def load_manifest(static_dir='static'):
+    try:
+        with open(os.path.join(static_dir, 'dist', 'manifest.json')) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def send_asset(static_dir, filename, accept_encodings):
+    """
+    Response for /assets/<filename>: a built (hashed) file, pre-compressed to
+    match Accept-Encoding, or an unbuilt bundle assembled from its sources.
+    Returns None if there is no such asset.
+    """
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    path = safe_join(os.path.join(static_dir, 'dist'), filename)
+    if path and filename != 'manifest.json' and os.path.isfile(path):
+        encoding = None
+        for candidate, suffix in (('br', '.br'), ('gzip', '.gz')):
+            if accept_encodings[candidate] and os.path.isfile(path + suffix):
+                encoding, path = candidate, path + suffix
+                break
+        response = send_file(path, mimetype=mimetype, conditional=True, max_age=IMMUTABLE_MAX_AGE)
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        response.vary.add('Accept-Encoding')
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+        return response
+    if filename in BUNDLES:
+        response = Response(_bundle_source(os.path.join(static_dir, 'src'), filename), mimetype=mimetype)
+        response.cache_control.no_cache = True
+        return response
+    return None
+
+
+def compress_response(response, accept_encodings, min_size=500):
+    """Compress a buffered HTML response with brotli or gzip when the client accepts it"""
+    if (response.direct_passthrough or response.is_streamed or response.status_code in (204, 304)
+            or 'Content-Encoding' in response.headers or response.mimetype not in COMPRESSIBLE_TYPES):
+        return response
+    response.vary.add('Accept-Encoding')
+    data = response.get_data()
+    if len(data) < min_size:
+        return response
+    if BROTLI_AVAILABLE and accept_encodings['br']:
+        response.set_data(brotli.compress(data, quality=5))
+        response.headers['Content-Encoding'] = 'br'
+    elif accept_encodings['gzip']:
+        response.set_data(gzip.compress(data, compresslevel=6))
+        response.headers['Content-Encoding'] = 'gzip'
+    return response
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--static-dir', default='static')
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    manifest = build(args.static_dir)
+    if not BROTLI_AVAILABLE:
+        logger.info("brotli is not installed; only .gz copies were written (pip install brotli)")
+    print(json.dumps(manifest, indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,118 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import tarfile
+import zipfile
+from multiprocessing import Pool
+
+logger = logging.getLogger(__name__)
+
+RESUME_EXTENSIONS = ('.pdf', '.docx', '.doc')
+
+_EMAIL_RE = re.compile(r'[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}')
+
+
+def extract_archive(archive_path, dest_dir):
+    """Extract a .zip/.tar(.gz) archive of resumes into dest_dir and return dest_dir"""
+    os.makedirs(dest_dir, exist_ok=True)
+    if zipfile.is_zipfile(archive_path):
+        with zipfile.ZipFile(archive_path) as zf:
+            for member in zf.namelist():
+                if member.lower().endswith(RESUME_EXTENSIONS) and not member.startswith(('/', '..')):
+                    zf.extract(member, dest_dir)
+    elif tarfile.is_tarfile(archive_path):
+        with tarfile.open(archive_path) as tf:
+            members = [m for m in tf.getmembers()
+                       if m.isfile() and m.name.lower().endswith(RESUME_EXTENSIONS)]
+            if hasattr(tarfile, 'data_filter'):
+                tf.extractall(dest_dir, members=members, filter='data')
+            else:
+                members = [m for m in members if not m.name.startswith(('/', '..'))]
+                tf.extractall(dest_dir, members=members)
+    else:
+        raise ValueError(f"Unsupported archive format: {archive_path}")
+    return dest_dir
+
+
+def discover_resumes(root):
+    """Return sorted paths of all resume files under root"""
+    paths = []
+    for dirpath, _, filenames in os.walk(root):
+        for filename in filenames:
+            if filename.lower().endswith(RESUME_EXTENSIONS):
+                paths.append(os.path.join(dirpath, filename))
+    return sorted(paths)
+
+
+def file_fingerprint(path):
+    """
+    Identity for checkpointing: a hash of the file's content, so a resume is
+    recognised after an archive is extracted again (zip members get fresh mtimes)
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def load_checkpoint(checkpoint_path):
+    try:
+        if os.path.exists(checkpoint_path):
+            with open(checkpoint_path, 'r', encoding='utf-8') as f:
+                return set(json.load(f).get('done', []))
+    except Exception as e:
+        logger.error("Could not read ingest checkpoint %s: %s", checkpoint_path, e)
+    return set()
+
+
+def save_checkpoint(checkpoint_path, done):
+    tmp_path = f"{checkpoint_path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'done': sorted(done)}, f)
+    os.replace(tmp_path, checkpoint_path)
+
+
+def extract_email(text, path=''):
+    """Applicant email from an `email_` filename prefix (as /form saves uploads), else from the resume text"""
+    match = _EMAIL_RE.fullmatch(os.path.basename(path).split('_', 1)[0])
+    if match:
+        return match.group(0)
+    match = _EMAIL_RE.search(text or '')
+    return match.group(0) if match else None
+
+
+def guess_name(text, path):
+    """First non-empty line of the resume if it looks like a name, else the file stem"""
+    for line in (text or '').splitlines():
+        line = line.strip()
+        if line:
+            if 1 < len(line.split()) <= 4 and not _EMAIL_RE.search(line) and not any(c.isdigit() for c in line):
+                return line
+            break
+    stem = os.path.splitext(os.path.basename(path))[0]
+    stem = re.sub(r'\s*\(\d+\)$', '', stem.split('_', 1)[-1] if '@' in stem else stem)
+    return re.sub(r'[_-]+', ' ', stem).strip() or 'Candidate'
+
+
+def _parse_worker(args):
+    parse_fn, path = args
+    try:
+        return path, parse_fn(path)
+    except Exception as e:
+        logger.error("Failed to parse %s: %s", path, e)
+        return path, ''
+
+
+def parse_resumes_parallel(paths, parse_fn, workers=None, chunksize=4):
+    """Yield (path, text) as resumes finish parsing across a process pool"""
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        for path in paths:
+            yield _parse_worker((parse_fn, path))
+        return
+    with Pool(processes=workers) as pool:
+        for result in pool.imap_unordered(_parse_worker, [(parse_fn, p) for p in paths], chunksize=chunksize):
+            yield result
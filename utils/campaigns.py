@@ -0,0 +1,235 @@
+"""
+Bulk invitation campaigns: coding test links emailed to many candidates at once.
+
+A campaign is written once when it is created, with every recipient and the
+link minted for them, and delivery outcomes are appended as they happen:
+
+    <id>.json           campaign definition and recipients
+    <id>.status.jsonl   one line per delivery attempt: {"id", "status", "attempt", "ts", "error"}
+
+A recipient's status is that of their last attempt ('queued' before any).
+Delivery runs outside the web workers (`flask send-campaigns`): recipients
+are sent in batches over one SMTP connection per batch, throttled by a token
+bucket shared by all connections, so N invitations take about N / rate
+seconds. Failed recipients are retried by later runs up to max_attempts, and
+a campaign is delivered by one process at a time (flock on <id>.lock).
+"""
+import fcntl
+import json
+import logging
+import os
+import string
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from datetime import datetime
+
+from utils.admission import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+RECIPIENT_STATUSES = ('queued', 'sent', 'failed')
+DEFAULT_SUBJECT = 'Coding Assessment Link'
+DEFAULT_BODY = ("Hi $name,\n\nYou have been shortlisted for the $position position! "
+                "Please take your coding test here: $link\n\nBest,\nHiring Team")
+
+
+class CampaignStore:
+    """Campaign files under `directory`"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, campaign_id, suffix):
+        if not campaign_id or not all(c.isalnum() or c == '-' for c in campaign_id):
+            raise KeyError(campaign_id)
+        return os.path.join(self.directory, f'{campaign_id}{suffix}')
+
+    def create(self, recipients, job_id=None, subject=DEFAULT_SUBJECT, body=DEFAULT_BODY, selection=None):
+        """
+        Write a new campaign. `recipients` are dicts with id (candidate ID),
+        name, email, position and link; `body` is a string.Template with
+        $name, $link and $position. Returns the campaign.
+        """
+        string.Template(body).substitute(name='', link='', position='')  # fail on unknown placeholders
+        campaign = {
+            'id': f"{datetime.now():%Y%m%d}-{uuid.uuid4().hex[:8]}",
+            'created_at': datetime.now().isoformat(),
+            'job_id': job_id,
+            'subject': subject,
+            'body': body,
+            'selection': selection or {},
+            'recipients': recipients
+        }
+        path = self._path(campaign['id'], '.json')
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(campaign, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+        logger.info("Created campaign %s with %s recipients", campaign['id'], len(recipients))
+        return campaign
+
+    def get(self, campaign_id):
+        """The campaign, or None"""
+        try:
+            with open(self._path(campaign_id, '.json'), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (KeyError, FileNotFoundError):
+            return None
+
+    def ids(self):
+        return sorted(name[:-5] for name in os.listdir(self.directory) if name.endswith('.json'))
+
+    def record(self, campaign_id, results):
+        """Append delivery attempts, [{'id', 'status', 'attempt', 'error'?}], in one O_APPEND write"""
+        if not results:
+            return
+        now = datetime.now().isoformat()
+        payload = ''.join(json.dumps({**result, 'ts': now}, ensure_ascii=False) + '\n' for result in results)
+        fd = os.open(self._path(campaign_id, '.status.jsonl'), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, payload.encode('utf-8'))
+        finally:
+            os.close(fd)
+
+    def statuses(self, campaign_id):
+        """{candidate_id: last attempt record}"""
+        latest = {}
+        try:
+            with open(self._path(campaign_id, '.status.jsonl'), 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        result = json.loads(line)
+                    except ValueError:
+                        continue  # torn last line
+                    latest[result['id']] = result
+        except FileNotFoundError:
+            pass
+        return latest
+
+    def summary(self, campaign_id, include_recipients=None):
+        """
+        Campaign metadata and recipient counts per status; include_recipients
+        ('queued', 'sent', 'failed' or 'all') lists the matching recipients.
+        Returns None for an unknown campaign.
+        """
+        campaign = self.get(campaign_id)
+        if campaign is None:
+            return None
+        statuses = self.statuses(campaign_id)
+        counts = dict.fromkeys(RECIPIENT_STATUSES, 0)
+        listed = []
+        for recipient in campaign['recipients']:
+            result = statuses.get(recipient['id'])
+            status = result['status'] if result else 'queued'
+            counts[status] += 1
+            if include_recipients in ('all', status):
+                listed.append({'id': recipient['id'], 'email': recipient['email'], 'status': status,
+                               'attempts': result['attempt'] if result else 0,
+                               'error': result.get('error') if result else None,
+                               'updated_at': result['ts'] if result else None})
+        summary = {key: campaign[key] for key in ('id', 'created_at', 'job_id', 'subject', 'selection')}
+        summary.update(total=len(campaign['recipients']), counts=counts)
+        if include_recipients:
+            summary['recipients'] = listed
+        return summary
+
+    def pending(self, campaign_id, max_attempts=3):
+        """Recipients not yet sent that have attempts left, as (recipient, attempts so far)"""
+        campaign = self.get(campaign_id)
+        statuses = self.statuses(campaign_id)
+        pending = []
+        for recipient in campaign['recipients']:
+            result = statuses.get(recipient['id'])
+            if result is None:
+                pending.append((recipient, 0))
+            elif result['status'] != 'sent' and result['attempt'] < max_attempts:
+                pending.append((recipient, result['attempt']))
+        return campaign, pending
+
+    def delivery_lock(self, campaign_id):
+        """Exclusive non-blocking lock on a campaign's delivery; returns the open file or None if held"""
+        lock_file = open(self._path(campaign_id, '.lock'), 'a')
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return None
+        return lock_file
+
+
+def render_invitation(campaign, recipient):
+    return string.Template(campaign['body']).substitute(
+        name=recipient['name'], link=recipient['link'], position=recipient['position'])
+
+
+def deliver(store, campaign_id, connect, build_message, rate=5.0, batch_size=100, connections=2,
+            max_attempts=3, context=None, on_batch=None):
+    """
+    Send a campaign's pending invitations.
+
+    connect()                      opens an SMTP connection (a context manager with send(message))
+    build_message(campaign, r)     the message for recipient r
+    rate                           messages per second across all connections
+    batch_size                     messages sent over one connection
+    connections                    batches sent in parallel
+    context                        optional callable returning a context manager entered by each sender
+                                   thread (e.g. app.app_context)
+    on_batch(campaign, results)    called with attempt records once they are stored
+
+    Returns {'sent', 'failed', 'skipped'} for this run; skipped is True if
+    another process holds the campaign.
+    """
+    lock = store.delivery_lock(campaign_id)
+    if lock is None:
+        logger.info("Campaign %s is being delivered by another process", campaign_id)
+        return {'sent': 0, 'failed': 0, 'skipped': True}
+    totals = {'sent': 0, 'failed': 0, 'skipped': False}
+    totals_lock = threading.Lock()
+    bucket = TokenBucket(rate, 1)  # no bursts above the provider rate
+    try:
+        campaign, pending = store.pending(campaign_id, max_attempts)
+        batches = [pending[i:i + batch_size] for i in range(0, len(pending), batch_size)]
+        logger.info("Campaign %s: sending %s invitations in %s batches at %s/s",
+                    campaign_id, len(pending), len(batches), rate)
+
+        def settle(results):
+            # Stored before the next send, so a crash never loses a delivered invitation's record
+            store.record(campaign_id, results)
+            if on_batch:
+                on_batch(campaign, results)
+            with totals_lock:
+                for result in results:
+                    totals[result['status']] += 1
+
+        def send_batch(batch):
+            attempted = set()
+            with (context() if context else nullcontext()):
+                try:
+                    with connect() as connection:
+                        for recipient, attempts in batch:
+                            bucket.acquire(float('inf'))
+                            result = {'id': recipient['id'], 'attempt': attempts + 1}
+                            try:
+                                connection.send(build_message(campaign, recipient))
+                                result['status'] = 'sent'
+                            except Exception as e:
+                                result.update(status='failed', error=str(e) or type(e).__name__)
+                            attempted.add(recipient['id'])
+                            settle([result])
+                except Exception as e:
+                    # The connection failed (or dropped): everything not yet attempted failed with it
+                    logger.error("Campaign %s: SMTP connection failed: %s", campaign_id, e)
+                    settle([{'id': recipient['id'], 'attempt': attempts + 1, 'status': 'failed',
+                             'error': str(e) or type(e).__name__}
+                            for recipient, attempts in batch if recipient['id'] not in attempted])
+
+        with ThreadPoolExecutor(max_workers=max(1, connections), thread_name_prefix='campaign') as executor:
+            for future in [executor.submit(send_batch, batch) for batch in batches]:
+                future.result()
+    finally:
+        lock.close()
+    logger.info("Campaign %s: %s sent, %s failed", campaign_id, totals['sent'], totals['failed'])
+    return totals
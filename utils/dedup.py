@@ -0,0 +1,132 @@
+import hashlib
+import random
+import re
+
+# MinHash / LSH parameters. 16 bands of 8 rows puts the LSH candidate
+# threshold at roughly (1/16) ** (1/8) ~= 0.71 Jaccard similarity.
+NUM_PERM = 128
+LSH_BANDS = 16
+LSH_ROWS = NUM_PERM // LSH_BANDS
+SHINGLE_SIZE = 3
+DUPLICATE_THRESHOLD = 0.8
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+_rng = random.Random(1729)  # fixed seed so signatures are stable across restarts
+_PERMUTATIONS = [
+    (_rng.randint(1, _MERSENNE_PRIME - 1), _rng.randint(0, _MERSENNE_PRIME - 1))
+    for _ in range(NUM_PERM)
+]
+
+_WORD_RE = re.compile(r'[a-z0-9]+')
+
+
+def normalize_email(email):
+    """Lowercase, strip +tags and gmail dots so aliases map to one address"""
+    if not email:
+        return ''
+    email = email.strip().lower()
+    if '@' not in email:
+        return email
+    local, domain = email.rsplit('@', 1)
+    local = local.split('+', 1)[0]
+    if domain in ('gmail.com', 'googlemail.com'):
+        local = local.replace('.', '')
+        domain = 'gmail.com'
+    return f"{local}@{domain}"
+
+
+def _shingles(text):
+    words = _WORD_RE.findall((text or '').lower())
+    if len(words) < SHINGLE_SIZE:
+        return {' '.join(words)} if words else set()
+    return {' '.join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+
+
+def _hash_shingle(shingle):
+    return int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=4).digest(), 'little')
+
+
+def minhash_signature(text):
+    """Return the MinHash signature of a document as a list of NUM_PERM ints"""
+    hashes = [_hash_shingle(s) for s in _shingles(text)]
+    if not hashes:
+        return []
+    return [
+        min(((a * h + b) % _MERSENNE_PRIME) & _MAX_HASH for h in hashes)
+        for a, b in _PERMUTATIONS
+    ]
+
+
+def estimate_similarity(sig_a, sig_b):
+    """Estimated Jaccard similarity of two signatures"""
+    if not sig_a or not sig_b or len(sig_a) != len(sig_b):
+        return 0.0
+    return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / len(sig_a)
+
+
+class DuplicateIndex:
+    """
+    In-memory LSH index over resume MinHash signatures plus an exact index of
+    normalized emails. Lookups only compare against keys that share an LSH
+    bucket, so the cost does not grow with the number of stored applications.
+    """
+
+    def __init__(self, threshold=DUPLICATE_THRESHOLD):
+        self.threshold = threshold
+        self._buckets = [{} for _ in range(LSH_BANDS)]
+        self._signatures = {}
+        self._emails = {}
+
+    def __len__(self):
+        return len(self._signatures)
+
+    def _band_keys(self, signature):
+        for band in range(LSH_BANDS):
+            start = band * LSH_ROWS
+            yield band, tuple(signature[start:start + LSH_ROWS])
+
+    def add(self, key, signature=None, email=None):
+        if signature:
+            self._signatures[key] = signature
+            for band, band_key in self._band_keys(signature):
+                self._buckets[band].setdefault(band_key, set()).add(key)
+        normalized = normalize_email(email)
+        if normalized:
+            self._emails.setdefault(normalized, set()).add(key)
+
+    def remove(self, key, email=None):
+        signature = self._signatures.pop(key, None)
+        if signature:
+            for band, band_key in self._band_keys(signature):
+                bucket = self._buckets[band].get(band_key)
+                if bucket:
+                    bucket.discard(key)
+                    if not bucket:
+                        del self._buckets[band][band_key]
+        normalized = normalize_email(email)
+        if normalized in self._emails:
+            self._emails[normalized].discard(key)
+            if not self._emails[normalized]:
+                del self._emails[normalized]
+
+    def query(self, signature=None, email=None):
+        """
+        Return a list of (key, similarity, reason) for near-duplicate entries,
+        best match first. reason is 'email' or 'resume'.
+        """
+        matches = {}
+        for key in self._emails.get(normalize_email(email), ()):
+            matches[key] = (key, 1.0, 'email')
+        if signature:
+            candidates = set()
+            for band, band_key in self._band_keys(signature):
+                candidates.update(self._buckets[band].get(band_key, ()))
+            for key in candidates:
+                if key in matches:
+                    continue
+                similarity = estimate_similarity(signature, self._signatures.get(key))
+                if similarity >= self.threshold:
+                    matches[key] = (key, similarity, 'resume')
+        return sorted(matches.values(), key=lambda m: m[1], reverse=True)
@@ -0,0 +1,316 @@
+"""
+Streaming export of candidate records to CSV, NDJSON or Parquet.
+
+    python -m utils.export --format csv --since 2025-06-01T00:00:00 candidate_states.json out.csv
+    python -m utils.export --format parquet --watermark-file .export-mark candidate_states.json out.parquet
+
+Records are read from the state snapshot one candidate at a time (with the
+event log tail applied) and written as they are read, so memory stays flat
+regardless of store size.
+"""
+import argparse
+import csv
+import io
+import json
+import logging
+import os
+import sys
+from datetime import datetime, timedelta
+
+from utils.admin_query import STAGE_ANALYSIS, STAGES, candidate_stage, candidate_status
+from utils.state_store import StateStore
+
+logger = logging.getLogger(__name__)
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+FORMATS = ('csv', 'ndjson', 'parquet')
+CONTENT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+    'parquet': 'application/vnd.apache.parquet'
+}
+# A state's timestamps are set shortly before its write reaches the store; watermarks
+# trail the clock by this much so such writes are exported next time instead of skipped
+WATERMARK_LAG_SECONDS = 60
+
+STAGE_PREFIX = {'coding_test': 'coding', 'tech_interview': 'tech', 'hr_interview': 'hr'}
+
+COLUMNS = ['id', 'job_id', 'name', 'email', 'skills', 'created_at', 'updated_at', 'stage', 'status', 'duplicate_of']
+for _stage in STAGES:
+    _p = STAGE_PREFIX[_stage]
+    COLUMNS += [f'{_p}_score', f'{_p}_recommendation', f'{_p}_feedback', f'{_p}_analyzed_at',
+                f'{_p}_completed', f'{_p}_completed_at']
+INT_COLUMNS = {f'{p}_score' for p in STAGE_PREFIX.values()}
+BOOL_COLUMNS = {f'{p}_completed' for p in STAGE_PREFIX.values()}
+
+PARQUET_BATCH_ROWS = 5000
+
+
+def updated_at(state):
+    """Latest timestamp recorded on the candidate (ISO string)"""
+    stamps = [state.get('created_at') or '']
+    for stage in STAGES:
+        stamps.append(state.get(f'{stage}_completed_at') or '')
+        stamps.append((state.get(STAGE_ANALYSIS[stage]) or {}).get('analyzed_at') or '')
+    return max(stamps)
+
+
+def flatten(candidate_id, state):
+    """One flat export row per candidate"""
+    row = {
+        'id': candidate_id,
+        'job_id': state.get('job_id'),
+        'name': state.get('name'),
+        'email': state.get('email'),
+        'skills': state.get('skills'),
+        'created_at': state.get('created_at'),
+        'updated_at': updated_at(state) or None,
+        'stage': candidate_stage(state),
+        'status': candidate_status(state),
+        'duplicate_of': state.get('duplicate_of')
+    }
+    for stage in STAGES:
+        prefix = STAGE_PREFIX[stage]
+        analysis = state.get(STAGE_ANALYSIS[stage]) or {}
+        row[f'{prefix}_score'] = analysis.get('score')
+        row[f'{prefix}_recommendation'] = analysis.get('recommendation')
+        row[f'{prefix}_feedback'] = analysis.get('feedback')
+        row[f'{prefix}_analyzed_at'] = analysis.get('analyzed_at')
+        row[f'{prefix}_completed'] = bool(state.get(f'{stage}_completed'))
+        row[f'{prefix}_completed_at'] = state.get(f'{stage}_completed_at')
+    return row
+
+
+def export_rows(records, since=None):
+    """Flatten (candidate_id, state) pairs, keeping those updated after `since`"""
+    for candidate_id, state in records:
+        if since and updated_at(state) <= since:
+            continue
+        yield flatten(candidate_id, state)
+
+
+def iter_state_file(path, chunk_size=1 << 16):
+    """
+    Yield (candidate_id, state) from a candidate_states.json object without
+    loading the whole file: each value is decoded on its own from a rolling buffer.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        yield from _iter_json_object(f, path, chunk_size)
+
+
+def _iter_json_object(f, path, chunk_size=1 << 16):
+    decoder = json.JSONDecoder()
+    buf, pos, eof = '', 0, False
+    start = 0  # beginning of the entry being decoded; kept across refills
+
+    def fill():
+        nonlocal buf, pos, eof, start
+        chunk = f.read(chunk_size)
+        eof = not chunk
+        keep = min(start, pos)
+        buf, pos, start = buf[keep:] + chunk, pos - keep, start - keep
+
+    def next_char():
+        # Skip whitespace, reading more input as needed; '' at end of file
+        nonlocal pos
+        while True:
+            while pos < len(buf) and buf[pos] in ' \t\r\n':
+                pos += 1
+            if pos < len(buf) or eof:
+                return buf[pos] if pos < len(buf) else ''
+            fill()
+
+    if next_char() != '{':
+        raise ValueError(f"{path} does not contain a JSON object")
+    pos += 1
+    while True:
+        start = pos
+        char = next_char()
+        if char == ',':
+            pos += 1
+            char = next_char()
+        if char == '}':
+            return
+        if char == '':
+            raise ValueError(f"Unexpected end of {path}")
+        start = pos
+        try:
+            key, pos = decoder.raw_decode(buf, pos)
+            if next_char() != ':':
+                raise ValueError('expected ":"')
+            pos += 1
+            next_char()
+            value, pos = decoder.raw_decode(buf, pos)
+            # A number cut at the buffer edge decodes "successfully" but isn't followed by , or }
+            if next_char() not in (',', '}'):
+                raise ValueError('expected "," or "}"')
+        except ValueError:
+            if eof:
+                raise
+            pos = start
+            fill()
+            continue
+        yield key, value
+
+
+def iter_store(path):
+    """
+    (candidate_id, state) for a state snapshot plus its event log. Only the
+    log tail (bounded by compaction) is held in memory; the snapshot is streamed.
+    """
+    snapshot, changes = StateStore(path).open_snapshot_and_tail()
+    if snapshot is not None:
+        with snapshot:
+            for candidate_id, state in _iter_json_object(snapshot, path):
+                if candidate_id not in changes:
+                    yield candidate_id, state
+    for candidate_id, state in changes.items():
+        if state is not None:
+            yield candidate_id, state
+
+
+def write_csv(rows):
+    """Yield CSV text chunks, header first"""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=COLUMNS)
+    writer.writeheader()
+    for row in rows:
+        writer.writerow(row)
+        if buffer.tell() > 1 << 15:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def write_ndjson(rows):
+    for row in rows:
+        yield json.dumps(row, ensure_ascii=False) + '\n'
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file object whose written bytes are drained by the caller"""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def _parquet_schema():
+    fields = []
+    for column in COLUMNS:
+        if column in INT_COLUMNS:
+            fields.append(pyarrow.field(column, pyarrow.int64()))
+        elif column in BOOL_COLUMNS:
+            fields.append(pyarrow.field(column, pyarrow.bool_()))
+        else:
+            fields.append(pyarrow.field(column, pyarrow.string()))
+    return pyarrow.schema(fields)
+
+
+def write_parquet(rows, batch_rows=PARQUET_BATCH_ROWS):
+    """Yield Parquet bytes, one row group per `batch_rows` rows"""
+    if not PARQUET_AVAILABLE:
+        raise RuntimeError('Parquet export requires pyarrow')
+    schema = _parquet_schema()
+    sink = _ChunkSink()
+    writer = pyarrow.parquet.ParquetWriter(sink, schema, compression='zstd')
+    batch = []
+
+    def flush():
+        columns = {c: [row[c] for row in batch] for c in COLUMNS}
+        writer.write_table(pyarrow.Table.from_pydict(columns, schema=schema))
+        batch.clear()
+
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_rows:
+            flush()
+            yield sink.drain()
+    if batch:
+        flush()
+    writer.close()
+    yield sink.drain()
+
+
+WRITERS = {'csv': write_csv, 'ndjson': write_ndjson, 'parquet': write_parquet}
+
+
+def export_watermark(now=None):
+    """The `since` value for the next delta export started now"""
+    return ((now or datetime.now()) - timedelta(seconds=WATERMARK_LAG_SECONDS)).isoformat()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('source', help='candidate state file')
+    parser.add_argument('output', help="output file ('-' for stdout; not for parquet)")
+    parser.add_argument('--format', choices=FORMATS, default='csv')
+    parser.add_argument('--since', help='only candidates updated after this ISO timestamp')
+    parser.add_argument('--watermark-file',
+                        help='read --since from this file and store the new watermark there after a successful export')
+    args = parser.parse_args(argv)
+
+    if args.format == 'parquet' and not PARQUET_AVAILABLE:
+        parser.error('Parquet export requires pyarrow (pip install pyarrow)')
+    since = args.since
+    if args.watermark_file and not since and os.path.exists(args.watermark_file):
+        with open(args.watermark_file) as f:
+            since = f.read().strip() or None
+    # Records changed while the export runs are picked up again next time
+    watermark = export_watermark()
+
+    rows = export_rows(iter_store(args.source), since)
+    count = 0
+
+    def counted(rows):
+        nonlocal count
+        for row in rows:
+            count += 1
+            yield row
+
+    chunks = WRITERS[args.format](counted(rows))
+    binary = args.format == 'parquet'
+    if args.output == '-':
+        out = sys.stdout.buffer if binary else sys.stdout
+        for chunk in chunks:
+            out.write(chunk)
+    else:
+        tmp_path = f"{args.output}.tmp"
+        with open(tmp_path, 'wb' if binary else 'w', **({} if binary else {'encoding': 'utf-8', 'newline': ''})) as out:
+            for chunk in chunks:
+                out.write(chunk)
+        os.replace(tmp_path, args.output)
+
+    if args.watermark_file:
+        with open(args.watermark_file, 'w') as f:
+            f.write(watermark)
+    print(f"Exported {count} candidates{f' updated after {since}' if since else ''}. Watermark: {watermark}",
+          file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
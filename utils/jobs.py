@@ -0,0 +1,251 @@
+"""
+Job requisitions and per-job candidate partitions.
+
+A Job holds what used to be hardcoded for the single opening: the job
+description, screening keywords, question bank, per-stage pass scores and the
+offer letter's position title and template. Jobs are defined in jobs.json:
+
+    {"jobs": [{"id": "python-developer", "title": "Python Developer",
+               "description": "Entry level Python developer",
+               "screening_keywords": ["python"],
+               "question_bank": "questions/question_bank.json",
+               "pass_scores": {"coding_test": 60, "tech_interview": 60, "hr_interview": 70},
+               "offer_template": null, "status": "open"}]}
+
+A job's question_bank must lie under questions/ and its offer_template
+under jobs/ (paths relative to the working directory), since both come
+from the admin API.
+
+Each job's candidates form a JobPartition with its own creation-ordered
+index, duplicate-application index, question usage and analytics, so
+screening and per-job queries never touch other jobs' candidates.
+"""
+import html
+import json
+import logging
+import os
+import re
+import string
+import threading
+import time
+
+from werkzeug.security import safe_join
+
+from utils.admin_query import STAGES, CandidateIndex
+from utils.analytics import PipelineAnalytics
+from utils.dedup import DuplicateIndex
+
+logger = logging.getLogger(__name__)
+
+JOB_STATUSES = ('open', 'closed')
+QUESTION_BANK_DIR = 'questions'
+OFFER_TEMPLATE_DIR = 'jobs'
+_JOB_ID_RE = re.compile(r'^[a-z0-9][a-z0-9-]{0,63}$')
+
+
+def resolve_job_file(directory, path):
+    """`path` (e.g. 'questions/backend.json') if it lies inside `directory`; ValueError otherwise"""
+    if not isinstance(path, str) or not path:
+        raise ValueError(f"expected a file path under {directory}/")
+    resolved = safe_join(directory, os.path.relpath(path, directory))
+    if resolved is None:
+        raise ValueError(f"{path!r} is not under {directory}/")
+    return resolved
+
+
+class Job:
+    """
+    One job requisition.
+
+    screening_keywords  a resume/skills text mentioning any of these is shortlisted (none: everyone)
+    question_bank       path of the question bank used for this job's tests (under questions/)
+    pass_scores         {stage: minimum score}; stages without one keep the analyzer's recommendation
+    offer_template      optional HTML file (under jobs/) for the offer letter, with $name and
+                        $position placeholders; used instead of a generated letter
+    """
+
+    FIELDS = ('id', 'title', 'description', 'screening_keywords', 'question_bank', 'pass_scores',
+              'offer_template', 'status')
+
+    def __init__(self, id, title, description='', screening_keywords=(), question_bank=None,
+                 pass_scores=None, offer_template=None, status='open'):
+        if not isinstance(id, str) or not _JOB_ID_RE.match(id):
+            raise ValueError('job id must be lowercase letters, digits and dashes')
+        if not title:
+            raise ValueError('job title is required')
+        if status not in JOB_STATUSES:
+            raise ValueError(f"status must be one of {', '.join(JOB_STATUSES)}")
+        pass_scores = dict(pass_scores or {})
+        for stage, score in pass_scores.items():
+            if stage not in STAGES:
+                raise ValueError(f"unknown stage {stage!r} in pass_scores")
+            if isinstance(score, bool) or not isinstance(score, (int, float)) or not 0 <= score <= 100:
+                raise ValueError(f"pass score for {stage} must be between 0 and 100")
+        if offer_template is not None:
+            resolve_job_file(OFFER_TEMPLATE_DIR, offer_template)
+        self.id = id
+        self.title = title
+        self.description = description or ''
+        self.screening_keywords = tuple(k.lower() for k in screening_keywords or ())
+        self.question_bank = question_bank
+        self.pass_scores = pass_scores
+        self.offer_template = offer_template
+        self.status = status
+
+    @classmethod
+    def from_dict(cls, data):
+        if not isinstance(data, dict):
+            raise ValueError('job must be an object')
+        unknown = set(data) - set(cls.FIELDS)
+        if unknown:
+            raise ValueError(f"unknown job fields: {', '.join(sorted(unknown))}")
+        return cls(**data)
+
+    def to_dict(self):
+        data = {field: getattr(self, field) for field in self.FIELDS}
+        data['screening_keywords'] = list(self.screening_keywords)
+        return data
+
+    def __repr__(self):
+        return f"Job({self.id!r})"
+
+    @property
+    def is_open(self):
+        return self.status == 'open'
+
+    def shortlists(self, text):
+        """Initial screening rule: the text mentions one of the job's keywords"""
+        text = (text or '').lower()
+        return not self.screening_keywords or any(keyword in text for keyword in self.screening_keywords)
+
+    def pass_score(self, stage):
+        return self.pass_scores.get(stage)
+
+    def render_offer(self, name):
+        """Offer letter HTML from offer_template, or None if the job has no template"""
+        if not self.offer_template:
+            return None
+        with open(resolve_job_file(OFFER_TEMPLATE_DIR, self.offer_template), 'r', encoding='utf-8') as f:
+            template = string.Template(f.read())
+        return template.safe_substitute(name=html.escape(name), position=html.escape(self.title))
+
+
+class JobPartition:
+    """A job and the indexes over its candidates"""
+
+    def __init__(self, job, question_bank):
+        self.job = job
+        self.question_bank = question_bank
+        self.candidates = CandidateIndex()
+        self.duplicates = DuplicateIndex()
+        self.analytics = PipelineAnalytics()
+        self.question_usage = {}  # normalized email -> {question_type: used bits}
+
+
+class JobBoard:
+    """
+    Jobs from `path` plus `default_job`, which always exists (jobs.json may
+    override it) and owns candidates recorded before jobs existed.
+    `load_bank(path)` returns the QuestionBank for a job's question_bank path;
+    save() only accepts banks under questions/ (or the default job's bank).
+    The file is re-read when it changes (checked at most every `reload_interval`
+    seconds), so jobs saved by one worker reach the others.
+    """
+
+    def __init__(self, path, default_job, load_bank, reload_interval=5):
+        self.path = path
+        self.default_job = default_job
+        self.load_bank = load_bank
+        self.reload_interval = reload_interval
+        self._partitions = {}
+        self._lock = threading.RLock()
+        self._mtime = None
+        self._checked = 0
+        self.reload()
+
+    def _read(self):
+        jobs = {self.default_job.id: self.default_job}
+        if os.path.exists(self.path):
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for data in json.load(f).get('jobs', []):
+                    job = Job.from_dict(data)
+                    jobs[job.id] = job
+        return jobs
+
+    def reload(self):
+        with self._lock:
+            try:
+                self._mtime = os.path.getmtime(self.path)
+            except OSError:
+                self._mtime = None
+            self._checked = time.monotonic()
+            for job in self._read().values():
+                self._install(job)
+
+    def _install(self, job):
+        bank = self.load_bank(job.question_bank)
+        partition = self._partitions.get(job.id)
+        if partition is None:
+            self._partitions[job.id] = JobPartition(job, bank)
+        else:
+            # Keep the candidate indexes; only the definition changes
+            partition.job, partition.question_bank = job, bank
+
+    def _maybe_reload(self):
+        if time.monotonic() - self._checked < self.reload_interval:
+            return
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            mtime = None
+        self._checked = time.monotonic()
+        if mtime != self._mtime:
+            try:
+                self.reload()
+            except (OSError, ValueError) as e:
+                logger.error("Could not reload jobs from %s: %s", self.path, e)
+
+    def __contains__(self, job_id):
+        self._maybe_reload()
+        return job_id in self._partitions
+
+    def partition(self, job_id=None):
+        """Partition of `job_id`; candidates without one (or of an unknown job) belong to the default job"""
+        self._maybe_reload()
+        partition = self._partitions.get(job_id or self.default_job.id)
+        if partition is None:
+            logger.warning("Unknown job %r; using %s", job_id, self.default_job.id)
+            partition = self._partitions[self.default_job.id]
+        return partition
+
+    def get(self, job_id):
+        self._maybe_reload()
+        partition = self._partitions.get(job_id)
+        return partition.job if partition is not None else None
+
+    def jobs(self, status=None):
+        self._maybe_reload()
+        return [p.job for p in self._partitions.values() if status in (None, p.job.status)]
+
+    def partitions(self):
+        return list(self._partitions.values())
+
+    def save(self, job):
+        """Add or replace a job and write every job back to the file"""
+        if job.question_bank and job.question_bank != self.default_job.question_bank:
+            resolve_job_file(QUESTION_BANK_DIR, job.question_bank)
+        with self._lock:
+            self.load_bank(job.question_bank)  # fail before writing if the bank can't be loaded
+            jobs = self._read()
+            jobs[job.id] = job
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'jobs': [j.to_dict() for j in jobs.values()]}, f, indent=2, ensure_ascii=False)
+                f.write('\n')
+            os.replace(tmp_path, self.path)
+            self._install(job)
+            self._mtime = os.path.getmtime(self.path)
+        return job
@@ -1,11 +1,16 @@
 import requests
 import time
 import os
+import logging
+from urllib.parse import urlparse
 
-JUDGE0_URL = "https://judge0-ce.p.rapidapi.com"
+logger = logging.getLogger(__name__)
+
+# Override to point at a self-hosted Judge0 or a local stand-in
+JUDGE0_URL = os.getenv("JUDGE0_URL", "https://judge0-ce.p.rapidapi.com").rstrip("/")
 JUDGE0_HEADERS = {
     "X-RapidAPI-Key": os.getenv("RAPIDAPI_KEY", "YOUR_RAPIDAPI_KEY"),  # Get from environment variable
-    "X-RapidAPI-Host": "judge0-ce.p.rapidapi.com",
+    "X-RapidAPI-Host": urlparse(JUDGE0_URL).netloc,
     "Content-Type": "application/json"
 }
 
@@ -41,10 +46,10 @@ def submit_code(code, language, stdin=""):
         if resp.status_code == 201:
             return resp.json()["token"]
         else:
-            print(f"Judge0 API error: {resp.status_code} - {resp.text}")
+            logger.error("Judge0 API error: %s - %s", resp.status_code, resp.text)
             return "demo_token"
     except Exception as e:
-        print(f"Judge0 API connection error: {e}")
+        logger.error("Judge0 API connection error: %s", e)
         return "demo_token"
 
 def get_result(token):
@@ -67,10 +72,10 @@ def get_result(token):
                     continue
                 return result.get("stdout", "")
             else:
-                print(f"Judge0 API error: {resp.status_code} - {resp.text}")
+                logger.error("Judge0 API error: %s - %s", resp.status_code, resp.text)
                 return "Judge0 API error"
         except Exception as e:
-            print(f"Judge0 API connection error: {e}")
+            logger.error("Judge0 API connection error: %s", e)
             return "Judge0 connection error"
         time.sleep(1)
     return "Judge0 timeout or error" 
\ No newline at end of file
@@ -0,0 +1,204 @@
+"""
+Candidate lifecycle: expiry of unused links and cold archival.
+
+select_for_archive() picks the candidates that leave the hot store:
+
+    expired   still in progress with nothing recorded for `expire_days` (their links went unused)
+    rejected  failed a stage and idle for `archive_days`
+    hired     passed every stage and idle for `archive_days`
+
+ColdArchive keeps them queryable in gzip-compressed NDJSON segments, one
+per sweep, plus index.jsonl with one line per archived candidate:
+
+    candidates-<timestamp>.ndjson.gz   {"id", "reason", "archived_at", "state"} per line
+    index.jsonl                        {"id", "email", "job_id", "reason", "created_at", "archived_at", "segment"}
+
+The index is held in memory, so a lookup by ID, email, job or reason only
+decompresses the segments holding matches. A candidate archived twice
+(e.g. a sweep interrupted before the hot store was updated) resolves to
+its latest entry.
+"""
+import fcntl
+import gzip
+import json
+import logging
+import os
+import re
+import threading
+import time
+from datetime import datetime, timedelta
+
+from utils.admin_query import candidate_status
+from utils.bulk_ingest import RESUME_EXTENSIONS
+from utils.dedup import normalize_email
+from utils.export import updated_at
+
+logger = logging.getLogger(__name__)
+
+# Uploads from the application form are saved as "<email>_<original name>"
+_EMAIL_PREFIX_RE = re.compile(r'^[^@/\s]+@[^@_/\s]+_')
+
+ARCHIVE_REASONS = ('expired', 'rejected', 'hired')
+
+
+def select_for_archive(states, now, expire_days, archive_days):
+    """[(candidate_id, reason)] of candidates due for archival; 0 days disables a rule"""
+    expire_before = (now - timedelta(days=expire_days)).isoformat() if expire_days else None
+    archive_before = (now - timedelta(days=archive_days)).isoformat() if archive_days else None
+    selected = []
+    for candidate_id, state in list(states.items()):
+        last_seen = updated_at(state)
+        if not last_seen:
+            continue  # no timestamps (legacy record): age unknown, never swept
+        status = candidate_status(state)
+        if status == 'in_progress':
+            if expire_before and last_seen < expire_before:
+                selected.append((candidate_id, 'expired'))
+        elif archive_before and last_seen < archive_before:
+            selected.append((candidate_id, 'rejected' if status == 'rejected' else 'hired'))
+    return selected
+
+
+class ColdArchive:
+    """Compressed archive segments under `directory` with an in-memory index"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.index_path = os.path.join(directory, 'index.jsonl')
+        self._entries = {}  # candidate_id -> latest index entry
+        self._index_offset = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _refresh(self):
+        # Catch up with index lines appended since the last read (also by other processes)
+        with self._lock:
+            try:
+                with open(self.index_path, 'rb') as f:
+                    f.seek(self._index_offset)
+                    data = f.read()
+            except FileNotFoundError:
+                return
+            complete = data[:data.rfind(b'\n') + 1]
+            for line in complete.splitlines():
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                self._entries[entry['id']] = entry
+            self._index_offset += len(complete)
+
+    def write(self, records, now=None):
+        """
+        Archive [(candidate_id, state, reason)] as one new segment and index
+        them. Returns the segment name.
+        """
+        now = now or datetime.now()
+        archived_at = now.isoformat()
+        with open(os.path.join(self.directory, '.lock'), 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            segment = f"candidates-{now:%Y%m%dT%H%M%S}-{os.getpid()}.ndjson.gz"
+            path = os.path.join(self.directory, segment)
+            with gzip.open(f"{path}.tmp", 'wt', encoding='utf-8', compresslevel=9) as f:
+                for candidate_id, state, reason in records:
+                    f.write(json.dumps({'id': candidate_id, 'reason': reason, 'archived_at': archived_at,
+                                        'state': state}, ensure_ascii=False) + '\n')
+            # The hot copies are deleted once this returns: make the segment durable first
+            fd = os.open(f"{path}.tmp", os.O_RDONLY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+            os.replace(f"{path}.tmp", path)
+            lines = ''.join(json.dumps({
+                'id': candidate_id,
+                'email': normalize_email(state.get('email')),
+                'job_id': state.get('job_id'),
+                'reason': reason,
+                'created_at': state.get('created_at'),
+                'archived_at': archived_at,
+                'segment': segment
+            }, ensure_ascii=False) + '\n' for candidate_id, state, reason in records)
+            with open(self.index_path, 'a', encoding='utf-8') as f:
+                f.write(lines)
+                f.flush()
+                os.fsync(f.fileno())
+        logger.info("Archived %s candidates to %s", len(records), segment)
+        return segment
+
+    def entry(self, candidate_id):
+        """Index entry of an archived candidate, or None"""
+        self._refresh()
+        return self._entries.get(candidate_id)
+
+    def find(self, candidate_id=None, email=None, job_id=None, reason=None):
+        """Yield (entry, state) for archived candidates matching every given filter, in archive order"""
+        self._refresh()
+        email = normalize_email(email) if email else None
+        with self._lock:
+            entries = [entry for entry in self._entries.values()
+                       if (candidate_id is None or entry['id'] == candidate_id)
+                       and (email is None or entry['email'] == email)
+                       and (job_id is None or entry['job_id'] == job_id)
+                       and (reason is None or entry['reason'] == reason)]
+        by_segment = {}
+        for entry in entries:
+            by_segment.setdefault(entry['segment'], {})[entry['id']] = entry
+        for segment in sorted(by_segment):
+            wanted = by_segment[segment]
+            with gzip.open(os.path.join(self.directory, segment), 'rt', encoding='utf-8') as f:
+                for line in f:
+                    record = json.loads(line)
+                    if record['id'] in wanted:
+                        yield wanted[record['id']], record['state']
+
+    def get(self, candidate_id):
+        """Archived state of a candidate, or None"""
+        for _entry, state in self.find(candidate_id=candidate_id):
+            return state
+        return None
+
+    def stats(self):
+        self._refresh()
+        segments = [name for name in os.listdir(self.directory) if name.endswith('.ndjson.gz')]
+        counts = dict.fromkeys(ARCHIVE_REASONS, 0)
+        with self._lock:
+            for entry in self._entries.values():
+                counts[entry['reason']] = counts.get(entry['reason'], 0) + 1
+        return {'candidates': sum(counts.values()), 'reasons': counts, 'segments': len(segments),
+                'bytes': sum(os.path.getsize(os.path.join(self.directory, name)) for name in segments)}
+
+
+def delete_orphan_uploads(upload_dir, referenced, grace_hours=24, dry_run=False, keep_prefixes=(),
+                          keep_unattributed=False):
+    """
+    Delete resume files under `upload_dir` that no hot candidate references
+    (`referenced`: absolute paths) and that are older than `grace_hours`, so
+    uploads of in-flight applications are left alone. Files whose name starts
+    with one of `keep_prefixes` are kept too (candidates that only identify
+    their upload by its "<email>_" name), and with keep_unattributed so are
+    top-level files without such a prefix. Returns (count, bytes).
+    """
+    cutoff = time.time() - grace_hours * 3600
+    keep_prefixes = tuple(keep_prefixes)
+    top = os.path.abspath(upload_dir)
+    count = size = 0
+    for root, _dirs, files in os.walk(upload_dir):
+        for name in files:
+            path = os.path.abspath(os.path.join(root, name))
+            if (not name.lower().endswith(RESUME_EXTENSIONS) or path in referenced
+                    or (keep_prefixes and name.startswith(keep_prefixes))
+                    or (keep_unattributed and os.path.dirname(path) == top and not _EMAIL_PREFIX_RE.match(name))):
+                continue
+            try:
+                stat = os.stat(path)
+                if stat.st_mtime >= cutoff:
+                    continue
+                if not dry_run:
+                    os.remove(path)
+            except OSError as e:
+                logger.warning("Could not remove orphaned upload %s: %s", path, e)
+                continue
+            count += 1
+            size += stat.st_size
+    return count, size
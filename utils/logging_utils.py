@@ -0,0 +1,124 @@
+import contextvars
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+from datetime import datetime, timezone
+
+request_id_var = contextvars.ContextVar('request_id', default=None)
+
+# Attributes every LogRecord has; anything else came in via `extra=`
+_RESERVED = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime', 'request_id'}
+
+_listener = None
+_handler_config = {}
+
+
+class RequestIdFilter(logging.Filter):
+    def filter(self, record):
+        record.request_id = request_id_var.get()
+        return True
+
+
+class DebugSamplingFilter(logging.Filter):
+    """Keep only a fraction of DEBUG records; other levels always pass"""
+
+    def __init__(self, rate):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        return record.levelno > logging.DEBUG or self.rate >= 1 or random.random() < self.rate
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+            'pid': record.process
+        }
+        if getattr(record, 'request_id', None):
+            entry['request_id'] = record.request_id
+        for key, value in vars(record).items():
+            if key not in _RESERVED:
+                entry[key] = value
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__('%(asctime)s [%(levelname)s] %(name)s%(rid)s: %(message)s')
+
+    def format(self, record):
+        request_id = getattr(record, 'request_id', None)
+        record.rid = f" [{request_id}]" if request_id else ''
+        return super().format(record)
+
+
+def _start_listener():
+    global _listener
+    log_queue = queue.SimpleQueue()
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(JsonFormatter() if _handler_config['format'] == 'json' else TextFormatter())
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    queue_handler.addFilter(RequestIdFilter())
+    queue_handler.addFilter(DebugSamplingFilter(_handler_config['debug_sample_rate']))
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        if getattr(handler, '_hiring_queue_handler', False):
+            root.removeHandler(handler)
+    queue_handler._hiring_queue_handler = True
+    root.addHandler(queue_handler)
+
+    _listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=False)
+    _listener.start()
+
+
+def _restart_in_child():
+    # The parent's listener thread does not survive fork; give the child its own
+    # and flush it when a multiprocessing worker exits.
+    if _listener is None:
+        return
+    _start_listener()
+    try:
+        from multiprocessing import util
+        util.Finalize(None, stop_logging, exitpriority=10)
+    except Exception:
+        pass
+
+
+def setup_logging():
+    """
+    Route all logging through a queue so request threads never block on stdout.
+    LOG_LEVEL, LOG_FORMAT (json|text) and LOG_DEBUG_SAMPLE_RATE (0-1) configure it.
+    """
+    if _listener is not None:
+        return
+    _handler_config['format'] = os.getenv('LOG_FORMAT', 'json').lower()
+    _handler_config['debug_sample_rate'] = float(os.getenv('LOG_DEBUG_SAMPLE_RATE', 1.0))
+    logging.getLogger().setLevel(os.getenv('LOG_LEVEL', 'INFO').upper())
+    _start_listener()
+    if hasattr(os, 'register_at_fork'):
+        os.register_at_fork(after_in_child=_restart_in_child)
+    import atexit
+    atexit.register(stop_logging)
+
+
+def stop_logging():
+    """Flush queued records and stop the listener thread"""
+    global _listener
+    if _listener is not None:
+        try:
+            _listener.stop()
+        except Exception:
+            pass
+        _listener = None
@@ -0,0 +1,94 @@
+import logging
+import os
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+try:
+    from prometheus_client import (CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram,
+                                   generate_latest, multiprocess, REGISTRY)
+    METRICS_AVAILABLE = True
+except ImportError as e:
+    logger.warning("prometheus_client not available. /metrics disabled. Error: %s", e)
+    METRICS_AVAILABLE = False
+
+# Under gunicorn each worker writes its samples to PROMETHEUS_MULTIPROC_DIR
+# (set up in gunicorn.conf.py) and /metrics aggregates all of them.
+MULTIPROCESS = bool(os.getenv('PROMETHEUS_MULTIPROC_DIR'))
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+SIZE_BUCKETS = (1e3, 1e4, 1e5, 1e6, 1e7, 1e8)
+
+
+class _NoopMetric:
+    def labels(self, *args, **kwargs):
+        return self
+
+    def observe(self, *args, **kwargs):
+        pass
+
+    def inc(self, *args, **kwargs):
+        pass
+
+    def set(self, *args, **kwargs):
+        pass
+
+
+if METRICS_AVAILABLE:
+    REQUEST_LATENCY = Histogram(
+        'hiring_http_request_duration_seconds', 'HTTP request latency by route',
+        ['route', 'method', 'status'], buckets=LATENCY_BUCKETS)
+    DEPENDENCY_LATENCY = Histogram(
+        'hiring_dependency_duration_seconds', 'Latency of external dependencies and persistence',
+        ['dependency', 'outcome'], buckets=LATENCY_BUCKETS)
+    STATE_FILE_BYTES = Histogram(
+        'hiring_state_file_bytes', 'Bytes written to the candidate state store per write', buckets=SIZE_BUCKETS)
+    FUNNEL = Counter(
+        'hiring_funnel_total', 'Candidates reaching each pipeline stage', ['stage'])
+    PROCTORING_EVENTS = Counter(
+        'hiring_proctoring_events_total', 'Proctoring violation events received', ['stage', 'type'])
+    BACKEND_QUEUED = Gauge(
+        'hiring_backend_queued', 'Calls waiting for admission per backend', ['backend'],
+        multiprocess_mode='livesum')
+    BACKEND_IN_FLIGHT = Gauge(
+        'hiring_backend_in_flight', 'Admitted calls in progress per backend', ['backend'],
+        multiprocess_mode='livesum')
+else:
+    REQUEST_LATENCY = DEPENDENCY_LATENCY = STATE_FILE_BYTES = FUNNEL = PROCTORING_EVENTS = _NoopMetric()
+    BACKEND_QUEUED = BACKEND_IN_FLIGHT = _NoopMetric()
+
+
+@contextmanager
+def track_dependency(name):
+    """Time a block as one call to dependency `name`; outcome is 'error' if it raises"""
+    start = time.perf_counter()
+    outcome = 'ok'
+    try:
+        yield
+    except Exception:
+        outcome = 'error'
+        raise
+    finally:
+        DEPENDENCY_LATENCY.labels(dependency=name, outcome=outcome).observe(time.perf_counter() - start)
+
+
+def record_funnel(stage):
+    FUNNEL.labels(stage=stage).inc()
+
+
+def record_backend(name, stats):
+    BACKEND_QUEUED.labels(backend=name).set(stats['queued'])
+    BACKEND_IN_FLIGHT.labels(backend=name).set(stats['in_flight'])
+
+
+def render_metrics():
+    """Return (body, content_type) in the Prometheus text exposition format"""
+    if not METRICS_AVAILABLE:
+        return b'# prometheus_client is not installed\n', 'text/plain; charset=utf-8'
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -0,0 +1,400 @@
+"""
+Declarative assessment pipeline.
+
+Each stage (coding test, tech interview, HR interview, ...) is a Stage: where
+its question comes from, how an answer is scored, what counts as a pass,
+which stage follows and which notifications go out. PipelineEngine runs the
+shared flow for every stage: assign a question, score a submission, apply the
+outcome to the candidate state with a single persistence write, then publish
+StageEvents to listeners. Listeners that do slow I/O (email, LLM calls) hand
+their work to SideEffects so the request returns without waiting on them.
+Stage notifications are recorded as pending in the candidate state by that
+same write, so one lost to a failure or a restart is retried.
+"""
+import contextvars
+import logging
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+
+class Stage:
+    """
+    One pipeline stage.
+
+    name            state/link key, e.g. 'coding_test' ('<name>_completed' is set on pass)
+    title / label   heading ("Technical Interview") and in-sentence name ("technical interview")
+    analysis_key    state key the scored analysis is stored under
+    question_key    state key holding the assigned question
+    assign_question fn(state) -> question; may set extra state keys (ids, expected output)
+    score           fn(state, question, form) -> {'score', 'feedback', 'recommendation'}
+    passed          fn(analysis) -> bool (default: recommendation == 'PASS')
+    next_stage      name of the stage unlocked by a pass, or None for the last one
+    on_pass/on_fail notifications fn(event), run as side effects
+    template, result_template, answer_fields and result_context (fn(candidate_id)
+    -> extra template values on a pass) are used by the web layer.
+    """
+
+    def __init__(self, name, title, label, analysis_key, question_key, assign_question, score,
+                 template, result_template, answer_fields=('answer',), passed=None, next_stage=None,
+                 on_pass=(), on_fail=(), result_context=None):
+        self.name = name
+        self.title = title
+        self.label = label
+        self.analysis_key = analysis_key
+        self.question_key = question_key
+        self.assign_question = assign_question
+        self.score = score
+        self.template = template
+        self.result_template = result_template
+        self.answer_fields = tuple(answer_fields)
+        self.passed = passed or (lambda analysis: analysis.get('recommendation') == 'PASS')
+        self.next_stage = next_stage
+        self.on_pass = tuple(on_pass)
+        self.on_fail = tuple(on_fail)
+        self.result_context = result_context
+
+    def __repr__(self):
+        return f"Stage({self.name!r})"
+
+
+class StageEvent:
+    """
+    Something that happened to a candidate in a stage. kind is one of
+    'question_assigned', 'analyzed', 'passed' or 'failed'. `context` carries
+    values computed in the request (links, rendered URLs) for listeners that
+    run outside it.
+    """
+
+    def __init__(self, kind, stage, candidate_id, state, analysis=None, previous=None, context=None,
+                 replayed=False):
+        self.kind = kind
+        self.stage = stage
+        self.candidate_id = candidate_id
+        self.state = state
+        self.analysis = analysis
+        self.previous = previous
+        self.context = context or {}
+        self.replayed = replayed
+
+    def __repr__(self):
+        return f"StageEvent({self.kind!r}, {self.stage.name!r}, {self.candidate_id!r})"
+
+
+class SideEffects:
+    """
+    Runs slow side effects (emails, offer generation) on a small thread pool,
+    inside `context()` (e.g. app.app_context) when given. With workers=0 they
+    run inline, which keeps tests and CLI runs deterministic.
+    """
+
+    def __init__(self, workers=4, context=None):
+        self.context = context
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='side-effect') if workers else None
+        self._pending = set()
+        self._lock = threading.Lock()
+
+    def submit(self, name, fn, *args):
+        if self._executor is None:
+            self._run(name, fn, args)
+            return
+        # Carry context variables (e.g. the request ID used in log records) into the worker
+        future = self._executor.submit(contextvars.copy_context().run, self._run, name, fn, args)
+        with self._lock:
+            self._pending.add(future)
+        future.add_done_callback(self._done)
+
+    def _done(self, future):
+        with self._lock:
+            self._pending.discard(future)
+
+    def _run(self, name, fn, args):
+        try:
+            if self.context is None:
+                fn(*args)
+            else:
+                with self.context():
+                    fn(*args)
+        except Exception as e:
+            logger.error("Side effect %s failed: %s", name, e)
+
+    def pending(self):
+        with self._lock:
+            return len(self._pending)
+
+    def drain(self, timeout=None):
+        """Wait up to `timeout` seconds for queued side effects to finish; returns how many are still running"""
+        with self._lock:
+            futures = list(self._pending)
+        return len(wait(futures, timeout).not_done)
+
+
+class _Submission:
+    """A submission being evaluated; duplicates wait on it for its outcome"""
+
+    def __init__(self, submission_id):
+        self.submission_id = submission_id
+        self.outcome = None
+        self.error = None
+        self._done = threading.Event()
+
+    def finish(self, outcome=None, error=None):
+        self.outcome, self.error = outcome, error
+        self._done.set()
+
+    def wait(self):
+        self._done.wait()
+        if self.error is not None:
+            raise self.error
+        return self.outcome
+
+
+class PipelineEngine:
+    """
+    Runs stage transitions against the candidate store.
+
+    `persist(candidate_id, event)` is called once per transition, after every
+    state change for it has been applied; event is 'question_assigned',
+    'scored' (failed) or 'completed' (passed). Listeners registered with subscribe() receive each
+    StageEvent synchronously after the write; stage notifications (on_pass /
+    on_fail) are queued on `side_effects`.
+
+    Each notification is written to the state's 'pending_notifications' with
+    the transition and removed ('notified') once it has run; a failure bumps
+    its attempts ('notification_failed'). retry_pending() resubmits the ones
+    left over, so delivery is at least once.
+
+    A stage is scored at most once per candidate: see submit().
+    """
+
+    def __init__(self, stages, states, persist, side_effects=None):
+        self.stages = {stage.name: stage for stage in stages}
+        self.states = states
+        self.persist = persist
+        self.side_effects = side_effects or SideEffects(workers=0)
+        self._listeners = []
+        self._in_flight = {}  # (stage name, candidate_id) -> _Submission
+        self._key_locks = weakref.WeakValueDictionary()  # (stage name, candidate_id) -> Lock
+        self._dispatched = set()  # (candidate_id, notification name) queued in this process
+        self._lock = threading.Lock()
+        self._notifications = {}  # 'stage.fn_name' -> fn
+        for stage in stages:
+            if stage.next_stage and stage.next_stage not in self.stages:
+                raise ValueError(f"{stage.name} leads to unknown stage {stage.next_stage!r}")
+            for notify in stage.on_pass + stage.on_fail:
+                self._notifications[self._notification_name(stage, notify)] = notify
+
+    def __getitem__(self, name):
+        return self.stages[name]
+
+    def previous(self, stage_name):
+        """The stage whose pass unlocks `stage_name`, or None for the first one"""
+        for stage in self.stages.values():
+            if stage.next_stage == stage_name:
+                return stage
+        return None
+
+    def subscribe(self, listener):
+        """listener(event) is called for every event, in the request"""
+        self._listeners.append(listener)
+        return listener
+
+    @staticmethod
+    def _notification_name(stage, notify):
+        return f"{stage.name}.{getattr(notify, '__name__', 'notify')}"
+
+    def _key_lock(self, key):
+        with self._lock:
+            lock = self._key_locks.get(key)
+            if lock is None:
+                lock = self._key_locks[key] = threading.Lock()
+            return lock
+
+    def _publish(self, events):
+        for event in events:
+            for listener in self._listeners:
+                try:
+                    listener(event)
+                except Exception as e:
+                    logger.error("Pipeline listener failed on %r: %s", event, e)
+
+    def _queue_notifications(self, event):
+        """Record the outcome's notifications as pending; returns their names. Call before persisting."""
+        notifications = event.stage.on_pass if event.kind == 'passed' else event.stage.on_fail
+        names = [self._notification_name(event.stage, notify) for notify in notifications]
+        if names:
+            pending = event.state.setdefault('pending_notifications', {})
+            for name in names:
+                pending[name] = {'stage': event.stage.name, 'kind': event.kind, 'context': event.context,
+                                 'attempts': 0, 'queued_at': time.time()}
+        return names
+
+    def _dispatch(self, candidate_id, name, event):
+        key = (candidate_id, name)
+        with self._lock:
+            if key in self._dispatched:
+                return False
+            self._dispatched.add(key)
+        self.side_effects.submit(name, self._notify, candidate_id, name, event)
+        return True
+
+    def _notify(self, candidate_id, name, event):
+        try:
+            self._notifications[name](event)
+        except Exception:
+            self._settle(candidate_id, name, failed=True)
+            raise
+        else:
+            self._settle(candidate_id, name)
+        finally:
+            with self._lock:
+                self._dispatched.discard((candidate_id, name))
+
+    def _settle(self, candidate_id, name, failed=False):
+        """Clear a pending notification, or count a failed attempt, and persist it"""
+        with self._lock:
+            state = self.states.get(candidate_id)
+            pending = state.get('pending_notifications') if state else None
+            if not pending or name not in pending:
+                return
+            if failed:
+                pending[name]['attempts'] += 1
+                pending[name]['queued_at'] = time.time()
+            else:
+                del pending[name]
+                if not pending:
+                    del state['pending_notifications']
+        self.persist(candidate_id, 'notification_failed' if failed else 'notified')
+
+    def retry_pending(self, retry_after=300, max_attempts=5):
+        """
+        Resubmit notifications still pending `retry_after` seconds after they
+        were queued or last failed, e.g. after a failed send or a restart that
+        dropped the queue. Ones that failed `max_attempts` times are left in
+        the state for an operator. Returns the number resubmitted.
+        """
+        now = time.time()
+        retried = 0
+        for candidate_id, state in list(self.states.items()):
+            pending = state.get('pending_notifications')
+            if not pending:
+                continue
+            for name, entry in list(pending.items()):
+                if (entry['attempts'] >= max_attempts or now - entry['queued_at'] < retry_after
+                        or name not in self._notifications):
+                    continue
+                stage = self.stages[entry['stage']]
+                event = StageEvent(entry['kind'], stage, candidate_id, state, state.get(stage.analysis_key),
+                                   context=entry.get('context'))
+                if self._dispatch(candidate_id, name, event):
+                    logger.info("Retrying notification %s for candidate %s (%s failed attempts)",
+                                name, candidate_id, entry['attempts'])
+                    retried += 1
+        return retried
+
+    def _ensure_question(self, stage, candidate_id, state):
+        """(question, event) where event is set if a question was just assigned"""
+        question = state.get(stage.question_key)
+        if question:
+            return question, None
+        question = stage.assign_question(state)
+        state[stage.question_key] = question
+        return question, StageEvent('question_assigned', stage, candidate_id, state)
+
+    def question(self, stage_name, candidate_id):
+        """The candidate's question for the stage, assigning (and persisting) one on first access"""
+        stage = self.stages[stage_name]
+        # Concurrent first views (reloads, two tabs) assign one question between them
+        with self._key_lock((stage_name, candidate_id)):
+            question, assigned = self._ensure_question(stage, candidate_id, self.states[candidate_id])
+            if assigned:
+                self.persist(candidate_id, 'question_assigned')
+        if assigned:
+            self._publish([assigned])
+        return question
+
+    def submit(self, stage_name, candidate_id, form, context=None, submission_id=None):
+        """
+        Score a submission and apply the outcome: store the analysis, mark the
+        stage completed on a pass, persist once, then publish 'analyzed' and
+        'passed'/'failed'. Returns the outcome event.
+
+        Submissions are idempotent per candidate and stage. One that arrives
+        while another is being evaluated (double click, browser retry) waits
+        for it and gets its outcome; once a stage is scored, pass or fail,
+        later submissions get the stored outcome back (event.replayed) without
+        scoring, persisting or notifying again. `submission_id`, the
+        idempotency key rendered into the form, is stored with the analysis.
+        """
+        key = (stage_name, candidate_id)
+        with self._lock:
+            submission = self._in_flight.get(key)
+            if submission is None:
+                replay = self.scored(stage_name, candidate_id, submission_id)
+                if replay is not None:
+                    return replay
+                submission = self._in_flight[key] = _Submission(submission_id)
+                leader = True
+            else:
+                leader = False
+        if not leader:
+            logger.info("%s submission %s for candidate %s joined submission %s in flight",
+                        stage_name, submission_id, candidate_id, submission.submission_id)
+            return submission.wait()
+        try:
+            outcome = self._evaluate(stage_name, candidate_id, form, context, submission_id)
+            submission.finish(outcome)
+            return outcome
+        except BaseException as e:
+            submission.finish(error=e)
+            raise
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+
+    def scored(self, stage_name, candidate_id, submission_id=None):
+        """The stored outcome of an already scored stage as a replayed event, or None"""
+        stage = self.stages[stage_name]
+        state = self.states[candidate_id]
+        analysis = state.get(stage.analysis_key)
+        if not analysis:
+            return None
+        if submission_id and analysis.get('submission_id') != submission_id:
+            logger.info("%s for candidate %s was already scored; ignoring new submission %s",
+                        stage.title, candidate_id, submission_id)
+        passed = bool(state.get(f'{stage.name}_completed'))
+        return StageEvent('passed' if passed else 'failed', stage, candidate_id, state, analysis, replayed=True)
+
+    def _evaluate(self, stage_name, candidate_id, form, context, submission_id):
+        stage = self.stages[stage_name]
+        state = self.states[candidate_id]
+        with self._key_lock((stage_name, candidate_id)):
+            question, assigned = self._ensure_question(stage, candidate_id, state)
+        analysis = stage.score(state, question, form)
+
+        now = datetime.now().isoformat()
+        analysis['analyzed_at'] = now
+        if submission_id:
+            analysis['submission_id'] = submission_id
+        previous = state.get(stage.analysis_key)
+        state[stage.analysis_key] = analysis
+        passed = stage.passed(analysis)
+        if passed:
+            state[f'{stage.name}_completed'] = True
+            state[f'{stage.name}_completed_at'] = now
+        outcome = StageEvent('passed' if passed else 'failed', stage, candidate_id, state, analysis,
+                             context=context)
+        notifications = self._queue_notifications(outcome)
+        self.persist(candidate_id, 'completed' if passed else 'scored')
+
+        events = [assigned] if assigned else []
+        self._publish(events + [StageEvent('analyzed', stage, candidate_id, state, analysis, previous), outcome])
+        for name in notifications:
+            self._dispatch(candidate_id, name, outcome)
+        logger.info("%s submitted for candidate %s. Score: %s, Recommendation: %s",
+                    stage.title, candidate_id, analysis.get('score'), analysis.get('recommendation'))
+        return outcome
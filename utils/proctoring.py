@@ -0,0 +1,155 @@
+"""
+Proctoring violation events (tab switches, lost focus, face not detected, ...).
+
+The test pages queue events and send them in batches (navigator.sendBeacon),
+so a test-taker costs one request per batch rather than one per event. Each
+candidate/stage pair has its own append-only log of fixed-size binary records:
+
+    <candidate_id>.<stage>.log    13 bytes per event: client time in ms (int64),
+                                  event type code (uint8), value (uint32)
+
+A batch is written with a single O_APPEND write, so workers can share the
+files without locking. Per-log counters are kept in memory and caught up from
+the file offset they were last read at, which also picks up events appended
+by other processes.
+"""
+import json
+import logging
+import os
+import re
+import struct
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# Codes are stored in the logs: only ever append to this tuple
+EVENT_TYPES = ('tab_hidden', 'window_blur', 'face_missing', 'fullscreen_exit', 'shortcut_blocked',
+               'context_menu', 'camera_denied', 'terminated')
+EVENT_CODES = {name: code for code, name in enumerate(EVENT_TYPES, 1)}
+
+RECORD = struct.Struct('<qBI')
+MAX_VALUE = 2 ** 32 - 1
+_SAFE_KEY_RE = re.compile(r'^[\w-]+$')
+
+
+def parse_batch(body, max_events=200):
+    """
+    Decode a client batch, {"events": [[timestamp_ms, type, value], ...]}.
+    value is optional; an event type name (the cause of 'terminated') is
+    stored as its code. Returns (records, rejected) where records are
+    (timestamp_ms, code, value) tuples; raises ValueError if the body itself
+    is malformed.
+    """
+    try:
+        payload = json.loads(body)
+    except (TypeError, ValueError, UnicodeDecodeError):
+        raise ValueError('body must be JSON')
+    events = payload.get('events') if isinstance(payload, dict) else None
+    if not isinstance(events, list):
+        raise ValueError('events must be a list')
+    if len(events) > max_events:
+        raise ValueError(f'at most {max_events} events per batch')
+    records, rejected = [], 0
+    for event in events:
+        try:
+            timestamp, name, value = (list(event) + [0])[:3]
+            if isinstance(value, str):
+                value = EVENT_CODES[value]
+            if isinstance(timestamp, bool) or not isinstance(timestamp, int) or not isinstance(value, int):
+                raise ValueError
+            if not 0 <= timestamp < 2 ** 63:
+                raise ValueError
+            records.append((timestamp, EVENT_CODES[name], min(max(value, 0), MAX_VALUE)))
+        except (TypeError, ValueError, KeyError):
+            rejected += 1
+    return records, rejected
+
+
+class _Counters:
+    __slots__ = ('offset', 'counts', 'first', 'last')
+
+    def __init__(self):
+        self.offset = 0
+        self.counts = [0] * (len(EVENT_TYPES) + 1)
+        self.first = None
+        self.last = None
+
+    def add(self, data):
+        for timestamp, code, _value in RECORD.iter_unpack(data):
+            if code < len(self.counts):
+                self.counts[code] += 1
+            self.first = timestamp if self.first is None else min(self.first, timestamp)
+            self.last = timestamp if self.last is None else max(self.last, timestamp)
+        self.offset += len(data)
+
+
+class ProctoringLog:
+    """Append-only per candidate/stage event logs with cached counters (LRU of `cache_size` logs)"""
+
+    def __init__(self, directory, cache_size=10000):
+        self.directory = directory
+        self.cache_size = cache_size
+        self._counters = OrderedDict()
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, candidate_id, stage):
+        if not (_SAFE_KEY_RE.match(candidate_id) and _SAFE_KEY_RE.match(stage)):
+            raise ValueError('invalid proctoring log key')
+        return os.path.join(self.directory, f'{candidate_id}.{stage}.log')
+
+    def append(self, candidate_id, stage, records):
+        """Write a batch of (timestamp_ms, code, value) records; returns the bytes written"""
+        if not records:
+            return 0
+        data = b''.join(RECORD.pack(*record) for record in records)
+        fd = os.open(self._path(candidate_id, stage), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, data)
+            end = os.lseek(fd, 0, os.SEEK_CUR)
+        finally:
+            os.close(fd)
+        with self._lock:
+            counters = self._counters.get((candidate_id, stage))
+            # Fold the batch in directly unless another process appended since we last looked
+            if counters is not None and counters.offset == end - len(data):
+                counters.add(data)
+        return len(data)
+
+    def _caught_up(self, candidate_id, stage):
+        path = self._path(candidate_id, stage)
+        key = (candidate_id, stage)
+        with self._lock:
+            counters = self._counters.pop(key, None) or _Counters()
+            self._counters[key] = counters
+            while len(self._counters) > self.cache_size:
+                self._counters.popitem(last=False)
+            try:
+                with open(path, 'rb') as f:
+                    f.seek(counters.offset)
+                    data = f.read()
+            except FileNotFoundError:
+                data = b''
+            # Ignore a partial record still being written
+            counters.add(data[:len(data) - len(data) % RECORD.size])
+            return counters
+
+    def summary(self, candidate_id, stage):
+        """{'total', 'counts': {type: n}, 'first_event_ms', 'last_event_ms'}"""
+        counters = self._caught_up(candidate_id, stage)
+        counts = {name: counters.counts[code] for name, code in EVENT_CODES.items() if counters.counts[code]}
+        return {'total': sum(counts.values()), 'counts': counts,
+                'first_event_ms': counters.first, 'last_event_ms': counters.last}
+
+    def events(self, candidate_id, stage):
+        """Decoded events of one log, oldest first"""
+        try:
+            with open(self._path(candidate_id, stage), 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            return []
+        data = data[:len(data) - len(data) % RECORD.size]
+        return [{'ts_ms': timestamp, 'type': EVENT_TYPES[code - 1] if 0 < code <= len(EVENT_TYPES) else code,
+                 'value': value}
+                for timestamp, code, value in RECORD.iter_unpack(data)]
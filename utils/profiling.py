@@ -0,0 +1,243 @@
+import cProfile
+import collections
+import json
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+
+from werkzeug.wsgi import ClosingIterator
+
+logger = logging.getLogger(__name__)
+
+_SAFE_RE = re.compile(r'[^A-Za-z0-9_-]+')
+
+
+def gevent_patched():
+    """True when gevent has monkey-patched threading (gunicorn gevent workers)"""
+    try:
+        from gevent import monkey
+    except ImportError:
+        return False
+    return monkey.is_module_patched('threading')
+
+
+class SamplingProfiler:
+    """
+    One daemon thread samples the Python stacks of registered request threads
+    every `interval` seconds, aggregating them as collapsed stacks.
+    """
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self._sessions = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def _ensure_started(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name='request-profiler', daemon=True)
+            self._thread.start()
+
+    def begin(self, thread_id):
+        samples = collections.Counter()
+        with self._lock:
+            self._sessions[thread_id] = samples
+        self._ensure_started()
+        return samples
+
+    def end(self, thread_id):
+        with self._lock:
+            return self._sessions.pop(thread_id, collections.Counter())
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                if not self._sessions:
+                    continue
+                sessions = list(self._sessions.items())
+            frames = sys._current_frames()
+            for thread_id, samples in sessions:
+                frame = frames.get(thread_id)
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                    frame = frame.f_back
+                if stack:
+                    samples[tuple(reversed(stack))] += 1
+
+
+def write_collapsed(path, samples):
+    with open(path, 'w', encoding='utf-8') as f:
+        for stack, count in samples.most_common():
+            f.write(f"{';'.join(stack)} {count}\n")
+
+
+def write_speedscope(path, samples, name, interval_ms):
+    frames, frame_index, stacks, weights = [], {}, [], []
+    for stack, count in samples.items():
+        indices = []
+        for frame in stack:
+            if frame not in frame_index:
+                frame_index[frame] = len(frames)
+                frames.append({'name': frame})
+            indices.append(frame_index[frame])
+        stacks.append(indices)
+        weights.append(count * interval_ms)
+    document = {
+        '$schema': 'https://www.speedscope.app/file-format-schema.json',
+        'shared': {'frames': frames},
+        'profiles': [{
+            'type': 'sampled',
+            'name': name,
+            'unit': 'milliseconds',
+            'startValue': 0,
+            'endValue': sum(weights),
+            'samples': stacks,
+            'weights': weights
+        }],
+        'exporter': 'ai-hiring-pipeline'
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(document, f)
+
+
+class ProfilingMiddleware:
+    """
+    WSGI middleware that profiles a request when
+      - it carries the `X-Profile` header (value `cprofile` for a deterministic
+        cProfile dump, anything else for a sampled profile; must equal `token`
+        when one is configured, as `<token>` or `cprofile:<token>`),
+      - it is picked by `sample_rate`, or
+      - it takes longer than `slow_ms` (every request is sampled; only slow ones are kept).
+    Profiles are written to `output_dir` as collapsed stacks and/or speedscope
+    JSON; only the newest `max_files` files are kept.
+
+    Under gevent every request is a greenlet on the same OS thread, so the
+    sampler cannot tell requests apart. In that mode X-Profile requests get a
+    cProfile dump instead and random/slow-request sampling is disabled.
+    """
+
+    def __init__(self, wsgi_app, output_dir, sample_rate=0.0, slow_ms=None, interval_ms=5,
+                 formats=('collapsed', 'speedscope'), token=None, max_files=500):
+        self.wsgi_app = wsgi_app
+        self.output_dir = output_dir
+        self.sample_rate = sample_rate
+        self.slow_ms = slow_ms
+        self.interval_ms = interval_ms
+        self.formats = tuple(formats)
+        self.token = token
+        self.max_files = max_files
+        self.profiler = SamplingProfiler(interval_ms / 1000.0)
+        self.sampling = not gevent_patched()
+        if not self.sampling:
+            logger.warning("gevent detected: sampled profiles are disabled, X-Profile requests get cProfile dumps")
+            self.sample_rate, self.slow_ms = 0.0, None
+        os.makedirs(output_dir, exist_ok=True)
+
+    def _requested_mode(self, environ):
+        header = environ.get('HTTP_X_PROFILE')
+        if header is None:
+            return None
+        if header == 'cprofile' or header.startswith('cprofile:'):
+            mode, supplied = 'cprofile', header[len('cprofile:'):]
+        else:
+            mode, supplied = 'sample', header
+        if self.token and supplied != self.token:
+            return None
+        return mode if self.sampling else 'cprofile'
+
+    def __call__(self, environ, start_response):
+        mode = self._requested_mode(environ)
+        forced = mode is not None
+        if mode is None and self.sample_rate and random.random() < self.sample_rate:
+            mode, forced = 'sample', True
+        if mode is None and self.slow_ms:
+            mode = 'sample'
+        if mode is None:
+            return self.wsgi_app(environ, start_response)
+
+        start = time.perf_counter()
+        thread_id = threading.get_ident()
+        if mode == 'cprofile':
+            profile = cProfile.Profile()
+            profile.enable()
+        else:
+            self.profiler.begin(thread_id)
+
+        def finish():
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            if mode == 'cprofile':
+                profile.disable()
+            else:
+                samples = self.profiler.end(thread_id)
+            if not forced and elapsed_ms < self.slow_ms:
+                return
+            try:
+                base = self._filename(environ, elapsed_ms)
+                if mode == 'cprofile':
+                    profile.dump_stats(f"{base}.pstats")
+                else:
+                    if 'collapsed' in self.formats:
+                        write_collapsed(f"{base}.collapsed", samples)
+                    if 'speedscope' in self.formats:
+                        write_speedscope(f"{base}.speedscope.json", samples, os.path.basename(base),
+                                         self.interval_ms)
+                logger.info("Captured %s profile for %s %s (%.0f ms)", mode, environ.get('REQUEST_METHOD'),
+                            environ.get('PATH_INFO'), elapsed_ms)
+                if self.max_files:
+                    prune_profiles(self.output_dir, self.max_files)
+            except Exception as e:
+                logger.error("Could not write profile: %s", e)
+
+        try:
+            app_iter = self.wsgi_app(environ, start_response)
+        except Exception:
+            finish()
+            raise
+        return ClosingIterator(app_iter, [finish])
+
+    def _filename(self, environ, elapsed_ms):
+        path = _SAFE_RE.sub('_', environ.get('PATH_INFO', '').strip('/'))[:60] or 'root'
+        now = time.time()
+        stamp = f"{time.strftime('%Y%m%dT%H%M%S', time.localtime(now))}.{int(now * 1000) % 1000:03d}"
+        return os.path.join(self.output_dir,
+                            f"{stamp}_{os.getpid()}_{environ.get('REQUEST_METHOD', 'GET')}_{path}_{elapsed_ms:.0f}ms")
+
+
+def prune_profiles(output_dir, max_files):
+    """Delete all but the newest `max_files` profiles; returns how many were deleted"""
+    try:
+        entries = [e for e in os.scandir(output_dir) if e.is_file()]
+    except FileNotFoundError:
+        return 0
+    if len(entries) <= max_files:
+        return 0
+    entries.sort(key=lambda e: e.stat().st_mtime, reverse=True)
+    deleted = 0
+    for entry in entries[max_files:]:
+        try:
+            os.remove(entry.path)
+            deleted += 1
+        except FileNotFoundError:
+            pass  # pruned by another worker
+    return deleted
+
+
+def list_profiles(output_dir):
+    """Captured profiles, newest first"""
+    try:
+        entries = [e for e in os.scandir(output_dir) if e.is_file()]
+    except FileNotFoundError:
+        return []
+    entries.sort(key=lambda e: e.stat().st_mtime, reverse=True)
+    return [{
+        'name': e.name,
+        'bytes': e.stat().st_size,
+        'captured_at': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(e.stat().st_mtime))
+    } for e in entries]
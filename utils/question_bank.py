@@ -0,0 +1,161 @@
+import json
+import os
+import random
+
+QUESTION_TYPES = ('coding', 'tech', 'hr')
+
+
+def compile_rubric(rules):
+    """
+    Precompile rubric rules into tuples of lowercased keywords.
+
+    Rule forms:
+      {"any": [...], "points": N, "feedback": "..."}            N points if any keyword appears
+      {"terms": [...], "per_term": N, "max": M, "feedback": "..."} N points per keyword, capped at M
+    A "{terms}" placeholder in feedback is replaced with the matched keywords.
+    """
+    compiled = []
+    for rule in rules or []:
+        if 'terms' in rule:
+            compiled.append(('terms', tuple(t.lower() for t in rule['terms']),
+                             rule.get('per_term', 5), rule.get('max', 25), rule.get('feedback')))
+        else:
+            compiled.append(('any', tuple(k.lower() for k in rule.get('any', [])),
+                             rule.get('points', 0), None, rule.get('feedback')))
+    return tuple(compiled)
+
+
+def score_rubric(rubric, text):
+    """Apply a compiled rubric to an answer. Returns (points, feedback_parts)."""
+    text_lower = (text or '').lower()
+    points = 0
+    feedback_parts = []
+    for kind, keywords, value, cap, feedback in rubric or ():
+        if kind == 'terms':
+            found = [k for k in keywords if k in text_lower]
+            points += min(len(found) * value, cap)
+            if found and feedback:
+                feedback_parts.append(feedback.replace('{terms}', ', '.join(found)))
+        elif any(k in text_lower for k in keywords):
+            points += value
+            if feedback:
+                feedback_parts.append(feedback)
+    return points, feedback_parts
+
+
+class QuestionBank:
+    """
+    Questions keyed by integer ID with per-type and per-difficulty bitmasks.
+    Candidate usage is an int bitset (bit n set = question n used), so picking
+    an unused question is a mask operation rather than a scan over strings.
+    """
+
+    def __init__(self, questions=()):
+        self._questions = {}
+        self._by_text = {}
+        self._masks = {}
+        self._ids = {}
+        for q in questions:
+            self.add(q)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return cls(data.get('questions', []))
+
+    def save(self, path):
+        tmp_path = f"{path}.tmp"
+        questions = [{k: v for k, v in q.items() if k != 'compiled_rubric'}
+                     for q in sorted(self._questions.values(), key=lambda q: q['id'])]
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'questions': questions}, f, indent=2, ensure_ascii=False)
+            f.write('\n')
+        os.replace(tmp_path, path)
+
+    def __len__(self):
+        return len(self._questions)
+
+    def next_id(self):
+        return max(self._questions, default=0) + 1
+
+    def add(self, question, selectable=True):
+        """
+        Add a question. With selectable=False it is known (get, rubrics) but
+        select() does not pick it until release() is called.
+        """
+        q = dict(question)
+        q.setdefault('id', self.next_id())
+        q.setdefault('difficulty', 'medium')
+        q.setdefault('tags', [])
+        q.setdefault('rubric', [])
+        q['compiled_rubric'] = compile_rubric(q['rubric'])
+        self._questions[q['id']] = q
+        self._by_text[q['question']] = q['id']
+        if selectable:
+            self.release(q['id'])
+        return q
+
+    def release(self, question_id):
+        """Make a question select() can pick"""
+        q = self._questions[question_id]
+        bit = 1 << question_id
+        for key in (q['type'], (q['type'], q['difficulty'])):
+            if not self._masks.get(key, 0) & bit:
+                self._masks[key] = self._masks.get(key, 0) | bit
+                self._ids.setdefault(key, []).append(question_id)
+
+    def get(self, question_id):
+        return self._questions.get(question_id)
+
+    def id_for_text(self, text):
+        return self._by_text.get(text)
+
+    def contains_text(self, text):
+        return text in self._by_text
+
+    def questions(self, question_type=None):
+        return [q for q in self._questions.values() if question_type in (None, q['type'])]
+
+    def rubric_for(self, question_id=None, text=None):
+        """Compiled rubric by ID, falling back to an exact text match"""
+        if question_id is None and text is not None:
+            question_id = self._by_text.get(text)
+        q = self._questions.get(question_id)
+        return q['compiled_rubric'] if q else ()
+
+    def bits_for_texts(self, texts):
+        """Convert a legacy used_*_questions text list to a bitset"""
+        bits = 0
+        for text in texts or []:
+            qid = self._by_text.get(text)
+            if qid is not None:
+                bits |= 1 << qid
+        return bits
+
+    def select(self, question_type, used_bits=0, difficulty=None, rng=random, reset=True):
+        """
+        Pick an unused question of the given type. Returns (question, updated_bits),
+        resetting the candidate's usage for that type once every question is used
+        (or returning (None, used_bits) when reset is False).
+        """
+        key = (question_type, difficulty) if difficulty else question_type
+        mask = self._masks.get(key, 0)
+        if not mask:
+            return None, used_bits
+        available = mask & ~used_bits
+        if not available:
+            if not reset:
+                return None, used_bits
+            used_bits &= ~self._masks.get(question_type, 0)
+            available = mask
+        ids = self._ids[key]
+        # Random probing is O(1) expected while most questions are unused
+        for _ in range(8):
+            qid = ids[rng.randrange(len(ids))]
+            if available >> qid & 1:
+                break
+        else:
+            choices = [qid for qid in ids if available >> qid & 1]
+            qid = choices[rng.randrange(len(choices))]
+        return self._questions[qid], used_bits | (1 << qid)
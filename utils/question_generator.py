@@ -0,0 +1,295 @@
+import collections
+import contextlib
+import json
+import logging
+import os
+import re
+import threading
+
+from utils.dedup import DuplicateIndex, minhash_signature
+
+logger = logging.getLogger(__name__)
+
+try:
+    import fcntl
+except ImportError:  # Windows: every process generates
+    fcntl = None
+
+DIFFICULTIES = ('easy', 'medium', 'hard')
+
+_JSON_RE = re.compile(r'\{.*\}', re.DOTALL)
+
+
+def parse_generated_question(raw, question_type, difficulty):
+    """Parse and validate an LLM response into a bank entry, or return None"""
+    match = _JSON_RE.search(str(raw or ''))
+    if not match:
+        return None
+    try:
+        data = json.loads(match.group(0))
+    except ValueError:
+        return None
+    question = str(data.get('question', '')).strip()
+    if not 20 <= len(question) <= 600:
+        return None
+    entry = {
+        'type': question_type,
+        'question': question,
+        'difficulty': difficulty,
+        'tags': [str(t).lower() for t in data.get('tags', [])][:5],
+        'rubric': [],
+        'source': 'generated'
+    }
+    if question_type == 'coding':
+        expected_output = str(data.get('expected_output', '')).strip()
+        test_cases = [tc for tc in data.get('test_cases', [])
+                      if isinstance(tc, dict) and 'stdin' in tc and 'expected_output' in tc]
+        if not expected_output or not test_cases:
+            return None
+        entry['expected_output'] = expected_output
+        entry['test_cases'] = [{'stdin': str(tc['stdin']), 'expected_output': str(tc['expected_output'])}
+                               for tc in test_cases[:5]]
+    keywords = [str(k).lower() for k in data.get('keywords', []) if str(k).strip()][:8]
+    if keywords:
+        if question_type == 'coding':
+            entry['rubric'] = [{'any': keywords, 'points': 15}]
+        else:
+            entry['rubric'] = [{'terms': keywords, 'per_term': 5, 'max': 25,
+                                'feedback': '✓ Technical terms used: {terms}'}]
+    return entry
+
+
+class QuestionGenerator:
+    """
+    Keeps a buffer of fresh, never-served questions per (type, difficulty).
+
+    One process (whichever holds the lock file) calls generate_fn in a daemon
+    thread, validates and de-duplicates the result and saves it to its own
+    file at `path`, apart from the curated bank file. Buffered questions are
+    known to the bank (IDs, rubrics) but select() does not pick them until
+    dequeue() serves one; from then on it is an ordinary bank question.
+    Other processes pick new questions up by reloading the file when it
+    changes. Request handlers only call dequeue(), which never waits on the
+    LLM and wakes the generator to top the buffer up.
+
+    Every process appends the IDs it serves to `<path>.served` under an
+    flock, and dequeue() reads that file under the same lock, so a question
+    is served once across processes. The generating process folds the served
+    IDs into its file (and refills their buffers) on its next round.
+    """
+
+    def __init__(self, bank, path, generate_fn, question_types=('coding', 'tech'),
+                 buffer_size=3, interval=30, lock_path=None):
+        self.bank = bank
+        self.path = path
+        self.generate_fn = generate_fn
+        self.question_types = tuple(question_types)
+        self.buffer_size = buffer_size
+        self.interval = interval
+        self.lock_path = lock_path or f"{path}.lock"
+        self.served_path = f"{path}.served"
+        self.buffers = {(t, d): collections.deque() for t in self.question_types for d in DIFFICULTIES}
+        self._generated = {}  # question ID -> stored entry with its 'served' flag
+        self._dirty = False
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._thread = None
+        self._lock_file = None
+        self._seen = DuplicateIndex(threshold=0.7)
+        for q in bank.questions():
+            self._seen.add(q['id'], minhash_signature(q['question']))
+        self._file_mtime = None
+        self._reload()
+
+    def _mtime(self):
+        try:
+            return os.stat(self.path).st_mtime
+        except OSError:
+            return 0
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='question-generator', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def depths(self):
+        return {f"{t}:{d}": len(buf) for (t, d), buf in self.buffers.items()}
+
+    def dequeue(self, question_type, difficulty=None, used_bits=0):
+        """
+        Serve a buffered question of the type (any difficulty if not given)
+        that is not in `used_bits`, or None. The question becomes selectable
+        and the generator is woken to replace it.
+        """
+        difficulties = (difficulty,) if difficulty else DIFFICULTIES
+        with self._served_file() as served:
+            self._reload()
+            with self._lock:
+                self._apply_served()
+                for d in difficulties:
+                    buf = self.buffers.get((question_type, d)) or ()
+                    for question_id in buf:
+                        if not used_bits >> question_id & 1:
+                            self._mark_served(question_id)
+                            served.write(f"{question_id}\n")
+                            served.flush()
+                            self._wake.set()
+                            return self.bank.get(question_id)
+        return None
+
+    @contextlib.contextmanager
+    def _served_file(self):
+        """The served-IDs file, open for appending and exclusively locked"""
+        directory = os.path.dirname(self.served_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.served_path, 'a+', encoding='utf-8') as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            yield f
+
+    def _mark_served(self, question_id):
+        # Called with self._lock held
+        known = self._generated.get(question_id)
+        if known is None or known['served']:
+            return False
+        known['served'] = True
+        self.bank.release(question_id)
+        buf = self.buffers.get((known['type'], known['difficulty']))
+        if buf is not None and question_id in buf:
+            buf.remove(question_id)
+        self._dirty = True
+        return True
+
+    def _apply_served(self):
+        """Mark questions other processes served; called with the served file locked and self._lock held"""
+        try:
+            with open(self.served_path, 'r', encoding='utf-8') as f:
+                ids = [int(line) for line in f if line.strip().isdigit()]
+        except FileNotFoundError:
+            return 0
+        return sum(self._mark_served(question_id) for question_id in ids)
+
+    def _fold_served(self):
+        """Save the served flags of every process to the generated file, then empty the served file"""
+        with self._served_file() as served:
+            with self._lock:
+                self._apply_served()
+            if self._dirty:
+                self._save()
+            served.truncate(0)
+
+    def _is_leader(self):
+        if self._lock_file is not None:
+            return True
+        if fcntl is None:
+            self._lock_file = True
+            return True
+        f = open(self.lock_path, 'a')
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            f.close()
+            return False
+        self._lock_file = f
+        logger.info("Question generator running in process %s", os.getpid())
+        return True
+
+    def _install(self, entry):
+        # Called with self._lock held
+        served = entry.get('served', False)
+        stored = self.bank.add({k: v for k, v in entry.items() if k != 'served'}, selectable=served)
+        self._generated[stored['id']] = {**{k: v for k, v in stored.items() if k != 'compiled_rubric'},
+                                         'served': served}
+        self._seen.add(stored['id'], minhash_signature(stored['question']))
+        key = (stored['type'], stored['difficulty'])
+        if not served and key in self.buffers:
+            self.buffers[key].append(stored['id'])
+        return stored
+
+    def _accept(self, entry):
+        """De-duplicate and buffer a generated question; returns the stored question or None"""
+        signature = minhash_signature(entry['question'])
+        with self._lock:
+            if self.bank.contains_text(entry['question']) or self._seen.query(signature):
+                return None
+            return self._install(entry)
+
+    def _reload(self):
+        """Pick up questions saved (or served) by the generating process"""
+        mtime = self._mtime()
+        if mtime == self._file_mtime:
+            return
+        self._file_mtime = mtime
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                questions = json.load(f).get('questions', [])
+        except FileNotFoundError:
+            return
+        except ValueError as e:
+            logger.error("Could not read generated questions from %s: %s", self.path, e)
+            return
+        with self._lock:
+            for q in questions:
+                if q['id'] in self._generated:
+                    if q.get('served'):
+                        self._mark_served(q['id'])
+                elif self.bank.get(q['id']) is not None:
+                    logger.warning("Generated question %s clashes with a bank question ID; skipped", q['id'])
+                else:
+                    self._install(q)
+
+    def _save(self):
+        with self._lock:
+            questions = [dict(q) for _id, q in sorted(self._generated.items())]
+            self._dirty = False
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'questions': questions}, f, indent=2, ensure_ascii=False)
+            f.write('\n')
+        os.replace(tmp_path, self.path)
+        self._file_mtime = self._mtime()
+
+    def _fill(self):
+        self._fold_served()
+        added = 0
+        failed = False
+        for (question_type, difficulty), buf in self.buffers.items():
+            attempts = 0
+            while (len(buf) < self.buffer_size and attempts < self.buffer_size * 2
+                   and not failed and not self._stop.is_set()):
+                attempts += 1
+                try:
+                    raw = self.generate_fn(question_type, difficulty)
+                except Exception as e:
+                    logger.error("Question generation failed for %s/%s: %s", question_type, difficulty, e)
+                    failed = True  # leave the rest for the next round
+                    break
+                entry = parse_generated_question(raw, question_type, difficulty)
+                if entry and self._accept(entry):
+                    added += 1
+        if added or self._dirty:
+            self._save()
+        if added:
+            logger.info("Question generator added %s questions. Buffer depths: %s", added, self.depths())
+        return added
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.clear()
+            try:
+                if self._is_leader():
+                    self._fill()
+                else:
+                    self._reload()
+            except Exception as e:
+                logger.error("Question generator error: %s", e)
+            self._wake.wait(self.interval)
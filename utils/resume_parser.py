@@ -1,50 +1,106 @@
+import logging
 import os
+import time
 
-def parse_resume(path):
+logger = logging.getLogger(__name__)
+
+# OCR tuning for scanned PDF pages
+OCR_DPI = int(os.getenv('RESUME_OCR_DPI', 200))
+OCR_MAX_PAGES = int(os.getenv('RESUME_OCR_MAX_PAGES', 5))
+OCR_TIME_BUDGET = float(os.getenv('RESUME_OCR_TIMEOUT', 30))
+# Pages with fewer extractable characters than this are treated as scanned
+MIN_PAGE_TEXT_CHARS = int(os.getenv('RESUME_MIN_PAGE_CHARS', 20))
+
+
+def _ocr_page(path, page_number, timeout):
+    from pdf2image import convert_from_path
+    import pytesseract
+    images = convert_from_path(path, dpi=OCR_DPI, first_page=page_number,
+                               last_page=page_number, grayscale=True)
+    if not images:
+        return ''
+    return pytesseract.image_to_string(images[0], timeout=timeout)
+
+
+def _parse_pdf(path, stats):
+    import PyPDF2
+    with open(path, 'rb') as f:
+        reader = PyPDF2.PdfReader(f)
+        page_texts = []
+        for page in reader.pages:
+            page_start = time.perf_counter()
+            page_text = page.extract_text() or ''
+            page_texts.append(page_text)
+            stats['pages'].append({
+                'page': len(page_texts),
+                'method': 'text',
+                'chars': len(page_text.strip()),
+                'seconds': round(time.perf_counter() - page_start, 4)
+            })
+
+    scanned = [i for i, t in enumerate(page_texts) if len(t.strip()) < MIN_PAGE_TEXT_CHARS]
+    if scanned:
+        logger.warning("%s of %s pages in %s have no text layer. Running OCR on them...", len(scanned), len(page_texts), path)
+        deadline = time.perf_counter() + OCR_TIME_BUDGET
+        for n, i in enumerate(scanned):
+            page_stats = stats['pages'][i]
+            remaining = deadline - time.perf_counter()
+            if n >= OCR_MAX_PAGES or remaining <= 0:
+                page_stats['method'] = 'skipped'
+                continue
+            page_start = time.perf_counter()
+            try:
+                ocr_text = _ocr_page(path, i + 1, remaining)
+                page_texts[i] = ocr_text
+                page_stats['method'] = 'ocr'
+                page_stats['chars'] = len(ocr_text.strip())
+            except Exception as ocr_e:
+                page_stats['method'] = 'ocr_failed'
+                logger.error("OCR extraction failed for page %s of PDF %s: %s", i + 1, path, ocr_e)
+            page_stats['seconds'] = round(time.perf_counter() - page_start, 4)
+        skipped = sum(1 for p in stats['pages'] if p['method'] == 'skipped')
+        if skipped:
+            logger.warning("OCR page/time limit reached for %s: %s scanned pages skipped", path, skipped)
+
+    text = '\n'.join(t for t in page_texts if t)
+    if not text.strip():
+        logger.warning("No text extracted from PDF: %s", path)
+    return text
+
+
+def parse_resume_with_stats(path):
+    """
+    Extract resume text and return (text, stats). stats records per-page
+    extraction method ('text', 'ocr', 'ocr_failed' or 'skipped') and timing.
+    """
+    stats = {'path': path, 'pages': []}
+    start = time.perf_counter()
     ext = os.path.splitext(path)[1].lower()
+    text = ''
     if ext == '.pdf':
         try:
-            import PyPDF2
-            with open(path, 'rb') as f:
-                reader = PyPDF2.PdfReader(f)
-                text = ''
-                for page in reader.pages:
-                    page_text = page.extract_text() or ''
-                    text += page_text
-            if text.strip():
-                return text
-            else:
-                print(f"[WARN] No text extracted from PDF with PyPDF2: {path}. Trying OCR fallback...")
-                # OCR fallback
-                try:
-                    from pdf2image import convert_from_path
-                    import pytesseract
-                    from PIL import Image
-                    ocr_text = ''
-                    images = convert_from_path(path)
-                    for i, image in enumerate(images):
-                        page_ocr = pytesseract.image_to_string(image)
-                        ocr_text += page_ocr + '\n'
-                    if not ocr_text.strip():
-                        print(f"[WARN] OCR also failed to extract text from PDF: {path}")
-                    return ocr_text
-                except Exception as ocr_e:
-                    print(f"[ERROR] OCR extraction failed for PDF {path}: {ocr_e}")
-                    return ''
+            text = _parse_pdf(path, stats)
         except Exception as e:
-            print(f"[ERROR] Failed to extract text from PDF {path}: {e}")
-            return ''
+            logger.error("Failed to extract text from PDF %s: %s", path, e)
     elif ext in ['.docx', '.doc']:
         try:
             import docx
             doc = docx.Document(path)
             text = '\n'.join([p.text for p in doc.paragraphs])
             if not text.strip():
-                print(f"[WARN] No text extracted from DOC/DOCX: {path}")
-            return text
+                logger.warning("No text extracted from DOC/DOCX: %s", path)
         except Exception as e:
-            print(f"[ERROR] Failed to extract text from DOC/DOCX {path}: {e}")
-            return ''
+            logger.error("Failed to extract text from DOC/DOCX %s: %s", path, e)
     else:
-        print(f"[WARN] Unsupported file extension for resume: {path}")
-        return '' 
\ No newline at end of file
+        logger.warning("Unsupported file extension for resume: %s", path)
+    stats['total_seconds'] = round(time.perf_counter() - start, 4)
+    return text, stats
+
+
+def parse_resume(path):
+    text, stats = parse_resume_with_stats(path)
+    ocr_pages = [p for p in stats['pages'] if p['method'] != 'text']
+    if ocr_pages:
+        timings = ', '.join(f"p{p['page']}={p['method']}:{p['seconds']}s" for p in ocr_pages)
+        logger.info("Parsed %s in %ss (%s)", path, stats['total_seconds'], timings)
+    return text
@@ -0,0 +1,54 @@
+import base64
+import hashlib
+import hmac
+import time
+
+# Single-character stage codes keep links short
+STAGE_CODES = {
+    'coding_test': 'c',
+    'tech_interview': 't',
+    'hr_interview': 'h',
+    'offer_letter': 'o'
+}
+
+_SIG_BYTES = 16
+_SIG_LEN = len(base64.urlsafe_b64encode(b'\0' * _SIG_BYTES).rstrip(b'='))
+MAX_TOKEN_LENGTH = 128
+
+
+def _sign(payload, secret):
+    digest = hmac.new(secret.encode('utf-8'), payload.encode('utf-8'), hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(digest[:_SIG_BYTES]).rstrip(b'=').decode('ascii')
+
+
+def make_stage_token(candidate_id, stage, secret, ttl_seconds, now=None):
+    """Signed link token: <candidate_id>.<stage>.<expiry hex>.<hmac>"""
+    expires = int((now or time.time()) + ttl_seconds)
+    payload = f"{candidate_id}.{STAGE_CODES[stage]}.{expires:x}"
+    return f"{payload}.{_sign(payload, secret)}"
+
+
+def verify_stage_token(token, stage, secret, now=None):
+    """
+    Verify a stage token without touching candidate storage.
+    Returns (candidate_id, None) when valid, else (None, reason) where reason is
+    'invalid', 'wrong_stage' or 'expired'.
+    """
+    if not token or len(token) > MAX_TOKEN_LENGTH:
+        return None, 'invalid'
+    parts = token.rsplit('.', 3)
+    if len(parts) != 4 or len(parts[3]) != _SIG_LEN:
+        return None, 'invalid'
+    candidate_id, stage_code, expires_hex, signature = parts
+    payload = f"{candidate_id}.{stage_code}.{expires_hex}"
+    if not hmac.compare_digest(signature, _sign(payload, secret)):
+        return None, 'invalid'
+    if stage_code != STAGE_CODES.get(stage):
+        return None, 'wrong_stage'
+    try:
+        expires = int(expires_hex, 16)
+    except ValueError:
+        return None, 'invalid'
+    if (now or time.time()) > expires:
+        return None, 'expired'
+    return candidate_id, None
@@ -0,0 +1,438 @@
+"""
+Candidate state persistence as a snapshot plus an append-only event log.
+
+    candidate_states.json          snapshot: {candidate_id: state}, replaced atomically
+    candidate_states.json.log      events since the snapshot, one JSON object per line
+    candidate_states.json.log.<ts> earlier log segments kept as an audit trail
+
+Each event names what happened ('submitted', 'scored', 'completed',
+'emailed', ...) and, when it changed the candidate, carries the full new
+state of that one candidate. Replaying an event is therefore idempotent, so a
+crash between writing a snapshot and rotating the log loses nothing. Writes
+cost O(size of the changed candidate); compaction folds the log into a new
+snapshot in the background every `snapshot_every` events.
+
+Processes share the files: appends take a shared flock and compaction an
+exclusive one, and compaction rebuilds the snapshot from disk (snapshot +
+log) rather than from any one process's memory. follow() returns what other
+processes (other workers, CLI commands) have written since load(), so a
+long-running process can apply their changes to its copy of the states.
+
+Since every event carries a whole state, a process merges rather than
+replaces: the store remembers a fingerprint per key of the version of each
+candidate it last loaded, wrote or merged, and merge() takes another
+process's version of every key except those changed locally since then.
+Inside exclusive(), a follow() and the write that comes after it see no
+other process's appends in between, so a write never drops a newer key.
+"""
+import fcntl
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+DELETED = 'deleted'
+
+
+class StateStore:
+    def __init__(self, path, snapshot_every=1000, fsync=True, archive=True):
+        self.path = path
+        self.log_path = f"{path}.log"
+        self.lock_path = f"{path}.lock"
+        self.snapshot_every = snapshot_every
+        self.fsync = fsync
+        self.archive = archive
+        self._lock = threading.Lock()
+        self._log_file = None
+        self._log_inode = None
+        self._events_since_snapshot = 0
+        self._compacting = False
+        self._follow_lock = threading.Lock()
+        self._follow_file = None  # read handle on the log segment being followed
+        self._follow_mark = None  # newest archived segment when the followed one was opened
+        self._follow_offset = 0
+        self._follow_snapshot = None
+        self._bases = {}  # candidate_id -> {key: fingerprint} of the version last loaded, written or merged
+        self._held = threading.local()  # set while this thread is inside exclusive()
+
+    # Locking and files
+
+    @contextmanager
+    def _file_lock(self, mode):
+        if getattr(self._held, 'exclusive', False):
+            yield  # this thread already holds the exclusive lock (exclusive())
+            return
+        with open(self.lock_path, 'a') as lock_file:
+            fcntl.flock(lock_file, mode)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    @contextmanager
+    def exclusive(self):
+        """
+        Hold the exclusive file lock for a read-merge-write: follow() and
+        put_many() in the block run with no other process appending between
+        them. Other threads' appends wait as well.
+        """
+        with self._file_lock(fcntl.LOCK_EX):
+            self._held.exclusive = True
+            try:
+                yield
+            finally:
+                self._held.exclusive = False
+
+    def _log(self):
+        """Append handle for the current log segment, reopened after another process rotates it"""
+        try:
+            inode = os.stat(self.log_path).st_ino
+        except FileNotFoundError:
+            inode = None
+        if self._log_file is None or inode != self._log_inode:
+            if self._log_file is not None:
+                self._log_file.close()
+            self._log_file = open(self.log_path, 'ab')
+            self._log_inode = os.fstat(self._log_file.fileno()).st_ino
+        return self._log_file
+
+    def _write_snapshot(self, states):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(states, f, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        _fsync_dir(self.path)
+
+    # Reading
+
+    def _read_snapshot(self):
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except ValueError as e:
+            corrupt = f"{self.path}.corrupt-{int(time.time())}"
+            logger.error("Candidate state snapshot %s is unreadable (%s); moved to %s", self.path, e, corrupt)
+            os.rename(self.path, corrupt)
+            return {}
+
+    def events(self, repair=False):
+        """
+        Yield the events in the current log segment. A torn last line (crash
+        mid-append) is skipped, and truncated away when `repair` is set.
+        """
+        if not os.path.exists(self.log_path):
+            return
+        good_offset = 0
+        with open(self.log_path, 'rb') as f:
+            for line in f:
+                # Every append ends with a newline, so only a torn last write lacks one
+                if not line.endswith(b'\n'):
+                    logger.warning("Discarding torn last event in %s", self.log_path)
+                    if repair:
+                        with open(self.log_path, 'r+b') as w:
+                            w.truncate(good_offset)
+                    return
+                try:
+                    event = json.loads(line)
+                except ValueError:
+                    logger.error("Skipping unreadable event at offset %s of %s", good_offset, self.log_path)
+                    good_offset += len(line)
+                    continue
+                good_offset += len(line)
+                yield event
+
+    @staticmethod
+    def apply(states, event):
+        if event.get('event') == DELETED:
+            states.pop(event['id'], None)
+        elif 'state' in event:
+            states[event['id']] = event['state']
+
+    def load(self):
+        """Latest snapshot with the log replayed on top"""
+        start = time.perf_counter()
+        with self._file_lock(fcntl.LOCK_EX):
+            states = self._read_snapshot()
+            replayed = 0
+            for event in self.events(repair=True):
+                self.apply(states, event)
+                replayed += 1
+            self._follow_from_end()
+        self._events_since_snapshot = replayed
+        for candidate_id, state in states.items():
+            # On a reload, candidates already known keep the version they were last merged at
+            if candidate_id not in self._bases:
+                self._bases[candidate_id] = _fingerprints(state)
+        logger.info("Loaded %s candidate states (%s events replayed) in %.3fs",
+                    len(states), replayed, time.perf_counter() - start)
+        return states
+
+    def tail(self):
+        """{candidate_id: latest state or None if deleted} for events since the snapshot"""
+        changes = {}
+        for event in self.events():
+            if event.get('event') == DELETED:
+                changes[event['id']] = None
+            elif 'state' in event:
+                changes[event['id']] = event['state']
+        return changes
+
+    def open_snapshot_and_tail(self):
+        """
+        (open snapshot file or None, tail()) read under one lock, so a
+        compaction in between can't pair a new snapshot with an old tail
+        """
+        with self._file_lock(fcntl.LOCK_SH):
+            snapshot = open(self.path, 'r', encoding='utf-8') if os.path.exists(self.path) else None
+            return snapshot, self.tail()
+
+    # Following other processes
+
+    def _follow_from_end(self):
+        # Called with the file lock held: later events are the ones follow() returns
+        with self._follow_lock:
+            if self._follow_file is not None:
+                self._follow_file.close()
+            self._follow_file = open(self.log_path, 'rb') if os.path.exists(self.log_path) else None
+            self._follow_offset = os.fstat(self._follow_file.fileno()).st_size if self._follow_file else 0
+            segments = self.archived_segments()
+            self._follow_mark = segments[-1] if segments else None
+            self._follow_snapshot = self._snapshot_inode()
+
+    def _snapshot_inode(self):
+        try:
+            return os.stat(self.path).st_ino
+        except FileNotFoundError:
+            return None
+
+    @staticmethod
+    def _read_events(f, offset=0):
+        """
+        (complete events from `offset` on, offset after them); a partial last
+        line is left for the next read. Uses pread, so a descriptor inherited
+        across fork is safe to share.
+        """
+        data = os.pread(f.fileno(), max(os.fstat(f.fileno()).st_size - offset, 0), offset)
+        data = data[:data.rfind(b'\n') + 1]
+        events = []
+        for line in data.splitlines():
+            try:
+                events.append(json.loads(line))
+            except ValueError:
+                logger.error("Skipping unreadable event in %s", f.name)
+        return events, offset + len(data)
+
+    def follow(self):
+        """
+        {candidate_id: latest state or None if deleted} for candidates whose
+        latest event since the previous call (or load()) was written by
+        another process. Log segments rotated meanwhile are read from their
+        archived copies; without archiving they are gone and None is returned:
+        the caller has to load() again.
+        """
+        with self._follow_lock, self._file_lock(fcntl.LOCK_SH):
+            events, followed = [], None
+            if self._follow_file is not None:
+                events, self._follow_offset = self._read_events(self._follow_file, self._follow_offset)
+                followed = os.fstat(self._follow_file.fileno()).st_ino
+            try:
+                current = os.stat(self.log_path).st_ino
+            except FileNotFoundError:
+                current = None
+            if current != followed or current is None:
+                # The followed segment was rotated (its rest is read above), or a log was started
+                if self.archive:
+                    newer = [path for path in self.archived_segments()
+                             if self._follow_mark is None or path > self._follow_mark]
+                    for path in newer:
+                        if os.stat(path).st_ino != followed:
+                            with open(path, 'rb') as f:
+                                events += self._read_events(f)[0]
+                    if newer:
+                        self._follow_mark = newer[-1]
+                elif followed is not None or self._snapshot_inode() != self._follow_snapshot:
+                    return None  # compacted: the events folded into the snapshot are gone
+                if self._follow_file is not None:
+                    self._follow_file.close()
+                self._follow_file = open(self.log_path, 'rb') if current is not None else None
+                self._follow_offset = 0
+                if self._follow_file is not None:
+                    more, self._follow_offset = self._read_events(self._follow_file)
+                    events += more
+        latest = {}
+        for event in events:
+            if event.get('event') == DELETED or 'state' in event:
+                latest[event['id']] = event
+        # A candidate this process wrote last is already current in its memory
+        pid = os.getpid()
+        return {candidate_id: None if event.get('event') == DELETED else event['state']
+                for candidate_id, event in latest.items() if event.get('pid') != pid}
+
+    def merge(self, candidate_id, current, stored):
+        """
+        Apply another process's version of a candidate (`stored`, None if
+        deleted) to this process's `current` one, in place so that code
+        holding the dict sees the merge. Keys changed locally since the last
+        load, write or merge keep their local value. Returns the merged state,
+        or None if deleted.
+        """
+        if stored is None:
+            self._bases.pop(candidate_id, None)
+            return None
+        if current is None:
+            self._bases[candidate_id] = _fingerprints(stored)
+            return stored
+        base = self._bases.get(candidate_id, {})
+        for key in set(current) | set(stored):
+            if key in current and _fingerprint(current[key]) != base.get(key):
+                continue  # changed here and not written yet
+            if key in stored:
+                current[key] = stored[key]
+            else:
+                current.pop(key, None)
+        self._bases[candidate_id] = _fingerprints(stored)
+        return current
+
+    # Writing
+
+    def append(self, candidate_id, event, state=None, **data):
+        """
+        Record an event for a candidate. `state` (the candidate's full new
+        state) makes it a change; without it the event is audit-only
+        (e.g. 'emailed'). Returns the number of bytes written.
+        """
+        record = {'ts': datetime.now().isoformat(), 'pid': os.getpid(), 'event': event, 'id': candidate_id}
+        if data:
+            record['data'] = data
+        if state is not None:
+            record['state'] = state
+        return self.append_many([record])
+
+    def append_many(self, records):
+        payload = b''.join(json.dumps(r, ensure_ascii=False, separators=(',', ':')).encode('utf-8') + b'\n'
+                           for r in records)
+        # File lock first: a thread waiting for another's exclusive() must not hold _lock meanwhile
+        with self._file_lock(fcntl.LOCK_SH), self._lock:
+            log = self._log()
+            log.write(payload)
+            log.flush()
+            if self.fsync:
+                os.fsync(log.fileno())
+            self._events_since_snapshot += len(records)
+            due = self.snapshot_every and self._events_since_snapshot >= self.snapshot_every and not self._compacting
+            if due:
+                self._compacting = True
+        if due:
+            threading.Thread(target=self._background_compact, name='state-compaction', daemon=True).start()
+        return len(payload)
+
+    def put_many(self, states, candidate_ids, event):
+        now, pid = datetime.now().isoformat(), os.getpid()
+        records = []
+        for candidate_id in candidate_ids:
+            state = states.get(candidate_id)
+            if state is None:
+                records.append({'ts': now, 'pid': pid, 'event': DELETED, 'id': candidate_id})
+                self._bases.pop(candidate_id, None)
+            else:
+                records.append({'ts': now, 'pid': pid, 'event': event, 'id': candidate_id, 'state': state})
+                self._bases[candidate_id] = _fingerprints(state)
+        return self.append_many(records) if records else 0
+
+    def audit_many(self, candidate_ids, event, **data):
+        """The same audit-only event for several candidates, in one write"""
+        now, pid = datetime.now().isoformat(), os.getpid()
+        records = [{'ts': now, 'pid': pid, 'event': event, 'id': candidate_id, **({'data': data} if data else {})}
+                   for candidate_id in candidate_ids]
+        return self.append_many(records) if records else 0
+
+    def _background_compact(self):
+        try:
+            self.compact()
+        except Exception as e:
+            logger.error("State compaction failed: %s", e)
+        finally:
+            self._compacting = False
+
+    def compact(self):
+        """Fold the log into a new snapshot and start a new log segment"""
+        start = time.perf_counter()
+        with self._file_lock(fcntl.LOCK_EX):
+            states = self._read_snapshot()
+            replayed = 0
+            for event in self.events(repair=True):
+                self.apply(states, event)
+                replayed += 1
+            if not replayed:
+                return 0
+            self._write_snapshot(states)
+            self._rotate_log()
+        with self._lock:
+            self._events_since_snapshot = 0
+        logger.info("Compacted %s events into a snapshot of %s candidates in %.3fs",
+                    replayed, len(states), time.perf_counter() - start)
+        return replayed
+
+    def _rotate_log(self):
+        if not os.path.exists(self.log_path):
+            return
+        if self.archive:
+            os.rename(self.log_path, f"{self.log_path}.{datetime.now().strftime('%Y%m%dT%H%M%S%f')}")
+        else:
+            os.remove(self.log_path)
+        _fsync_dir(self.log_path)
+
+    def replace_all(self, states):
+        """Write `states` as the snapshot and start an empty log (full rewrite)"""
+        with self._file_lock(fcntl.LOCK_EX), self._lock:
+            self._write_snapshot(states)
+            self._rotate_log()
+            self._events_since_snapshot = 0
+        self._bases = {candidate_id: _fingerprints(state) for candidate_id, state in states.items()}
+
+    def archived_segments(self):
+        directory = os.path.dirname(os.path.abspath(self.log_path))
+        prefix = os.path.basename(self.log_path) + '.'
+        return sorted(os.path.join(directory, name) for name in os.listdir(directory) if name.startswith(prefix))
+
+    def size(self):
+        total = 0
+        for path in (self.path, self.log_path):
+            try:
+                total += os.path.getsize(path)
+            except OSError:
+                pass
+        return total
+
+
+def _fingerprint(value):
+    # Containers are serialized so that a change made in place inside them is noticed too
+    if isinstance(value, (dict, list)):
+        return hash(json.dumps(value, sort_keys=True, ensure_ascii=False))
+    return hash(value)
+
+
+def _fingerprints(state):
+    return {key: _fingerprint(value) for key, value in state.items()}
+
+
+def _fsync_dir(path):
+    try:
+        fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
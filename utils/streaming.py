@@ -0,0 +1,95 @@
+"""
+Fan-out of text that is produced incrementally (an LLM response being
+streamed) to any number of readers.
+
+    broadcast = ChunkBroadcast()
+    # producer thread: broadcast.append(chunk) ... broadcast.close(error=None)
+    for chunk in broadcast.reader():   # earlier chunks first, then live ones
+        ...
+
+The producer runs independently of its readers, so a reader that goes away
+(a closed browser tab) does not stop generation and one that arrives late
+still receives the whole text.
+"""
+import re
+import threading
+
+_BODY_RE = re.compile(r'<body[^>]*>(.*)</body>', re.DOTALL | re.IGNORECASE)
+
+
+class ChunkBroadcast:
+    def __init__(self):
+        self._chunks = []
+        self._cond = threading.Condition()
+        self.done = False
+        self.error = None
+
+    def append(self, chunk):
+        with self._cond:
+            self._chunks.append(chunk)
+            self._cond.notify_all()
+
+    def close(self, error=None):
+        with self._cond:
+            self.done = True
+            self.error = error
+            self._cond.notify_all()
+
+    def reader(self):
+        """Yield every chunk, waiting for new ones until the producer closes; check .error afterwards"""
+        position = 0
+        while True:
+            with self._cond:
+                while position == len(self._chunks) and not self.done:
+                    self._cond.wait()
+                chunks = self._chunks[position:]
+                done = self.done
+            position += len(chunks)
+            yield from chunks
+            if done and position == len(self._chunks):
+                return
+
+    def wait(self, timeout=None):
+        """Block until the producer closes; returns False on timeout"""
+        with self._cond:
+            return self._cond.wait_for(lambda: self.done, timeout)
+
+    def text(self):
+        with self._cond:
+            return ''.join(self._chunks)
+
+
+def strip_code_fence(chunks, hold=8):
+    """
+    Pass streamed LLM text through without a markdown code fence around it
+    (```html ... ```). The last `hold` characters are held back until the end
+    so a closing fence is never emitted.
+    """
+    buffer, started = '', False
+    for chunk in chunks:
+        buffer += chunk
+        if not started:
+            stripped = buffer.lstrip()
+            if stripped.startswith('```'):
+                if '\n' not in stripped:
+                    continue
+                buffer = stripped.split('\n', 1)[1]
+            elif '```'.startswith(stripped):
+                continue  # may still become a fence
+            started = True
+        if len(buffer) > hold:
+            yield buffer[:-hold]
+            buffer = buffer[-hold:]
+    buffer = buffer.rstrip()
+    if buffer.endswith('```'):
+        buffer = buffer[:-3].rstrip()
+    if not started and buffer.lstrip().startswith('```'):
+        buffer = ''
+    if buffer:
+        yield buffer
+
+
+def document_body(document):
+    """The inner HTML of a document's <body>, to place it inside another page; fragments are returned as is"""
+    match = _BODY_RE.search(document)
+    return match.group(1) if match else document